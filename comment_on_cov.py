@@ -1,94 +1,462 @@
-import tensorflow.compat.v1 as tf
-import tensorflow_probability as tfp
 import functools
 import operator
 import math
-
-tf.disable_v2_behavior()
+import concurrent.futures
+import collections
+import threading
+import hashlib
 
 import numpy as np
 
 def generate_corrMatrix_from_covMatrix(cov_matrix):
     assert cov_matrix.shape[0] == cov_matrix.shape[1]
-    d_matrix = np.diag(np.sqrt(np.diag(cov_matrix)))
-    d_matrix_inv = np.diag(1.0 / np.diag(d_matrix))
-    corr_matrix = np.matmul(np.matmul(d_matrix_inv, cov_matrix), d_matrix_inv)
+    # scales rows and columns by broadcasting, O(n^2) instead of two dense matmuls
+    inv_std = 1.0 / np.sqrt(np.diag(cov_matrix))
+    corr_matrix = cov_matrix * inv_std[:, None] * inv_std[None, :]
+    np.fill_diagonal(corr_matrix, 1.0)
     return corr_matrix
 
 
-def generate_series_from_corrMatrix(corr_matrix, num_of_obs):
+def nearest_correlation_matrix(corr_matrix, method='higham', tol=1e-10, max_iter=100, eig_floor=1e-10):
+    """
+    Nearest valid correlation matrix (symmetric, unit diagonal, positive semi-definite)
+    of an estimated one. 'higham' alternates projections on the PSD cone and on the
+    unit diagonal matrices with Dykstra's correction, 'clip' clips the eigenvalues
+    at eig_floor and restores the unit diagonal (faster, not the nearest)
+    """
+    assert method in ('higham', 'clip')
+    corr_matrix = (corr_matrix + corr_matrix.T) / 2.0
+
+    def clip_eigenvalues(a):
+        w, v = np.linalg.eigh(a)
+        return (v * np.maximum(w, eig_floor)) @ v.T
+
+    if method == 'clip':
+        repaired = clip_eigenvalues(corr_matrix)
+    else:
+        y = corr_matrix
+        correction = np.zeros_like(corr_matrix)
+        for _ in range(max_iter):
+            r = y - correction
+            x = clip_eigenvalues(r)
+            correction = x - r
+            y_next = x.copy()
+            np.fill_diagonal(y_next, 1.0)
+            converged = np.linalg.norm(y_next - y, 'fro') <= tol * np.linalg.norm(y, 'fro')
+            y = y_next
+            if converged:
+                break
+        repaired = y
+
+    # back to a unit diagonal, clipping may have moved it
+    inv_std = 1.0 / np.sqrt(np.diag(repaired))
+    repaired = repaired * inv_std[:, None] * inv_std[None, :]
+    np.fill_diagonal(repaired, 1.0)
+    return (repaired + repaired.T) / 2.0
+
+
+def _eigen_factor(matrix):
+    """L with L @ L.T == matrix (up to clipped negative eigenvalues), not triangular"""
+    w, v = np.linalg.eigh((matrix + matrix.T) / 2.0)
+    return v * np.sqrt(np.maximum(w, 0.0))
+
+
+def correlation_factor(corr_matrix, repair=True, method='higham'):
+    """
+    Factor L of corr_matrix (L @ L.T == corr_matrix), the Cholesky factor if it is
+    positive definite. Otherwise, with repair, the Cholesky factor of its nearest
+    correlation matrix, falling back to an eigen factor for matrices that stay
+    semi-definite (e.g. perfectly correlated series)
+    """
     assert corr_matrix.shape[0] == corr_matrix.shape[1]
-    chol_from_corr = np.linalg.cholesky(corr_matrix)
-    random_numbers = np.random.randn(num_of_obs * corr_matrix.shape[0])
-    correlated_observations = [
-        np.matmul(chol_from_corr,
-                  random_numbers[x:x + corr_matrix.shape[0]].reshape(corr_matrix.shape[0], 1))
-            .reshape(1, corr_matrix.shape[0])
-        for x in range(0, num_of_obs * corr_matrix.shape[0], corr_matrix.shape[0])]
-    correlated_observations = np.squeeze(np.stack(correlated_observations))
-    return correlated_observations
+    try:
+        return np.linalg.cholesky(corr_matrix)
+    except np.linalg.LinAlgError:
+        if not repair:
+            raise
+    repaired = nearest_correlation_matrix(corr_matrix, method=method)
+    try:
+        return np.linalg.cholesky(repaired)
+    except np.linalg.LinAlgError:
+        return _eigen_factor(repaired)
+
+
+# LRU of factors by content hash of the matrix, repeated runs on the same matrix skip the O(n^3) step
+FACTOR_CACHE_SIZE = 32
+_factor_cache = collections.OrderedDict()
+_factor_cache_lock = threading.Lock()
+
+
+def cached_correlation_factor(corr_matrix, repair=True, method='higham'):
+    """correlation_factor memoized by the content of corr_matrix, the returned factor is read only"""
+    corr_matrix = np.ascontiguousarray(corr_matrix)
+    digest = hashlib.blake2b(corr_matrix.view(np.uint8), digest_size=16)
+    digest.update(f"{corr_matrix.dtype.str}{corr_matrix.shape}{repair}{method}".encode())
+    key = digest.digest()
+    with _factor_cache_lock:
+        factor = _factor_cache.get(key)
+        if factor is not None:
+            _factor_cache.move_to_end(key)
+            return factor
+    factor = correlation_factor(corr_matrix, repair, method)
+    factor.setflags(write=False)
+    with _factor_cache_lock:
+        _factor_cache[key] = factor
+        while len(_factor_cache) > FACTOR_CACHE_SIZE:
+            _factor_cache.popitem(last=False)
+    return factor
+
+
+def spawn_generators(seed, num_of_streams):
+    """
+    Independent, non-overlapping random streams derived from a single seed. Every
+    generator of this module draws simulation i from the i-th stream, so results
+    do not depend on how the work is chunked, batched or split over workers
+    """
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed_sequence.spawn(num_of_streams)]
+
+
+def generate_series_batch(chol_from_corr, num_of_obs, generators, dtype=np.float64):
+    """
+    (len(generators), num_of_obs, num_of_series) correlated draws, simulation i from
+    the next num_of_obs draws of generators[i], as a single GEMM of the standard
+    normal draws against the transposed Cholesky factor
+    """
+    num_of_series = chol_from_corr.shape[0]
+    random_numbers = np.empty((len(generators), num_of_obs, num_of_series), dtype=dtype)
+    for sim, rng in enumerate(generators):
+        rng.standard_normal((num_of_obs, num_of_series), dtype=dtype, out=random_numbers[sim])
+    return random_numbers @ chol_from_corr.T.astype(dtype, copy=False)
+
+
+def generate_series_from_corrMatrix(corr_matrix, num_of_obs, num_of_sims=None, seed=None, dtype=np.float64):
+    """
+    Correlated normal series with correlation corr_matrix.
+    Without num_of_sims nor seed returns (num_of_obs, num_of_series) drawn from the global
+    np.random state (same draws as before for a given np.random.seed), else
+    (num_of_sims, num_of_obs, num_of_series), or (num_of_obs, num_of_series) without
+    num_of_sims, with simulation i drawn from the i-th stream spawned from seed
+    """
+    assert corr_matrix.shape[0] == corr_matrix.shape[1]
+    chol_from_corr = cached_correlation_factor(corr_matrix)
+    if num_of_sims is None and seed is None:
+        random_numbers = np.random.randn(num_of_obs, corr_matrix.shape[0])
+        return np.squeeze(random_numbers @ chol_from_corr.T)
+    generators = spawn_generators(seed, num_of_sims or 1)
+    correlated_observations = generate_series_batch(chol_from_corr, num_of_obs, generators, dtype)
+    return correlated_observations if num_of_sims is not None else correlated_observations[0]
+
+
+def iter_series_chunks(corr_matrix, num_of_obs, chunk_obs, num_of_sims=1, seed=None, dtype=np.float64):
+    """
+    Streams the (num_of_sims, num_of_obs, num_of_series) draws as chunks of
+    (num_of_sims, chunk_obs, num_of_series) along the observations, the memory
+    used does not depend on num_of_obs. The chunks put together are the draws of
+    generate_series_from_corrMatrix with the same seed, whatever the chunk size
+    """
+    assert corr_matrix.shape[0] == corr_matrix.shape[1]
+    assert chunk_obs > 0
+    chol_from_corr = cached_correlation_factor(corr_matrix)
+    generators = spawn_generators(seed, num_of_sims)
+    for start in range(0, num_of_obs, chunk_obs):
+        yield generate_series_batch(chol_from_corr, min(chunk_obs, num_of_obs - start), generators, dtype)
+
+
+def _series_task(chol_from_corr, num_of_obs, seed_sequences, dtype):
+    generators = [np.random.default_rng(seed_sequence) for seed_sequence in seed_sequences]
+    return generate_series_batch(chol_from_corr, num_of_obs, generators, dtype)
+
+
+def generate_series_parallel(corr_matrix, num_of_obs, num_of_sims, seed=None, sims_per_task=256,
+                             workers=None, dtype=np.float64):
+    """
+    (num_of_sims, num_of_obs, num_of_series) draws computed by a process pool in
+    batches of sims_per_task simulations. Simulation i is drawn from the i-th stream
+    spawned from seed: the result is the one of generate_series_from_corrMatrix,
+    whatever sims_per_task and the number of workers
+    """
+    assert corr_matrix.shape[0] == corr_matrix.shape[1]
+    chol_from_corr = cached_correlation_factor(corr_matrix)
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    children = seed_sequence.spawn(num_of_sims)
+    starts = list(range(0, num_of_sims, sims_per_task))
+    out = np.empty((num_of_sims, num_of_obs, corr_matrix.shape[0]), dtype=dtype)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_series_task, chol_from_corr, num_of_obs, children[start:start + sims_per_task], dtype)
+                   for start in starts]
+        for start, future in zip(starts, futures):
+            out[start:start + sims_per_task] = future.result()
+    return out
+
+
+class StreamingCovariance(object):
+    """
+    Online covariance of x and y over batches of observations (axis 0), with the
+    Welford/Chan pairwise update, so that batches never have to be held together.
+    Partial estimators of different processes are combined with merge().
+    event_axis=None: elementwise covariance, x[:, i, j] with y[:, i, j]
+    event_axis=-1: full matrices, cov[..., m, n] of x[:, ..., m] and y[:, ..., n]
+    (the two layouts of tfp.stats.covariance with sample_axis=0).
+    With alpha (or halflife in observations) the observations are exponentially
+    weighted, the most recent ones weighting the most
+    """
+
+    def __init__(self, event_axis=-1, alpha=None, halflife=None):
+        assert event_axis in (None, -1)
+        assert alpha is None or halflife is None
+        if halflife is not None:
+            alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        assert alpha is None or 0.0 < alpha < 1.0
+        self.event_axis = event_axis
+        self.alpha = alpha
+        self.count = 0
+        # total weight of the observations (count without exponential weights)
+        self.weight = 0.0
+        self.mean_x = None
+        self.mean_y = None
+        # sums of the weighted products of deviations from the means
+        self.comoment = None
+        self.moment_x = None
+        self.moment_y = None
+
+    def _outer(self, a, b):
+        return a[..., :, None] * b[..., None, :] if self.event_axis == -1 else a * b
+
+    def _batch_moments(self, x, y, weights):
+        """(weight, means, comoment, second moments) of a single batch"""
+        if weights is None:
+            weight = float(x.shape[0])
+            mean_x, mean_y = x.mean(axis=0), y.mean(axis=0)
+        else:
+            weight = float(weights.sum())
+            mean_x = np.tensordot(weights, x, axes=1) / weight
+            mean_y = np.tensordot(weights, y, axes=1) / weight
+        dx, dy = x - mean_x, y - mean_y
+        wdx, wdy = dx, dy
+        if weights is not None:
+            weights = weights.reshape((-1,) + (1,) * (dx.ndim - 1))
+            wdx, wdy = dx * weights, dy * weights
+        if self.event_axis == -1:
+            # one GEMM per leading index instead of a batch of outer products
+            comoment = np.einsum('b...m,b...n->...mn', wdx, dy, optimize=True)
+        else:
+            comoment = (wdx * dy).sum(axis=0)
+        return weight, mean_x, mean_y, comoment, (wdx * dx).sum(axis=0), (wdy * dy).sum(axis=0)
+
+    def _combine(self, weight, mean_x, mean_y, comoment, moment_x, moment_y):
+        """Chan's pairwise combination of the current state with the moments of newer observations"""
+        if self.mean_x is None:
+            self.weight, self.mean_x, self.mean_y = weight, mean_x, mean_y
+            self.comoment, self.moment_x, self.moment_y = comoment, moment_x, moment_y
+            return
+        total = self.weight + weight
+        delta_x, delta_y = mean_x - self.mean_x, mean_y - self.mean_y
+        factor = self.weight * weight / total
+        self.comoment = self.comoment + comoment + self._outer(delta_x, delta_y) * factor
+        self.moment_x = self.moment_x + moment_x + delta_x * delta_x * factor
+        self.moment_y = self.moment_y + moment_y + delta_y * delta_y * factor
+        self.mean_x = self.mean_x + delta_x * (weight / total)
+        self.mean_y = self.mean_y + delta_y * (weight / total)
+        self.weight = total
+
+    def _decay(self, num_of_obs):
+        """Ages the current state by num_of_obs newer observations"""
+        if self.alpha is None or self.mean_x is None:
+            return
+        decay = (1.0 - self.alpha) ** num_of_obs
+        self.weight *= decay
+        self.comoment = self.comoment * decay
+        self.moment_x = self.moment_x * decay
+        self.moment_y = self.moment_y * decay
+
+    def update(self, x, y=None):
+        """Adds a batch of observations along axis 0, y defaults to x"""
+        x = np.asarray(x, dtype=np.float64)
+        y = x if y is None else np.asarray(y, dtype=np.float64)
+        assert x.shape[0] == y.shape[0]
+        if self.event_axis is None:
+            assert x.shape == y.shape
+        else:
+            assert x.shape[:-1] == y.shape[:-1]
+        num_of_obs = x.shape[0]
+        if num_of_obs == 0:
+            return self
+        weights = None
+        if self.alpha is not None:
+            weights = (1.0 - self.alpha) ** np.arange(num_of_obs - 1, -1, -1, dtype=np.float64)
+        self._decay(num_of_obs)
+        self._combine(*self._batch_moments(x, y, weights))
+        self.count += num_of_obs
+        return self
+
+    def merge(self, other):
+        """
+        Adds the observations summarized by other (another process, another part of the stream).
+        With exponential weights other is taken as holding the more recent observations
+        """
+        assert self.event_axis == other.event_axis and self.alpha == other.alpha
+        if other.mean_x is None:
+            return self
+        self._decay(other.count)
+        self._combine(other.weight, other.mean_x, other.mean_y, other.comoment, other.moment_x, other.moment_y)
+        self.count += other.count
+        return self
+
+    def covariance(self, ddof=0):
+        """Covariance of the observations so far (ddof=0 as tfp.stats.covariance), weighted ones have no ddof"""
+        assert self.mean_x is not None, "no observations"
+        if self.alpha is not None:
+            return self.comoment / self.weight
+        return self.comoment / (self.count - ddof)
+
+    def correlation(self):
+        scale = np.sqrt(self._outer(self.moment_x, self.moment_y))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.comoment / scale
+
+
+def covariance(x, y=None, event_axis=-1, alpha=None, halflife=None):
+    """One shot StreamingCovariance of a single batch, same layouts as tfp.stats.covariance(sample_axis=0)"""
+    return StreamingCovariance(event_axis, alpha, halflife).update(x, y).covariance()
+
 
-# Series By Series comparison for covariance matrices
-num_of_series = 5
-input_shape = [5, num_of_series, num_of_series]
-x1 = tf.placeholder(tf.float64, shape=input_shape)
-x2 = tf.placeholder(tf.float64, shape=input_shape)
-cov[i, j] is the sample covariance between x[:, i, j] and y[:, i, j].
-cov = tfp.stats.covariance(x1, x2, sample_axis=0, event_axis=None)
-cov_matrix[i, m, n] is the sample covariance of x[:, i, m] and y[:, i, n]
-cov_matrix = tfp.stats.covariance(x1, x2, sample_axis=0, event_axis=-1)
-with tf.Session() as session:
-    a1 = np.random.normal(size=functools.reduce(operator.mul, x1.get_shape()).value).reshape(input_shape)
-    a2 = np.random.normal(size=functools.reduce(operator.mul, x2.get_shape()).value).reshape(input_shape)
-    result = session.run(cov, feed_dict={x1: a1, x2: a2})
-    result2 = session.run(cov_matrix, feed_dict={x1: a1, x2: a2})
+def normalize_weights(weights):
+    """Scales every weight vector (row) to unit length in one vectorized call"""
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / np.linalg.norm(weights, axis=1, keepdims=True)
 
-check
-math.isclose(result[0, 0], np.cov(a1[:, 0, 0], a2[:, 0, 0], bias=True)[0][1], rel_tol=1e-7)
 
-# Fictional correlated time series with 100 observations
-num_of_obs = 100
-x = tf.random_normal(shape=(num_of_obs, num_of_series))
-cov_matrix = tfp.stats.covariance(x, x, sample_axis=0, event_axis=-1)
-xvars = tf.math.reduce_variance(x, 0)
-with tf.Session() as session:
-    (covMatrix, xVars, xInput) = session.run([cov_matrix, xvars, x])
+def _tail_ranks(levels, num_of_sims):
+    """Number of simulations in the lower tail of each level"""
+    return [max(1, int(math.ceil(level * num_of_sims))) for level in levels]
 
-# check
-all(map(lambda x: math.isclose(x[0], x[1], rel_tol=1e-5), zip(np.diag(covMatrix), xVars)))
 
-# generate a correlation  matrix from the covariance matrix
-np.random.seed(20)
-corrMatrix = generate_corrMatrix_from_covMatrix(covMatrix)
-generate an example series from the correlation matrix
-correlatedObservations = generate_series_from_corrMatrix(corrMatrix, num_of_obs)
+def _keep_lowest(block, kmax):
+    """The kmax lowest rows of every column of block, unordered"""
+    if block.shape[0] > kmax:
+        block = np.partition(block, kmax - 1, axis=0)[:kmax]
+    return block
 
-# assume a correlation matrix of risk factors/drivers:
-driveCorrMatrix = np.array([[1.0, 0.5, -0.2], [0.5, 1.0, 0.1], [-0.2, 0.1, 1.0]])
 
-# assume a population of weights for different scenarios:
-np.random.seed(20)
-num_of_weights = 1000 * driveCorrMatrix.shape[0]
-random_weights = np.reshape(np.random.randn(num_of_weights),
-                            (int(num_of_weights / driveCorrMatrix.shape[0]), driveCorrMatrix.shape[0]))
-random_weights_normalized = np.apply_along_axis(lambda x: np.divide(x, np.sqrt(np.sum(np.square(x)))), 1,
-                                                random_weights)
-# generate some scenarios
-factor_corr = tf.placeholder(tf.float64)
-factor_betas = tf.placeholder(tf.float64)
-num_of_simulations = 100
+def _stress_blocks(weight_tiles, chol_from_corr, sim_sizes, seed_sequences, kmax, dtype):
+    """
+    Streaming reduction of the P&L of all the weight vectors over a run of simulation
+    blocks. Each block is drawn once, from its own stream, and then applied to every
+    tile of weights in turn: only the lowest kmax P&L of each weight vector and the
+    first two moments are kept, never the (simulations x weights) matrix
+    """
+    tails = [None] * len(weight_tiles)
+    total = [np.zeros(tile.shape[1]) for tile in weight_tiles]
+    total_sq = [np.zeros(tile.shape[1]) for tile in weight_tiles]
+    for size, seed_sequence in zip(sim_sizes, seed_sequences):
+        draws = generate_series_batch(chol_from_corr, size, [np.random.default_rng(seed_sequence)], dtype)[0]
+        for i, tile in enumerate(weight_tiles):
+            pnl = draws @ tile
+            total[i] += pnl.sum(axis=0)
+            total_sq[i] += np.einsum('sw,sw->w', pnl, pnl)
+            tails[i] = _keep_lowest(pnl if tails[i] is None else np.concatenate([tails[i], pnl]), kmax)
+    return np.concatenate(tails, axis=1), np.concatenate(total), np.concatenate(total_sq)
 
-with tf.Session() as session:
 
-# generate some stress scenarios:
+def stress_scenarios(weights, corr_matrix, num_of_sims, levels=(0.01, 0.05), seed=None,
+                     weight_tile=64, sim_tile=1024, blocks_per_task=16, workers=None, normalize=True,
+                     dtype=np.float64):
+    """
+    P&L of every weight vector against num_of_sims correlated factor draws.
+    The simulations are drawn in blocks of sim_tile, block b from the b-th stream spawned
+    from seed, and runs of blocks_per_task blocks are spread over a process pool. Every
+    block is drawn once and applied to the weight vectors in tiles of weight_tile, the
+    weights being the inner loop: the sim_tile x weight_tile block of P&L (512 KiB in
+    float64 with the defaults) fits in a typical L2 cache, larger tiles spill to L3 or
+    memory. The results depend on seed and sim_tile only, neither on the tiling of the
+    weights nor on blocks_per_task or the number of workers
+    Returns dict of
+        var: (num_of_weights, len(levels)), lower tail P&L quantile of each level
+        es: (num_of_weights, len(levels)), mean P&L beyond it (expected shortfall)
+        mean, std: (num_of_weights,)
+    """
+    weights = normalize_weights(weights) if normalize else np.asarray(weights, dtype=np.float64)
+    assert weights.shape[1] == corr_matrix.shape[0]
+    assert all(0.0 < level < 1.0 for level in levels)
+    chol_from_corr = cached_correlation_factor(corr_matrix)
+    sim_sizes = [min(sim_tile, num_of_sims - start) for start in range(0, num_of_sims, sim_tile)]
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    block_streams = seed_sequence.spawn(len(sim_sizes))
+    ranks = _tail_ranks(levels, num_of_sims)
+    kmax = max(ranks)
 
-correlatedObservations = generate_series_from_corrMatrix(corrMatrix, num_of_obs)
+    # (num_of_series, weight_tile) slices, contiguous for the GEMM of every block
+    weight_tiles = [np.ascontiguousarray(weights[start:start + weight_tile].T, dtype=dtype)
+                    for start in range(0, weights.shape[0], weight_tile)]
+    tail = None
+    total = np.zeros(weights.shape[0])
+    total_sq = np.zeros(weights.shape[0])
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_stress_blocks, weight_tiles, chol_from_corr, sim_sizes[start:start + blocks_per_task],
+                               block_streams[start:start + blocks_per_task], kmax, dtype)
+                   for start in range(0, len(sim_sizes), blocks_per_task)]
+        for future in futures:
+            part_tail, part_total, part_total_sq = future.result()
+            tail = _keep_lowest(part_tail if tail is None else np.concatenate([tail, part_tail]), kmax)
+            total += part_total
+            total_sq += part_total_sq
+    tail = np.sort(tail, axis=0)
+    mean = total / num_of_sims
+    return {
+        'var': np.stack([tail[k - 1] for k in ranks], axis=1),
+        'es': np.stack([tail[:k].mean(axis=0) for k in ranks], axis=1),
+        'mean': mean,
+        'std': np.sqrt(np.maximum(total_sq / num_of_sims - mean * mean, 0.0)),
+    }
 
 
+if __name__ == "__main__":
+    # Series By Series comparison for covariance matrices
+    num_of_series = 5
+    input_shape = [5, num_of_series, num_of_series]
+    a1 = np.random.normal(size=functools.reduce(operator.mul, input_shape)).reshape(input_shape)
+    a2 = np.random.normal(size=functools.reduce(operator.mul, input_shape)).reshape(input_shape)
+    # cov[i, j] is the sample covariance between x[:, i, j] and y[:, i, j].
+    result = covariance(a1, a2, event_axis=None)
+    # cov_matrix[i, m, n] is the sample covariance of x[:, i, m] and y[:, i, n]
+    result2 = covariance(a1, a2, event_axis=-1)
 
+    # check
+    print(math.isclose(result[0, 0], np.cov(a1[:, 0, 0], a2[:, 0, 0], bias=True)[0][1], rel_tol=1e-7))
 
+    # Fictional correlated time series with 100 observations
+    num_of_obs = 100
+    xInput = np.random.normal(size=(num_of_obs, num_of_series))
+    # streamed in batches of 10 observations, as ticks would be
+    estimator = StreamingCovariance(event_axis=-1)
+    for start in range(0, num_of_obs, 10):
+        estimator.update(xInput[start:start + 10])
+    covMatrix = estimator.covariance()
+    xVars = np.var(xInput, 0)
 
+    # check
+    print(all(map(lambda x: math.isclose(x[0], x[1], rel_tol=1e-5), zip(np.diag(covMatrix), xVars))))
 
+    # generate a correlation  matrix from the covariance matrix
+    np.random.seed(20)
+    corrMatrix = generate_corrMatrix_from_covMatrix(covMatrix)
+    # generate an example series from the correlation matrix
+    correlatedObservations = generate_series_from_corrMatrix(corrMatrix, num_of_obs)
 
+    # assume a correlation matrix of risk factors/drivers:
+    driveCorrMatrix = np.array([[1.0, 0.5, -0.2], [0.5, 1.0, 0.1], [-0.2, 0.1, 1.0]])
 
+    # assume a population of weights for different scenarios:
+    np.random.seed(20)
+    num_of_weights = 1000 * driveCorrMatrix.shape[0]
+    random_weights = np.reshape(np.random.randn(num_of_weights),
+                                (int(num_of_weights / driveCorrMatrix.shape[0]), driveCorrMatrix.shape[0]))
+    random_weights_normalized = normalize_weights(random_weights)
+    # generate some scenarios
+    num_of_simulations = 100
 
+    # generate some stress scenarios: P&L quantiles and expected shortfall of every weight vector
+    stress = stress_scenarios(random_weights_normalized, driveCorrMatrix, num_of_simulations,
+                              levels=(0.01, 0.05), seed=20, normalize=False)
+    print(stress['var'][:5], stress['es'][:5])
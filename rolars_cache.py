@@ -7,35 +7,1356 @@ import functools
 import pickle
 import json
 import hashlib
-from io import StringIO, BytesIO
+import concurrent.futures
+import asyncio
+import redis.asyncio
+import redis.cluster
+import collections
+import threading
+import time
+import uuid
+import base64
+import math
+import struct
+import inspect
+import atexit
+import weakref
+import socket
+import bisect
+import importlib
+import os
+import re
+import glob
 
-class RolarsCache(object):
+try:
+    import xxhash
+except ImportError:  # optional, argument fingerprints fall back to blake2b
+    xxhash = None
 
-    _ACCEPTABLE_METHODS = ['pickle', 'pyarrow', 'json']
+# Deletes the single-flight lock only if it is still owned by the caller
+_RELEASE_LOCK_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
 
-    def refresh(self):
-        # storing of keys in the object so as to know how to retrieve the value
-        # Scan for all keys matching the pattern and extract their serialization method
-        keys_already_present = []
-        for k in self.cache_container.scan_iter(match=f"{self.leading_key}-*"):
-            key_str = k.decode() if isinstance(k, bytes) else k
-            # Key format: RolarsCache-{method}-{func_name}|...
-            parts = key_str.split('-')
-            if len(parts) >= 3:
-                method = parts[1]  # Extract method (pickle, pyarrow, json)
-                keys_already_present.append((key_str, method))
-        self.keys = dict(keys_already_present)
+# Budget accounting of an entry: KEYS = access zset, sizes hash, total bytes counter, lfu age,
+# expiry zset, ARGV = entry key, payload bytes, access score, eviction policy, expiry time
+# (0 if the entry does not expire). Returns the namespace total.
+# lfu uses dynamic aging: a new entry starts one hit above the score of the last
+# evicted entry, so it is not the first victim and stale entries age out
+_TRACK_WRITE_LUA = """
+local old = tonumber(redis.call('hget', KEYS[2], ARGV[1]) or '0')
+redis.call('hset', KEYS[2], ARGV[1], ARGV[2])
+if tonumber(ARGV[5]) > 0 then
+    redis.call('zadd', KEYS[5], ARGV[5], ARGV[1])
+else
+    redis.call('zrem', KEYS[5], ARGV[1])
+end
+if ARGV[4] == 'lfu' then
+    if redis.call('zscore', KEYS[1], ARGV[1]) then
+        redis.call('zincrby', KEYS[1], 1, ARGV[1])
+    else
+        local age = tonumber(redis.call('get', KEYS[4]) or '0')
+        redis.call('zadd', KEYS[1], age + 1, ARGV[1])
+    end
+else
+    redis.call('zadd', KEYS[1], ARGV[3], ARGV[1])
+end
+return redis.call('incrby', KEYS[3], tonumber(ARGV[2]) - old)
+"""
 
-    def __init__(self, redis_instance, key=None, hash_keys=False):
-        # Checks that a redis object has been passed
-        # https://stackoverflow.com/questions/57949871/how-to-set-get-pandas-dataframes-into-redis-using-pyarrow/57986261#57986261
-        if isinstance(redis_instance, redis.client.Redis) !=True:
-            raise AttributeError(
-                "Did not recieve an Redis Object, instead received {}".format(type(redis_instance)))
+# Raises the lfu age of a namespace to the score of an evicted entry, KEYS = lfu age, ARGV = score
+_RAISE_AGE_LUA = """
+if tonumber(ARGV[1]) > tonumber(redis.call('get', KEYS[1]) or '0') then
+    redis.call('set', KEYS[1], ARGV[1])
+end
+return 0
+"""
 
-        # Sets the redis object as an attribute of this class
-        self.cache_container = redis_instance
+# Drops an entry from the budget accounting, same KEYS, ARGV = entry key. Returns its bytes
+_UNTRACK_LUA = """
+local size = tonumber(redis.call('hget', KEYS[2], ARGV[1]) or '0')
+redis.call('hdel', KEYS[2], ARGV[1])
+redis.call('zrem', KEYS[1], ARGV[1])
+redis.call('zrem', KEYS[5], ARGV[1])
+if size > 0 then
+    redis.call('decrby', KEYS[3], size)
+end
+return size
+"""
+
+# Sources of the scripts by sha1, for the nodes of a cluster that have not loaded them yet
+_LUA_SOURCES = {hashlib.sha1(script.encode()).hexdigest(): script
+                for script in [_RELEASE_LOCK_LUA, _TRACK_WRITE_LUA, _RAISE_AGE_LUA, _UNTRACK_LUA]}
+
+# Marker for values not found in the local tier
+_MISSING = object()
+
+# Every value written starts with a small header describing how to read it:
+# magic, version, serialization method, IPC compression codec, container type
+# of the original value and an 8 byte fingerprint of the arrow schema (zeros for non arrow payloads)
+_HEADER = struct.Struct('!2sBBBB8s')
+_HEADER_MAGIC = b'RC'
+_HEADER_VERSION = 1
+_NO_FINGERPRINT = bytes(8)
+# 'manifest' is the value under the key of a chunked entry, a json description of its chunks
+_METHOD_CODES = {'pickle': 1, 'pyarrow': 2, 'json': 3, 'manifest': 4, 'disk': 5, 'ndarray': 6, 'composite': 7}
+_METHOD_NAMES = {v: k for k, v in _METHOD_CODES.items()}
+_CODEC_CODES = {None: 0, 'lz4': 1, 'zstd': 2}
+_CODEC_NAMES = {v: k for k, v in _CODEC_CODES.items()}
+# container type of arrow payloads, values are read back as the same type
+_KIND_CODES = {'object': 0, 'polars.DataFrame': 1, 'polars.Series': 2, 'polars.LazyFrame': 3,
+               'pandas.DataFrame': 4, 'pandas.Series': 5, 'arrow.Table': 6, 'arrow.RecordBatch': 7}
+_KIND_NAMES = {v: k for k, v in _KIND_CODES.items()}
+
+def _pack_header(method, codec=None, fingerprint=_NO_FINGERPRINT, kind='object'):
+    return _HEADER.pack(_HEADER_MAGIC, _HEADER_VERSION, _METHOD_CODES[method], _CODEC_CODES[codec],
+                        _KIND_CODES[kind], fingerprint)
+
+def _unpack_header(pull_value):
+    """
+    Returns (method, codec, kind, fingerprint) of a value, or None for values written
+    without a header. Legacy payloads can not start with the magic: pickle starts
+    with 0x80, IPC streams with 0xff and json never with a letter other than t/f/n
+    """
+    if len(pull_value) < _HEADER.size or pull_value[:2] != _HEADER_MAGIC:
+        return None
+    _, version, method, codec, kind, fingerprint = _HEADER.unpack_from(pull_value)
+    if version != _HEADER_VERSION:
+        raise ValueError("Unsupported RolarsCache payload version {}".format(version))
+    return _METHOD_NAMES[method], _CODEC_NAMES[codec], _KIND_NAMES[kind], fingerprint
+
+def _is_manifest(pull_value):
+    header = _unpack_header(pull_value)
+    return header is not None and header[0] == 'manifest'
+
+# Frames of the disk tier can only be read on the host that wrote them
+_HOSTNAME = socket.gethostname()
+
+def _disk_location(pull_value):
+    """(host, path) of a disk tier pointer, None for other values"""
+    header = _unpack_header(pull_value)
+    if header is None or header[0] != 'disk':
+        return None
+    pointer = json.loads(bytes(memoryview(pull_value)[_HEADER.size:]))
+    return pointer['host'], pointer['path']
+
+def _describe_header(head):
+    """dict() of the header at the start of head, None if there is none"""
+    header = _unpack_header(head)
+    if header is None:
+        return None
+    method, codec, kind, fingerprint = header
+    return {'method': method, 'codec': codec, 'kind': kind,
+            'schema_fingerprint': None if fingerprint == _NO_FINGERPRINT else fingerprint.hex()}
+
+def _seconds_left(pttl):
+    """Seconds before expiry from a PTTL reply, None for keys without expiry (or missing)"""
+    pttl = int(pttl)
+    return None if pttl < 0 else pttl / 1000.0
+
+def _readable_here(pull_value):
+    """False for disk tier pointers to files of another host or removed files"""
+    location = _disk_location(pull_value)
+    return location is None or (location[0] == _HOSTNAME and os.path.exists(location[1]))
+
+def _schema_fingerprint(schema):
+    return hashlib.blake2b(schema.serialize().to_pybytes(), digest_size=8).digest()
+
+def _kind_of(value):
+    """Container type recorded in the header of an arrow payload"""
+    if isinstance(value, pl.LazyFrame):
+        return 'polars.LazyFrame'
+    if isinstance(value, pl.DataFrame):
+        return 'polars.DataFrame'
+    if isinstance(value, pl.Series):
+        return 'polars.Series'
+    if isinstance(value, pd.DataFrame):
+        return 'pandas.DataFrame'
+    if isinstance(value, pd.Series):
+        return 'pandas.Series'
+    if isinstance(value, pa.Table):
+        return 'arrow.Table'
+    if isinstance(value, pa.RecordBatch):
+        return 'arrow.RecordBatch'
+    return 'object'
+
+# Schema metadata of pandas Series without a name, to_frame() names their column 0
+_UNNAMED_SERIES = b'rolars_cache.unnamed'
+
+def _from_arrow_table(arrow_table, kind):
+    """
+    Rebuilds a value of the recorded container type from an arrow table,
+    payloads of unknown type (written before types were recorded) are read as polars
+    """
+    if kind == 'arrow.Table':
+        return arrow_table
+    if kind == 'arrow.RecordBatch':
+        return arrow_table.combine_chunks().to_batches()[0] if arrow_table.num_rows > 0 \
+            else pa.RecordBatch.from_pylist([], schema=arrow_table.schema)
+    if kind == 'pandas.DataFrame':
+        return arrow_table.to_pandas()
+    if kind == 'pandas.Series':
+        series = arrow_table.to_pandas().iloc[:, 0]
+        if _UNNAMED_SERIES in (arrow_table.schema.metadata or {}):
+            series.name = None
+        return series
+    value = pl.from_arrow(arrow_table, rechunk=False)
+    if kind == 'polars.Series':
+        return value.to_series()
+    if kind == 'polars.LazyFrame':
+        return value.lazy()
+    return value
+
+def _to_arrow_table(value):
+    """
+    Converts a polars/pandas frame or series (or an arrow table/batch) into a pyarrow Table
+    """
+    if isinstance(value, pa.Table):
+        return value
+    if isinstance(value, pa.RecordBatch):
+        return pa.Table.from_batches([value])
+    if isinstance(value, pl.LazyFrame):
+        return value.collect().to_arrow()
+    if isinstance(value, pl.DataFrame):
+        return value.to_arrow()
+    if isinstance(value, pl.Series):
+        # polars Series export as a single arrow array
+        return pa.table({value.name or '': value.to_arrow()})
+    if isinstance(value, pd.Series):
+        arrow_table = pa.Table.from_pandas(value.to_frame())
+        if value.name is None:
+            metadata = dict(arrow_table.schema.metadata or {})
+            metadata[_UNNAMED_SERIES] = b'1'
+            arrow_table = arrow_table.replace_schema_metadata(metadata)
+        return arrow_table
+    return pa.Table.from_pandas(value)
+
+def _ipc_stream_bytes(arrow_table, options=None, kind='object'):
+    """
+    Writes an arrow table as an IPC stream (compatible with PyArrow 22.0.0+) behind its header,
+    options=pyarrow.ipc.IpcWriteOptions, e.g. to compress the buffers.
+    The stream is written straight into an arrow buffer and handed to redis as a
+    memoryview over it, without the copy of BytesIO.getvalue()
+    """
+    codec = None if options is None else options.compression
+    sink = pa.BufferOutputStream()
+    sink.write(_pack_header('pyarrow', codec, _schema_fingerprint(arrow_table.schema), kind))
+    writer = pa.ipc.new_stream(sink, arrow_table.schema, options=options)
+    writer.write_table(arrow_table)
+    writer.close()
+    return memoryview(sink.getvalue())
+
+def _read_ipc_stream(payload):
+    """Reads an IPC stream over the redis response buffer without copying it"""
+    body = memoryview(payload)
+    if _unpack_header(payload) is not None:
+        body = body[_HEADER.size:]
+    return pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+
+# Raw buffers of the ndarray method start on multiples of this many bytes of the payload
+_NDARRAY_ALIGN = 64
+_NDARRAY_META = struct.Struct('!I')
+
+def _ndarray_members(value):
+    """
+    (container, [(name, array)]) of an ndarray or of a tuple/list/dict of ndarrays,
+    None if value is anything else or holds python objects.
+    Only exact ndarrays qualify: subclasses (MaskedArray, matrix, recarray) carry
+    state or behaviour the raw buffer does not, they are left to pickle
+    """
+    if type(value) is np.ndarray:
+        container, members = 'array', [(None, value)]
+    elif type(value) in (tuple, list) and len(value) > 0:
+        container, members = type(value).__name__, [(None, v) for v in value]
+    elif type(value) is dict and len(value) > 0 and all(isinstance(k, str) for k in value):
+        container, members = 'dict', list(value.items())
+    else:
+        return None
+    if not all(type(a) is np.ndarray and not a.dtype.hasobject for _, a in members):
+        return None
+    return container, members
+
+def _ndarray_bytes(value):
+    """
+    Writes ndarray(s) as header, json description (dtype descr, shape, order and
+    offset of each array) and their raw buffers, None if value is not supported
+    """
+    found = _ndarray_members(value)
+    if found is None:
+        return None
+    container, members = found
+
+    header = _pack_header('ndarray')
+    arrays, buffers = [], []
+    for name, array in members:
+        order = 'F' if array.flags.f_contiguous and not array.flags.c_contiguous else 'C'
+        if not (array.flags.c_contiguous or array.flags.f_contiguous):
+            array = np.ascontiguousarray(array)
+        buffers.append(array.reshape(-1, order='A').view(np.uint8))
+        arrays.append({'name': name, 'descr': np.lib.format.dtype_to_descr(array.dtype),
+                       'shape': list(array.shape), 'order': order, 'nbytes': array.nbytes})
+
+    # offsets depend on the size of the description, which depends on the offsets digits:
+    # reserve room for them with a first pass
+    for a in arrays:
+        a['offset'] = 0
+    meta_size = len(json.dumps({'container': container, 'arrays': arrays})) + 16 * len(arrays)
+    offset = _HEADER.size + _NDARRAY_META.size + meta_size
+    for a in arrays:
+        offset += -offset % _NDARRAY_ALIGN
+        a['offset'] = offset
+        offset += a['nbytes']
+    meta = json.dumps({'container': container, 'arrays': arrays}).encode()
+    meta = meta + b' ' * (meta_size - len(meta))
+
+    parts = [header, _NDARRAY_META.pack(meta_size), meta]
+    position = _HEADER.size + _NDARRAY_META.size + meta_size
+    for a, buffer in zip(arrays, buffers):
+        parts.append(b'\0' * (a['offset'] - position))
+        parts.append(buffer)
+        position = a['offset'] + a['nbytes']
+    return b''.join(parts)
+
+def _read_ndarrays(pull_value):
+    """
+    Rebuilds the ndarray(s) written by _ndarray_bytes as views over pull_value,
+    nothing is copied, the arrays are read only
+    """
+    meta_size, = _NDARRAY_META.unpack_from(pull_value, _HEADER.size)
+    start = _HEADER.size + _NDARRAY_META.size
+    meta = json.loads(bytes(memoryview(pull_value)[start:start + meta_size]))
+    members = []
+    for a in meta['arrays']:
+        dtype = np.lib.format.descr_to_dtype(a['descr'])
+        count = a['nbytes'] // dtype.itemsize if dtype.itemsize > 0 else 0
+        array = np.frombuffer(pull_value, dtype=dtype, count=count, offset=a['offset'])
+        members.append((a['name'], array.reshape(a['shape'], order=a['order'])))
+    if meta['container'] == 'array':
+        return members[0][1]
+    if meta['container'] == 'dict':
+        return dict(members)
+    arrays = [array for _, array in members]
+    return tuple(arrays) if meta['container'] == 'tuple' else arrays
+
+# Table of contents length of the composite method
+_COMPOSITE_TOC = struct.Struct('!I')
+
+def _composite_members(value):
+    """
+    (container, [(name, member)]) of a tuple/list/dict holding at least one frame,
+    None otherwise. Members are named by their position, or their key for dicts
+    """
+    if type(value) in (tuple, list) and len(value) > 0:
+        container, members = type(value).__name__, list(enumerate(value))
+    elif type(value) is dict and len(value) > 0 and all(isinstance(k, str) for k in value):
+        container, members = 'dict', list(value.items())
+    else:
+        # subclasses (namedtuples, OrderedDicts, ...) would come back as their base type
+        return None
+    if not any(_is_frame(m) or isinstance(m, (pa.Table, pa.RecordBatch)) for _, m in members):
+        return None
+    return container, members
+
+def _composite_bytes(container, members):
+    """
+    Writes already encoded (name, payload) members as header, table of contents
+    and the payloads one after the other, offsets are counted from the end of the table
+    """
+    toc = {'container': container, 'members': []}
+    offset = 0
+    for name, payload in members:
+        toc['members'].append({'name': name, 'offset': offset, 'nbytes': len(payload)})
+        offset += len(payload)
+    toc = json.dumps(toc).encode()
+    return b''.join([_pack_header('composite'), _COMPOSITE_TOC.pack(len(toc)), toc] + [p for _, p in members])
+
+def _composite_toc(pull_value):
+    """(table of contents, offset of the first member) of a composite payload, None if it is truncated"""
+    if len(pull_value) < _HEADER.size + _COMPOSITE_TOC.size:
+        return None
+    size, = _COMPOSITE_TOC.unpack_from(pull_value, _HEADER.size)
+    start = _HEADER.size + _COMPOSITE_TOC.size
+    if len(pull_value) < start + size:
+        return None
+    return json.loads(bytes(memoryview(pull_value)[start:start + size])), start + size
+
+def _composite_member(toc, name):
+    """Entry of member name (position for tuples/lists) in a table of contents"""
+    for m in toc['members']:
+        if m['name'] == name:
+            return m
+    raise KeyError("No member {} in the cached {}".format(name, toc['container']))
+
+def _slice_bounds(row_slice, num_rows):
+    """
+    Returns the (start, stop) rows selected by row_slice, a slice without step or None
+    """
+    if row_slice is None:
+        return 0, num_rows
+    assert isinstance(row_slice, slice) and row_slice.step in (None, 1), \
+        "[ERROR]: row_slice should be a slice without step"
+    start, stop, _ = row_slice.indices(num_rows)
+    return start, max(start, stop)
+
+def _project(value, columns=None, row_slice=None):
+    """
+    Applies a column projection and a row slice to a polars or pandas frame
+    """
+    if isinstance(value, pl.DataFrame):
+        if columns is not None:
+            value = value.select(columns)
+        start, stop = _slice_bounds(row_slice, value.height)
+        return value.slice(start, stop - start)
+    if isinstance(value, pd.DataFrame):
+        if columns is not None:
+            value = value[columns]
+        start, stop = _slice_bounds(row_slice, len(value))
+        return value.iloc[start:stop]
+    raise ValueError("columns/row_slice only apply to frames, got {}".format(type(value)))
+
+def _is_frame(value):
+    return isinstance(value, (pl.DataFrame, pl.Series, pl.LazyFrame, pd.DataFrame, pd.Series))
+
+def _estimate_nbytes(value, default):
+    """
+    Estimates the in-memory size of a deserialized value, falls back to
+    default (the size of its payload) for types without a cheap estimate
+    """
+    if isinstance(value, (pl.DataFrame, pl.Series)):
+        return value.estimated_size()
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, (pa.Table, pa.RecordBatch, pa.Array, pa.ChunkedArray, np.ndarray)):
+        return value.nbytes
+    if isinstance(value, (tuple, list, dict)):
+        # composite values weigh what their members do
+        members = value.values() if isinstance(value, dict) else value
+        total = sum(_estimate_nbytes(m, 0) for m in members)
+        return total if total > 0 else default
+    return default
+
+
+# Argument fingerprints: a content hash of the arguments of a cached call, arrow and
+# numpy buffers are hashed directly instead of going through a (truncated) repr
+def _new_hasher():
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+def _feed_buffer(buffer, h, sample_bytes=None):
+    """
+    Hashes a raw buffer, above sample_bytes only 16 evenly spaced blocks
+    (first and last included) of sample_bytes/16 bytes are hashed
+    """
+    view = memoryview(buffer).cast('B')
+    n = len(view)
+    h.update(struct.pack('!q', n))
+    if sample_bytes is None or n <= sample_bytes:
+        h.update(view)
+        return
+    block = max(sample_bytes // 16, 1)
+    for i in range(16):
+        start = (n - block) * i // 15
+        h.update(view[start:start + block])
+
+def _feed_ndarray(value, h, sample_bytes):
+    h.update(f"{value.dtype.str}{value.shape}".encode())
+    if isinstance(value, np.ma.MaskedArray):
+        # the type is already fed, masked entries must change the fingerprint too
+        _feed_ndarray(np.ma.getmaskarray(value), h, sample_bytes)
+        value = value.data
+    if value.dtype.hasobject:
+        for item in value.ravel(order='K').tolist():
+            _feed(item, h, sample_bytes)
+        return
+    _feed_buffer(np.ascontiguousarray(value).reshape(-1).view(np.uint8), h, sample_bytes)
+
+def _feed_arrow_array(value, h, sample_bytes):
+    # chunking and slicing are part of the fingerprint, equal tables laid out
+    # differently get different keys (a miss, never a wrong hit)
+    h.update(struct.pack('!qqq', len(value), value.offset, value.null_count))
+    for buffer in value.buffers():
+        if buffer is None:
+            h.update(b'\0')
+        else:
+            _feed_buffer(buffer, h, sample_bytes)
+    _feed_arrow_dictionaries(value, h, sample_bytes)
+
+def _feed_arrow_dictionaries(value, h, sample_bytes):
+    """
+    The values of dictionary arrays (polars Categorical/Enum) are not part of
+    buffers() nor of the schema, they are hashed here, nested ones included
+    """
+    t = value.type
+    if pa.types.is_dictionary(t):
+        _feed_arrow_array(value.dictionary, h, sample_bytes)
+    elif pa.types.is_struct(t):
+        for i in range(t.num_fields):
+            _feed_arrow_dictionaries(value.field(i), h, sample_bytes)
+    elif pa.types.is_map(t):
+        _feed_arrow_dictionaries(value.keys, h, sample_bytes)
+        _feed_arrow_dictionaries(value.items, h, sample_bytes)
+    elif pa.types.is_list(t) or pa.types.is_large_list(t) or pa.types.is_fixed_size_list(t):
+        _feed_arrow_dictionaries(value.values, h, sample_bytes)
+
+def _feed_arrow(value, h, sample_bytes):
+    if isinstance(value, (pa.Table, pa.RecordBatch)):
+        h.update(value.schema.serialize())
+        columns = value.columns
+    else:
+        h.update(str(value.type).encode())
+        columns = [value]
+    for column in columns:
+        for chunk in (column.chunks if isinstance(column, pa.ChunkedArray) else [column]):
+            _feed_arrow_array(chunk, h, sample_bytes)
+
+def _feed_polars(value, h, sample_bytes):
+    if isinstance(value, pl.LazyFrame):
+        # the serialized plan embeds the in-memory frames it scans
+        plan = value.serialize()
+        h.update(plan.encode() if isinstance(plan, str) else plan)
+        return
+    _feed_arrow(value.to_arrow(), h, sample_bytes)
+
+def _plan_frames(lazy_frame):
+    """
+    In-memory frames scanned by a LazyFrame, taken from its plan without copying them
+    through the plan traversal polars offers to other engines (LazyFrame._ldf.visit()).
+    None if this polars version does not have it
+    """
+    visit = getattr(getattr(lazy_frame, '_ldf', None), 'visit', None)
+    if visit is None:
+        return None
+    traverser = visit()
+    frames = []
+    pending = [traverser.get_node()]
+    while len(pending) > 0:
+        traverser.set_node(pending.pop())
+        node = traverser.view_current_node()
+        if type(node).__name__ == 'DataFrameScan':
+            frames.append(pl.DataFrame._from_pydf(node.df))
+        pending.extend(reversed(traverser.get_inputs()))
+    return frames
+
+def _feed_pandas(value, h, sample_bytes):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr([(str(c), str(t)) for c, t in value.dtypes.items()]).encode())
+    else:
+        h.update(f"{value.name}{value.dtype}".encode())
+    try:
+        rows = pd.util.hash_pandas_object(value, index=True).to_numpy()
+    except TypeError:
+        # unhashable cells, e.g. lists
+        h.update(pickle.dumps(value))
+        return
+    _feed_buffer(rows.view(np.uint8), h, sample_bytes)
+
+def _feed_container(value, h, sample_bytes):
+    if isinstance(value, dict):
+        items = sorted((_fingerprint(k, sample_bytes), _fingerprint(v, sample_bytes)) for k, v in value.items())
+        h.update(repr(items).encode())
+    elif isinstance(value, (set, frozenset)):
+        h.update(repr(sorted(_fingerprint(v, sample_bytes) for v in value)).encode())
+    else:
+        h.update(struct.pack('!q', len(value)))
+        for item in value:
+            _feed(item, h, sample_bytes)
+
+def _feed_scalar(value, h, sample_bytes):
+    h.update(value if isinstance(value, bytes) else repr(value).encode())
+
+# (type, hasher(value, h, sample_bytes)) pairs, the first matching type is used,
+# see RolarsCache.register_hasher for adding hashers of other types
+_HASHERS = [
+    ((str, bytes, int, float, bool, type(None)), _feed_scalar),
+    (np.ndarray, _feed_ndarray),
+    ((pa.Table, pa.RecordBatch, pa.ChunkedArray, pa.Array), _feed_arrow),
+    ((pl.DataFrame, pl.Series, pl.LazyFrame), _feed_polars),
+    ((pd.DataFrame, pd.Series), _feed_pandas),
+    ((list, tuple, dict, set, frozenset), _feed_container),
+]
+
+def _feed(value, h, sample_bytes=None):
+    # the type is part of the fingerprint, 1, 1.0, True and '1' differ
+    h.update(f"{type(value).__module__}.{type(value).__qualname__}\0".encode())
+    for types, hasher in _HASHERS:
+        if isinstance(value, types):
+            hasher(value, h, sample_bytes)
+            return
+    h.update(str(value).encode())
+
+def _fingerprint(value, sample_bytes=None):
+    """Hex digest of the content of value"""
+    h = _new_hasher()
+    _feed(value, h, sample_bytes)
+    return h.hexdigest()
+
+def _is_plain(value, depth=0):
+    """
+    Scalars and small containers of scalars stay readable in the keys, only the
+    exact builtin types whose repr tells them apart (subclasses may override it)
+    """
+    if type(value) in (str, int, float, bool, type(None)):
+        return type(value) is not str or len(value) <= 128
+    if type(value) in (list, tuple) and depth < 2 and len(value) <= 16:
+        return all(_is_plain(v, depth + 1) for v in value)
+    return False
+
+def _warm_run(func, calls):
+    """Runs func over (args, kwargs) calls, returns (True, value) or (False, error) per call"""
+    results = []
+    for args, kwargs in calls:
+        try:
+            results.append((True, func(*args, **kwargs)))
+        except Exception as error:
+            results.append((False, repr(error)))
+    return results
+
+def _warm_worker(module, qualname, calls):
+    """Process pool side of RolarsCache.warm, runs the undecorated function found at module.qualname"""
+    func = importlib.import_module(module)
+    for name in qualname.split('.'):
+        func = getattr(func, name)
+    return _warm_run(inspect.unwrap(func), calls)
+
+def _range_partition(segments, lo, hi):
+    """
+    Splits [lo, hi) into consecutive pieces, each served by one of the cached
+    segments (id, seg_lo, seg_hi) or by None where no segment covers it (a gap).
+    Overlapping segments (left by concurrent writers) serve disjoint pieces,
+    so no row is returned twice
+    """
+    pieces = []
+    cursor = lo
+    for segment_id, seg_lo, seg_hi in sorted(segments, key=lambda s: (s[1], s[2])):
+        if seg_hi <= cursor or seg_lo >= hi:
+            continue
+        if seg_lo > cursor:
+            pieces.append((None, cursor, seg_lo))
+            cursor = seg_lo
+        piece_hi = min(seg_hi, hi)
+        pieces.append((segment_id, cursor, piece_hi))
+        cursor = piece_hi
+        if cursor >= hi:
+            break
+    if cursor < hi:
+        pieces.append((None, cursor, hi))
+    return pieces
+
+def _range_filter(frame, index, lo, hi):
+    """Rows of frame with lo <= index < hi, index is a column (or the index name of pandas frames)"""
+    if isinstance(frame, pd.DataFrame):
+        values = frame[index] if index in frame.columns else frame.index.get_level_values(index)
+        return frame[(values >= lo) & (values < hi)]
+    return frame.filter((pl.col(index) >= lo) & (pl.col(index) < hi))
+
+def _range_concat(frames, index):
+    """Concatenates the pieces of a range and sorts them on the index column"""
+    if isinstance(frames[0], pd.DataFrame):
+        frame = pd.concat(frames)
+        if index in frame.columns:
+            return frame.sort_values(index, kind='stable')
+        return frame.sort_index(level=index, kind='stable', sort_remaining=False)
+    return pl.concat(frames, how='vertical_relaxed').sort(index, maintain_order=True)
+
+# File scans of polars plans, e.g. "Parquet SCAN [data/a.parquet]"
+_PLAN_SCANS = re.compile(r'SCAN[^\[\n]*\[([^\]\n]*)\]')
+
+def _plan_sources(plan):
+    """
+    (path, mtime, size) of the local files scanned by an explained plan, glob patterns are expanded
+    Returns:
+    --------
+        (list of sources, bool), False if some sources could not be resolved: remote
+        scans or the ones polars leaves out of the plan ("... n other sources")
+    """
+    sources = []
+    complete = True
+    for scanned in _PLAN_SCANS.findall(plan):
+        for path in scanned.split(','):
+            path = path.strip().strip('"\'')
+            paths = sorted(glob.glob(path)) if any(c in path for c in '*?') else [path]
+            for p in paths:
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    complete = False
+                    continue
+                sources.append((p, st.st_mtime_ns, st.st_size))
+    return sources, complete
+
+@functools.lru_cache(maxsize=1024)
+def _signature_of(func):
+    return inspect.signature(func)
+
+def _normalized_arguments(func, args, kwargs):
+    """
+    Binds a call to the signature of func so that f(1, b=2), f(a=1, b=2) and f(1)
+    (with b=2 as default) give the same (args, sorted kwargs items)
+    """
+    try:
+        bound = _signature_of(func).bind(*args, **kwargs)
+    except (TypeError, ValueError):
+        # builtins without signature, unhashable callables or calls that do not match
+        return tuple(args), sorted(kwargs.items())
+    bound.apply_defaults()
+    return bound.args, sorted(bound.kwargs.items())
+
+
+def _flush_at_exit(cache_ref):
+    """atexit hook of write-behind caches, the weak reference lets the cache be collected"""
+    cache = cache_ref()
+    if cache is not None:
+        cache.flush()
+
+
+class LocalTier(object):
+    """
+    In-process LRU of already deserialized values sitting in front of redis,
+    bounded by the total (estimated) bytes of its entries rather than their count.
+    Values are shared between callers, they should be treated as read only.
+
+    Every invalidation is numbered. A reader takes token() before its GET and hands
+    it to put(), which drops the fill if the key was invalidated in between: the bytes
+    read may predate the write that invalidation announced
+    """
+
+    # invalidations remembered per key, older ones only move the floor
+    max_invalidations = 4096
+
+    def __init__(self, max_bytes, ttl=None):
+        """
+        Parameters:
+        -----------
+            max_bytes=int(), budget of the tier
+            ttl=float(), default seconds an entry stays valid, None for no expiry
+        """
+        assert isinstance(max_bytes, int) and max_bytes > 0, "[ERROR]: max_bytes should be a positive int"
+        assert ttl is None or ttl > 0, "[ERROR]: ttl should be positive or None"
+        self.max_bytes=max_bytes
+        self.ttl=ttl
+        self.nbytes=0
+        # key -> (value, nbytes, expires_at), ordered from least to most recently used
+        self._entries=collections.OrderedDict()
+        self._lock=threading.Lock()
+        # number of the last invalidation, key -> number of its last invalidation,
+        # and the number below which the per key history was dropped
+        self._sequence=0
+        self._invalidated=collections.OrderedDict()
+        self._floor=0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the value of key or _MISSING, refreshing its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, nbytes, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def token(self):
+        """Number of the last invalidation, to be taken before reading the value to put"""
+        with self._lock:
+            return self._sequence
+
+    def put(self, key, value, nbytes, ttl=None, token=None):
+        """
+        Stores value under key, evicting least recently used entries to stay in budget.
+        ttl is the expiry of the entry in redis, the entry lives no longer than it nor than the tier ttl.
+        With a token, nothing is stored if key was invalidated since the token was taken
+        """
+        ttl = min(t for t in (self.ttl, ttl, float('inf')) if t is not None)
+        ttl = None if ttl == float('inf') else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if token is not None and (token < self._floor or self._invalidated.get(key, 0) > token):
+                # raced by an invalidation, value may be stale
+                return
+            self._pop(key)
+            if nbytes > self.max_bytes:
+                # would evict everything else and still not fit
+                return
+            self._entries[key] = (value, nbytes, expires_at)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, keys):
+        with self._lock:
+            self._sequence += 1
+            for key in keys:
+                self._pop(key)
+                self._invalidated[key] = self._sequence
+                self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_invalidations:
+                self._floor = self._invalidated.popitem(last=False)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes=0
+            self._sequence += 1
+            self._floor = self._sequence
+            self._invalidated.clear()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+
+class DiskTier(object):
+    """
+    Directory of arrow IPC (feather v2) files holding large frames, read back through
+    pa.memory_map so that readers share the pages of the OS page cache instead of
+    copying the data. Files are named by a hash of their key, any process of the host
+    finds them, also after a restart of redis. Bounded by max_bytes, the least
+    recently read files are removed first
+    """
+    # schema metadata written in the files
+    _KEY = b'rolars_cache.key'
+    _KIND = b'rolars_cache.kind'
+    _EXPIRES = b'rolars_cache.expires'
+
+    def __init__(self, directory, max_bytes=None):
+        """
+        Parameters:
+        -----------
+            directory=str(), created if missing
+            max_bytes=int(), total size of the files, None for no limit
+        """
+        assert max_bytes is None or (isinstance(max_bytes, int) and max_bytes > 0), \
+            "[ERROR]: max_bytes should be a positive int or None"
+        os.makedirs(directory, exist_ok=True)
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # approximate total, other processes write to the directory too
+        self.nbytes = sum(size for _, _, size in self._files())
+
+    def _files(self):
+        """(path, mtime, size) of the files of the directory"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.arrow'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, st.st_mtime, st.st_size))
+        return files
+
+    def path_of(self, key):
+        return os.path.join(self.directory, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '.arrow')
+
+    def put(self, key, arrow_table, kind, ttl=None):
+        """Writes arrow_table as the file of key, uncompressed so that it can be mapped, returns (path, nbytes)"""
+        path = self.path_of(key)
+        metadata = dict(arrow_table.schema.metadata or {})
+        metadata[DiskTier._KEY] = key.encode()
+        metadata[DiskTier._KIND] = kind.encode()
+        if ttl is not None:
+            metadata[DiskTier._EXPIRES] = repr(time.time() + ttl).encode()
+        arrow_table = arrow_table.replace_schema_metadata(metadata)
+
+        # written aside and renamed, readers never see a partial file
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with pa.OSFile(tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        os.replace(tmp, path)
+        nbytes = os.path.getsize(path)
+
+        with self._lock:
+            self.nbytes += nbytes
+            over = self.max_bytes is not None and self.nbytes > self.max_bytes
+        if over:
+            self.cleanup()
+        return path, nbytes
+
+    @staticmethod
+    def read(path):
+        """
+        Memory maps the file at path, returns (arrow table, kind) or None if it is gone.
+        Reading a file marks it as recently used
+        """
+        try:
+            reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        except (OSError, pa.ArrowInvalid):
+            return None
+        table = reader.read_all()
+        metadata = dict(table.schema.metadata or {})
+        kind = metadata.pop(DiskTier._KIND, b'object').decode()
+        for k in (DiskTier._KEY, DiskTier._EXPIRES):
+            metadata.pop(k, None)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return table.replace_schema_metadata(metadata or None), kind
+
+    def lookup(self, key):
+        """
+        Returns (remaining ttl or None if it never expires, kind) of the file
+        of key, or None if there is no unexpired file for key
+        """
+        path = self.path_of(key)
+        try:
+            metadata = pa.ipc.open_file(pa.memory_map(path, 'r')).schema.metadata or {}
+        except (OSError, pa.ArrowInvalid):
+            return None
+        if metadata.get(DiskTier._KEY) != key.encode():
+            return None
+        kind = metadata.get(DiskTier._KIND, b'object').decode()
+        if DiskTier._EXPIRES not in metadata:
+            return None, kind
+        remaining = int(float(metadata[DiskTier._EXPIRES]) - time.time())
+        if remaining <= 0:
+            self.remove(key)
+            return None
+        return remaining, kind
+
+    def remove(self, key):
+        path = self.path_of(key)
+        try:
+            nbytes = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.nbytes -= nbytes
+
+    def cleanup(self):
+        """Removes the least recently read files until the directory fits in max_bytes"""
+        files = sorted(self._files(), key=lambda f: f[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self.nbytes = total
+
+    def pointer(self, path, nbytes, kind):
+        """Value stored in redis in place of a frame kept on disk"""
+        return _pack_header('disk', kind=kind) + json.dumps({'host': _HOSTNAME, 'path': path, 'nbytes': nbytes}).encode()
+
+
+class ShardedRedis(object):
+    """
+    Client side sharding of keys over several redis nodes, exposing the subset of
+    the redis.Redis API used by RolarsCache so that it can be passed in its place.
+    Keys are placed on a consistent hash ring (adding a node only moves ~1/N of
+    the keys), as in Redis Cluster only the {hash tag} of a key is hashed if it has one.
+    Each node keeps its own connection pool and batched commands (mget, delete,
+    pipelines) are sent to the nodes in parallel. Pub/sub goes through the first node.
+
+    Usage (locally: redis-server --port 7001 & redis-server --port 7002 & ...):
+        shards = ShardedRedis(['redis://localhost:7001', 'redis://localhost:7002'])
+        cache = RolarsCache(shards)
+    """
+
+    def __init__(self, nodes, replicas=160, max_connections=None):
+        """
+        Parameters:
+        -----------
+            nodes=list of redis.Redis objects or redis:// urls
+            replicas=int(), points of each node on the ring
+            max_connections=int(), pool size of the nodes given as urls
+        """
+        assert len(nodes) > 0, "[ERROR]: nodes should not be empty"
+        assert isinstance(replicas, int) and replicas > 0, "[ERROR]: replicas should be a positive int"
+        self.nodes = []
+        for node in nodes:
+            if isinstance(node, str):
+                node = redis.Redis(connection_pool=redis.ConnectionPool.from_url(node, max_connections=max_connections))
+            if not isinstance(node, redis.client.Redis):
+                raise AttributeError("Did not recieve an Redis Object or url, instead received {}".format(type(node)))
+            self.nodes.append(node)
+
+        ring = []
+        for i, node in enumerate(self.nodes):
+            name = self._node_name(node, i)
+            for r in range(replicas):
+                ring.append((self._hash(f"{name}#{r}".encode()), i))
+        ring.sort()
+        self._ring_points = [p for p, _ in ring]
+        self._ring_nodes = [i for _, i in ring]
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(self.nodes), thread_name_prefix='ShardedRedis')
 
+    @staticmethod
+    def _node_name(node, i):
+        kwargs = node.connection_pool.connection_kwargs
+        if 'host' in kwargs:
+            return f"{kwargs['host']}:{kwargs.get('port', 6379)}/{kwargs.get('db', 0)}"
+        return str(i)
+
+    @staticmethod
+    def _hash(data):
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+    def node_index(self, key):
+        """Index in nodes of the node holding key"""
+        key = key.encode() if isinstance(key, str) else bytes(key)
+        start = key.find(b'{')
+        if start >= 0:
+            end = key.find(b'}', start + 1)
+            if end > start + 1:
+                key = key[start + 1:end]
+        i = bisect.bisect(self._ring_points, self._hash(key))
+        return self._ring_nodes[i % len(self._ring_nodes)]
+
+    def node_for(self, key):
+        return self.nodes[self.node_index(key)]
+
+    def _group(self, keys):
+        """node index -> [(position in keys, key)]"""
+        groups = collections.defaultdict(list)
+        for position, k in enumerate(keys):
+            groups[self.node_index(k)].append((position, k))
+        return groups
+
+    def _fan_out(self, calls):
+        """Runs {node index: function(node)} in parallel, returns {node index: result}"""
+        if len(calls) == 1:
+            (i, call), = calls.items()
+            return {i: call(self.nodes[i])}
+        futures = {i: self._executor.submit(call, self.nodes[i]) for i, call in calls.items()}
+        return {i: f.result() for i, f in futures.items()}
+
+    def __getattr__(self, name):
+        # single key commands (get, set, getrange, hgetall, zrange, ...) go to the node of their key
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def command(key, *args, **kwargs):
+            return getattr(self.node_for(key), name)(key, *args, **kwargs)
+        return command
+
+    def mget(self, keys, *args):
+        keys = list(keys) + list(args) if not isinstance(keys, (str, bytes)) else [keys] + list(args)
+        groups = self._group(keys)
+        results = self._fan_out({i: (lambda node, g=g: node.mget([k for _, k in g])) for i, g in groups.items()})
+        values = [None] * len(keys)
+        for i, g in groups.items():
+            for (position, _), value in zip(g, results[i]):
+                values[position] = value
+        return values
+
+    def delete(self, *keys):
+        groups = self._group(keys)
+        return sum(self._fan_out({i: (lambda node, g=g: node.delete(*[k for _, k in g])) for i, g in groups.items()}).values())
+
+    def exists(self, *keys):
+        groups = self._group(keys)
+        return sum(self._fan_out({i: (lambda node, g=g: node.exists(*[k for _, k in g])) for i, g in groups.items()}).values())
+
+    def publish(self, channel, message):
+        return self.nodes[0].publish(channel, message)
+
+    def pubsub(self, **kwargs):
+        return self.nodes[0].pubsub(**kwargs)
+
+    def scan_iter(self, match=None, count=None):
+        for node in self.nodes:
+            for k in node.scan_iter(match=match, count=count):
+                yield k
+
+    def register_script(self, script):
+        return ShardedScript(self, script)
+
+    def pipeline(self, transaction=False):
+        assert transaction == False, "[ERROR]: transactions can not span several nodes"
+        return ShardedPipeline(self)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for node in self.nodes:
+            node.close()
+
+
+class ShardedScript(object):
+    """Lua script of a ShardedRedis, run on the node of its first key (all its keys should share a node)"""
+
+    def __init__(self, shards, script):
+        self.shards = shards
+        self.scripts = [node.register_script(script) for node in shards.nodes]
+
+    def __call__(self, keys=[], args=[], client=None):
+        i = self.shards.node_index(keys[0]) if len(keys) > 0 else 0
+        if isinstance(client, ShardedPipeline):
+            return client._queue_script(i, self.scripts[i], keys, args)
+        return self.scripts[i](keys=keys, args=args)
+
+
+class ShardedPipeline(object):
+    """
+    Pipeline of a ShardedRedis: commands are queued on a pipeline per node, the
+    node pipelines are executed in parallel and the results put back in command order
+    """
+
+    def __init__(self, shards):
+        self.shards = shards
+        self.pipes = {}
+        # per command: (function(results of the node pipelines) -> result)
+        self.commands = []
+
+    def _pipe(self, i):
+        if i not in self.pipes:
+            self.pipes[i] = self.shards.nodes[i].pipeline(transaction=False)
+        return self.pipes[i]
+
+    def _queue(self, i, name, *args, **kwargs):
+        pipe = self._pipe(i)
+        position = len(pipe.command_stack)
+        getattr(pipe, name)(*args, **kwargs)
+        return (i, position)
+
+    def _queue_script(self, i, script, keys, args):
+        pipe = self._pipe(i)
+        position = len(pipe.command_stack)
+        script(keys=keys, args=args, client=pipe)
+        self.commands.append(lambda results, i=i, position=position: results[i][position])
+        return self
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def command(key, *args, **kwargs):
+            i, position = self._queue(self.shards.node_index(key), name, key, *args, **kwargs)
+            self.commands.append(lambda results: results[i][position])
+            return self
+        return command
+
+    def _multi_key(self, name, keys, combine):
+        queued = [self._queue(i, name, *[k for _, k in g]) for i, g in self.shards._group(keys).items()]
+        self.commands.append(lambda results: combine([results[i][p] for i, p in queued]))
+        return self
+
+    def delete(self, *keys):
+        return self._multi_key('delete', keys, sum)
+
+    def exists(self, *keys):
+        return self._multi_key('exists', keys, sum)
+
+    def mget(self, keys, *args):
+        keys = list(keys) + list(args) if not isinstance(keys, (str, bytes)) else [keys] + list(args)
+        groups = self.shards._group(keys)
+        queued = [(g, self._queue(i, 'mget', [k for _, k in g])) for i, g in groups.items()]
+
+        def combine(results):
+            values = [None] * len(keys)
+            for g, (i, p) in queued:
+                for (position, _), value in zip(g, results[i][p]):
+                    values[position] = value
+            return values
+        self.commands.append(combine)
+        return self
+
+    def publish(self, channel, message):
+        i, position = self._queue(0, 'publish', channel, message)
+        self.commands.append(lambda results: results[i][position])
+        return self
+
+    def execute(self):
+        pipes = self.pipes
+        results = self.shards._fan_out({i: (lambda node, pipe=pipe: pipe.execute()) for i, pipe in pipes.items()})
+        values = [command(results) for command in self.commands]
+        self.pipes = {}
+        self.commands = []
+        return values
+
+    def __len__(self):
+        return len(self.commands)
+
+
+class ClusterPipeline(object):
+    """
+    Non transactional pipeline of a redis.cluster.RedisCluster. The cluster pipelines of
+    redis-py refuse PUBLISH and EVALSHA, those are sent through the client once the
+    pipeline has run (the scripts keep all their KEYS in one slot with a {hash tag}),
+    and the results are put back in command order
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.pipe = cluster.pipeline(transaction=False)
+        self.queued = 0
+        # per command: (function(results of the cluster pipeline) -> result)
+        self.commands = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def command(*args, **kwargs):
+            getattr(self.pipe, name)(*args, **kwargs)
+            position = self.queued
+            self.queued += 1
+            self.commands.append(lambda results: results[position])
+            return self
+        return command
+
+    def publish(self, channel, message):
+        self.commands.append(lambda results: self.cluster.publish(channel, message))
+        return self
+
+    def evalsha(self, sha, numkeys, *args):
+        # called by redis.commands.core.Script with this pipeline as client
+        self.commands.append(lambda results: self._evalsha(sha, numkeys, args))
+        return self
+
+    def _evalsha(self, sha, numkeys, args):
+        try:
+            return self.cluster.evalsha(sha, numkeys, *args)
+        except redis.exceptions.NoScriptError:
+            self.cluster.script_load(_LUA_SOURCES[sha])
+            return self.cluster.evalsha(sha, numkeys, *args)
+
+    def execute(self):
+        results = self.pipe.execute() if self.queued > 0 else []
+        values = [command(results) for command in self.commands]
+        self.pipe = self.cluster.pipeline(transaction=False)
+        self.queued = 0
+        self.commands = []
+        return values
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.pipes = {}
+        self.commands = []
+
+
+class CacheStats(object):
+    """
+    Thread safe counters, latency histograms and per function hit/miss counts of a
+    RolarsCache, see RolarsCache.stats() and RolarsCache.prometheus_text()
+    """
+
+    # upper bounds in seconds of the latency histogram buckets
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock=threading.Lock()
+        self.counters=collections.Counter()
+        self.functions=collections.defaultdict(collections.Counter)
+        # name -> [count per bucket (last one is +Inf), sum of observations]
+        self.histograms={}
+
+    def count(self, name, n=1, function=None):
+        with self._lock:
+            self.counters[name] += n
+            if function is not None:
+                self.functions[function][name] += n
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = [[0] * (len(CacheStats.BUCKETS) + 1), 0.0]
+            i = 0
+            while i < len(CacheStats.BUCKETS) and seconds > CacheStats.BUCKETS[i]:
+                i += 1
+            histogram[0][i] += 1
+            histogram[1] += seconds
+
+    @staticmethod
+    def _quantile(buckets, q):
+        """Upper bound of the bucket holding the q quantile"""
+        total = sum(buckets)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, n in zip(CacheStats.BUCKETS + (math.inf,), buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            functions = {f: dict(c) for f, c in self.functions.items()}
+            histograms = {name: (list(h[0]), h[1]) for name, h in self.histograms.items()}
+
+        def ratio(c):
+            looked_up = c.get('hits', 0) + c.get('misses', 0)
+            return None if looked_up == 0 else c.get('hits', 0) / looked_up
+
+        return {
+            'counters': counters,
+            'functions': {f: dict(c, hit_ratio=ratio(c)) for f, c in functions.items()},
+            'histograms': {name: {'count': sum(buckets), 'sum': total,
+                                  'mean': total / sum(buckets) if sum(buckets) > 0 else None,
+                                  'p50': CacheStats._quantile(buckets, 0.5),
+                                  'p99': CacheStats._quantile(buckets, 0.99),
+                                  'buckets': dict(zip([str(b) for b in CacheStats.BUCKETS] + ['+Inf'], buckets))}
+                           for name, (buckets, total) in histograms.items()},
+        }
+
+    def prometheus(self, prefix='rolars_cache'):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+
+        names = sorted(set(n for c in snapshot['functions'].values() for n in c if n != 'hit_ratio'))
+        for name in names:
+            lines.append(f"# TYPE {prefix}_function_{name}_total counter")
+            for function, c in sorted(snapshot['functions'].items()):
+                lines.append(f'{prefix}_function_{name}_total{{function="{function}"}} {c.get(name, 0)}')
+
+        for name, h in sorted(snapshot['histograms'].items()):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            cumulative = 0
+            for bound, n in h['buckets'].items():
+                cumulative += n
+                lines.append(f'{prefix}_{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{prefix}_{name}_sum {h['sum']}")
+            lines.append(f"{prefix}_{name}_count {h['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class _CacheCore(object):
+    """
+    Redis independent part of the caches: key generation, encoding and decoding
+    of payloads, compression/expiry settings and instrumentation. It does no round
+    trip itself, RolarsCache extends it with the blocking redis calls and
+    AsyncRolarsCache holds one next to its redis.asyncio client
+    """
+
+    _ACCEPTABLE_METHODS = ['pickle', 'pyarrow', 'json']
+    _ACCEPTABLE_COMPRESSIONS = ['none', 'lz4', 'zstd']
+
+    def __init__(self, key=None, hash_keys=False, max_workers=None, lock_timeout=30.0, lock_wait=10.0,
+                 lock_poll=0.05, compression='none', compression_level=None, compression_min_bytes=65536,
+                 track_keys=False, ttl=None, sliding=False, fingerprint_sample_bytes=None):
         # leading for reference in db, can be used to identify the caching object in redis
         self.leading_key = 'RolarsCache'
 
@@ -45,13 +1366,77 @@ class RolarsCache(object):
 
         assert isinstance(hash_keys, bool), "[ERROR]: hash_keys should be a bool"
         self.hash_keys=hash_keys
-        
-        self.refresh()
 
+        # Arguments that are not plain scalars enter the keys as a hash of their content,
+        # buffers larger than fingerprint_sample_bytes are only sampled (faster, but two
+        # inputs differing only outside the sampled blocks would share a key)
+        assert fingerprint_sample_bytes is None or \
+            (isinstance(fingerprint_sample_bytes, int) and fingerprint_sample_bytes >= 16), \
+            "[ERROR]: fingerprint_sample_bytes should be an int >= 16 or None"
+        self.fingerprint_sample_bytes=fingerprint_sample_bytes
+
+        # Values carry their serialization method in a header, so the local key -> method
+        # map is only kept (and filled by a keyspace scan at startup) if track_keys is set
+        assert isinstance(track_keys, bool), "[ERROR]: track_keys should be a bool"
+        self.track_keys=track_keys
+        self.keys={}
+
+        # Thread pool used to (de)serialize the payloads of bulk requests,
+        # created lazily on the first get_many/post_many with more than one key
+        assert max_workers is None or (isinstance(max_workers, int) and max_workers > 0), \
+            "[ERROR]: max_workers should be a positive int or None"
+        self.max_workers=max_workers
+        self._executor=None
+
+        # Single-flight settings for the decorators: on a miss one worker takes a
+        # SET NX PX lock for lock_timeout seconds and computes the value, the others
+        # poll every lock_poll seconds for at most lock_wait seconds before computing it themselves
+        assert lock_timeout > 0 and lock_wait >= 0 and lock_poll > 0, \
+            "[ERROR]: lock_timeout and lock_poll should be positive, lock_wait non negative"
+        self.lock_timeout=lock_timeout
+        self.lock_wait=lock_wait
+        self.lock_poll=lock_poll
+
+        # hit/miss/wait counters, byte counters and latency histograms, see stats(),
+        # hooks are called with (event, info) for each of them, see add_hook()
+        self._stats=CacheStats()
+        self._hooks=[]
+
+        # Arrow IPC buffer compression of the pyarrow method, frames smaller than
+        # compression_min_bytes are written uncompressed. Readers need no setting,
+        # the codec is recorded in the IPC messages themselves
+        self.codec=self._codec(compression, compression_level)
+        assert isinstance(compression_min_bytes, int) and compression_min_bytes >= 0, \
+            "[ERROR]: compression_min_bytes should be a non negative int"
+        self.compression_min_bytes=compression_min_bytes
+
+        # Default expiry in seconds of the entries (None never expires), with sliding
+        # expiration every hit through the decorators pushes the expiry back by ttl
+        assert ttl is None or (isinstance(ttl, int) and ttl > 0), "[ERROR]: ttl should be a positive int or None"
+        assert isinstance(sliding, bool), "[ERROR]: sliding should be a bool"
+        self.ttl=ttl
+        self.sliding=sliding
+
+        # Writes are announced on this channel so that other processes can drop
+        # their local copies, messages carry the id of the writing instance
+        self.invalidation_channel=f"{self.leading_key}:invalidate"
+        self._instance_id=uuid.uuid4().hex
+
+    @staticmethod
+    def _parse_scanned_key(k):
+        """Returns (key, method) of a scanned key or None if it does not follow the key format"""
+        key_str = k.decode() if isinstance(k, bytes) else k
+        # Key format: RolarsCache-{method}-{func_name}|...
+        parts = key_str.split('-')
+        if len(parts) >= 3:
+            method = parts[1]  # Extract method (pickle, pyarrow, json)
+            return (key_str, method)
+        return None
 
     #------------------------------------------------------------------------------------
-    # Internal Methods for mananging posting and getting from redis
+    # Keys
     #------------------------------------------------------------------------------------
+
     @staticmethod
     def _hashing_key(*args):
         """
@@ -68,15 +1453,15 @@ class RolarsCache(object):
         values=[]
         for i in args:
             if isinstance(i, list):
+                list_values=[]
                 for j in i:
-                    list_values=[]
                     # Checks if value in list is none
                     if j is not None:
                         # Adds to cleaned list values
                         list_values.append(str(j))
                 # Sort inner list before adding to params values
                 if len(list_values)>0:
-                    sorted(list_values)
+                    list_values=sorted(list_values)
                     for x in list_values:
                         values.append(x)
             else:
@@ -89,32 +1474,62 @@ class RolarsCache(object):
         generated_key=generated_key.hexdigest()
         return generated_key
 
+    @staticmethod
+    def register_hasher(types, hasher):
+        """
+        Registers how arguments of the given type(s) are fingerprinted in the keys,
+        registered hashers take precedence over the built in ones
+        Parameters:
+        -----------
+            types=type or tuple of types
+            hasher=python function, hasher(value) -> bytes or str, equal for equal values
+        """
+        assert callable(hasher), "[ERROR]: hasher should be callable"
+
+        def feed(value, h, sample_bytes):
+            content = hasher(value)
+            h.update(content.encode() if isinstance(content, str) else content)
+
+        _HASHERS.insert(0, (types, feed))
+
+    def _key_part(self, value):
+        """
+        Readable repr of plain arguments, content fingerprint of the others.
+        repr quotes and escapes strings, so 1 and '1', None and 'None' or
+        'a|b' and 'a', 'b' give different keys
+        """
+        if _is_plain(value):
+            return repr(value)
+        return '#' + _fingerprint(value, self.fingerprint_sample_bytes)
 
     def key_generator(self, func, method, *args, **kwargs):
         """
         Generates a key for redis to cache based on the function
-        it will decorate as well as the inputs to that function
+        it will decorate as well as the inputs to that function.
+        Arguments are bound to the signature of func, so keyword order and
+        passing a default explicitly do not change the key
         Returns:
             str()
         """
+        start = time.perf_counter()
         leading = f"{self.leading_key}-{method}-{func.__name__}"
+        args, kwargs = _normalized_arguments(func, args, kwargs)
 
         params=[]
-        # Cleaning up args
-        if len(args) > 0:
-            args_given = [str(i) for i in args]
+        # Cleaning up args, arguments other than plain scalars enter as a hash of their content
+        if len(args) > 0 and self.hash_keys==False:
+            args_given = [self._key_part(i) for i in args]
             args_given = '|'.join(args_given)
             params.append(args_given)
 
         # Cleaning up kwargs
         if len(kwargs) > 0 and self.hash_keys==False:
-            for i in kwargs.keys():
-                params.append(f"({i}-{kwargs[i]})")
+            for i, v in kwargs:
+                params.append(f"({i}-{self._key_part(v)})")
 
-        # Hashes key with sha256 to generate a unique id
+        # Hashes the content of all the arguments into a single id
         if self.hash_keys==True:
-            # Takes list of params and joins into unique id string
-            params=RolarsCache._hashing_key(params)
+            params=_fingerprint((args, kwargs), self.fingerprint_sample_bytes)
             key=[leading, params]
 
         else:
@@ -122,106 +1537,738 @@ class RolarsCache(object):
             params.insert(0, leading)
             key = params
 
-        return "|".join(key) # ":".join(key)
+        key = "|".join(key) # ":".join(key)
+        self._observe('key_seconds', start, function=func.__name__)
+        return key
+
+    def _call_keys(self, func, method, calls):
+        """Splits a batch of calls into (args, kwargs) pairs and generates their keys"""
+        calls = [c if isinstance(c, (tuple, dict)) else (c,) for c in calls]
+        split = [((), c) if isinstance(c, dict) else (c, {}) for c in calls]
 
-    def _deserialize(self, key):
+        if self.key==None:
+            keys = [self.key_generator(func, method, *a, **kw) for a, kw in split]
+        else:
+            keys = [self.key_generator(func, method, self.key)] * len(split)
+        return split, keys
+
+    def _plan_key(self, lazy_frame, args=(), kwargs=None, ttl=None):
         """
-        Method for deserializing python object
-        Parameters:
-        -----------
-            key=value to use in the redis cache
+        Key of a LazyFrame: hash of its optimized plan and of the (path, mtime, size)
+        of the files it scans, so equal queries share a key whatever built them.
+        In-memory frames only show their columns in the plan, for those the content of
+        the frames is hashed (the serialized plan if polars can not hand them over,
+        the call arguments if the plan can not be serialized either).
+        None if some scanned sources can not be resolved and there is no ttl: changes
+        to them would go unnoticed and the entry would be stale forever
+        """
+        plan = lazy_frame.explain(optimized=True)
+        sources, complete = _plan_sources(plan)
+        if not complete and ttl is None:
+            return None
+        h = _new_hasher()
+        h.update(plan.encode())
+        h.update(repr(sources).encode())
+        if 'DF [' in plan:
+            try:
+                frames = _plan_frames(lazy_frame)
+                for frame in [lazy_frame] if frames is None else frames:
+                    _feed_polars(frame, h, self.fingerprint_sample_bytes)
+            except Exception:
+                _feed((args, sorted((kwargs or {}).items())), h, self.fingerprint_sample_bytes)
+        # 'lazy' is the namespace of all the plans, equal queries of different functions share one entry
+        return f"{self.leading_key}-pyarrow-lazy|{h.hexdigest()}"
+
+    def _namespace_of(self, key):
+        """Function name of keys of the form RolarsCache-{method}-{func_name}|..., 'default' otherwise"""
+        if key.startswith(f"{self.leading_key}-"):
+            parts = key.split('|', 1)[0].split('-', 2)
+            if len(parts) == 3:
+                return parts[2]
+        return 'default'
+
+    def _lock_key(self, key):
+        # does not match the RolarsCache-* pattern so refresh() never picks it up
+        return f"{self.leading_key}Lock:{key}"
+
+    #------------------------------------------------------------------------------------
+    # Encoding and decoding of payloads
+    #------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _codec(compression, compression_level=None):
+        """
+        Validates a compression setting
         Returns:
         --------
-            python object
+            (codec name, level) or None if uncompressed
         """
-        
-        #         table = pa.deserialize(r.get("polars_df"))
-        # df = pl.from_arrow(table)
-        
-        pull_value = self.cache_container.get(key)
+        assert compression in _CacheCore._ACCEPTABLE_COMPRESSIONS, \
+            "[ERROR]: compression should be one of {}".format(_CacheCore._ACCEPTABLE_COMPRESSIONS)
+        if compression == 'none':
+            return None
+        if not pa.Codec.is_available(compression):
+            raise ValueError("Compression {} is not available in this pyarrow build".format(compression))
+        if compression_level is not None and not pa.Codec.supports_compression_level(compression):
+            compression_level = None
+        return (compression, compression_level)
 
-        # If key found, and not passed through object, return serialized object
-        if key not in self.keys.keys():
-            self.refresh()
+    def _resolve_codec(self, compression, compression_level):
+        """Per call/decorator compression, None falls back to the instance setting"""
+        return self.codec if compression is None else self._codec(compression, compression_level)
 
-        if key not in self.keys.keys():
-            return pickle.loads(pull_value)
+    def _resolve_ttl(self, ttl):
+        """Per call/decorator ttl, None (or not given) falls back to the instance setting"""
+        if ttl is _MISSING or ttl is None:
+            return self.ttl
+        assert isinstance(ttl, int) and ttl > 0, "[ERROR]: ttl should be a positive int or None"
+        return ttl
 
-        if self.keys[key]=='pickle':
-            value=pickle.loads(pull_value)
-        elif self.keys[key]=='pyarrow':
-            # Use PyArrow IPC format for deserialization (compatible with PyArrow 22.0.0+)
-            reader = pa.ipc.open_stream(pull_value)
-            arrow_table = reader.read_all()
-            value = pl.from_arrow(arrow_table)  # even if it was a pandas dataframe that got serialized, it gets deserialized as a polars object
-        elif self.keys[key]=='json':
-            value=json.loads(pull_value)
-            # value=pl.read_json(StringIO(json.loads(pull_value))) # json serialization is not just polars?
-        return value
+    def _decorator_settings(self, compression, compression_level, ttl, sliding):
+        """(codec, ttl, sliding) of a decorator, settings not given fall back to the instance ones"""
+        codec = self._resolve_codec(compression, compression_level)
+        return codec, self._resolve_ttl(ttl), self.sliding if sliding is None else sliding
 
+    def _write_options(self, arrow_table, codec):
+        """IPC write options compressing arrow_table with codec unless it is too small"""
+        if codec is None or arrow_table.nbytes < self.compression_min_bytes:
+            return None
+        return pa.ipc.IpcWriteOptions(compression=pa.Codec(codec[0], compression_level=codec[1]))
 
-    def _serialize(self, key, value):
+    def _method_from_key(self, key):
         """
-        Method for serializing python object
+        Extracts the serialization method from a key of the form
+        RolarsCache-{method}-{func_name}|..., defaults to pickle for foreign keys
+        """
+        return key.split('-')[1].lower() if key.startswith(f"{self.leading_key}-") else "pickle"
+
+    def _key_method(self, key):
+        """
+        Serialization method of a value written without header: from the local map
+        if tracked, else from the key itself, no keyspace scan is needed
+        """
+        method = self.keys.get(key)
+        return self._method_from_key(key) if method is None else method
+
+    def _decode(self, key, pull_value):
+        """Timed _decode_payload"""
+        start = time.perf_counter()
+        value = self._decode_payload(key, pull_value)
+        self._count('bytes_in', len(pull_value))
+        self._observe('deserialize_seconds', start, key=key, nbytes=len(pull_value))
+        return value
+
+    def _decode_payload(self, key, pull_value):
+        """
+        Method for decoding a raw value pulled from redis
         Parameters:
         -----------
-            key: value to use in the redis cache
-            value: object to serialize            
+            key=value used in the redis cache
+            pull_value=bytes, as returned by redis
         Returns:
         --------
             python object
         """
-        # Auto-detect method if not provided
-        method = key.split('-')[1].lower() if key.startswith(f"{self.leading_key}-") else "pickle"
-        
-        # Get type checks for serialization logic
-        is_polars_value = isinstance(value, pl.DataFrame) or isinstance(value, pl.Series) or isinstance(value, pl.LazyFrame) or isinstance(value, pl.LazySeries)
-        is_pandas_value = isinstance(value, pd.DataFrame) or isinstance(value, pd.Series)
-        is_numpy_value = isinstance(value, np.ndarray) or isinstance(value, np.matrix) or isinstance(value, np.recarray)
-        
+        header = _unpack_header(pull_value)
+        if header is None:
+            # Written before values carried a header
+            method = self._key_method(key)
+            kind = 'object'
+            body = pull_value
+        else:
+            method, _, kind, _ = header
+            # views over the redis response, nothing is copied
+            body = memoryview(pull_value)[_HEADER.size:]
+
+        if method=='manifest':
+            # the chunks are fetched by the cache holding the core, see _assemble_frame
+            raise ValueError("{} is a chunked entry, its manifest can not be decoded on its own".format(key))
+        elif method=='pickle':
+            value=pickle.loads(body)
+        elif method=='pyarrow':
+            # Use PyArrow IPC format for deserialization (compatible with PyArrow 22.0.0+)
+            reader = pa.ipc.open_stream(pa.py_buffer(body))
+            arrow_table = reader.read_all()
+            value = _from_arrow_table(arrow_table, kind)  # pandas values come back as pandas, polars as polars
+        elif method=='composite':
+            value = self._decode_composite(key, pull_value)
+        elif method=='ndarray':
+            # views over the redis response
+            value = _read_ndarrays(pull_value)
+        elif method=='disk':
+            # memory mapped, the frame shares the pages of the file
+            _, path = _disk_location(pull_value)
+            read = DiskTier.read(path)
+            if read is None:
+                raise LookupError("The disk tier file {} of {} was removed".format(path, key))
+            value = _from_arrow_table(read[0], read[1])
+        elif method=='json':
+            value=json.loads(bytes(body))
+            # value=pl.read_json(StringIO(json.loads(pull_value))) # json serialization is not just polars?
+        else:
+            value=pickle.loads(body)
+        return value
+
+    def _encode_member(self, value, codec):
+        """Self describing payload of a member of a composite value"""
+        if _is_frame(value) or isinstance(value, (pa.Table, pa.RecordBatch)):
+            arrow_table = _to_arrow_table(value)
+            return _ipc_stream_bytes(arrow_table, self._write_options(arrow_table, codec), _kind_of(value))
+        payload = _ndarray_bytes(value) if type(value) is np.ndarray else None
+        if payload is None:
+            payload = _pack_header('pickle') + pickle.dumps(value)
+        return payload
+
+    def _decode_composite(self, key, pull_value):
+        toc, start = _composite_toc(pull_value)
+        view = memoryview(pull_value)
+        members = [(m['name'], self._decode_payload(key, view[start + m['offset']:start + m['offset'] + m['nbytes']]))
+                   for m in toc['members']]
+        if toc['container'] == 'dict':
+            return dict(members)
+        values = [v for _, v in members]
+        return tuple(values) if toc['container'] == 'tuple' else values
+
+    def _encode(self, key, value, method=None, codec=_MISSING, ttl=None):
+        """Timed _encode_payload"""
+        start = time.perf_counter()
+        payload = self._encode_payload(key, value, method, codec, ttl)
+        self._count('bytes_out', len(payload))
+        self._observe('serialize_seconds', start, key=key, nbytes=len(payload))
+        return payload
+
+    def _encode_payload(self, key, value, method=None, codec=_MISSING, ttl=None):
+        """
+        Method for encoding a python object into the bytes stored in redis
+        Parameters:
+        -----------
+            key: value to use in the redis cache
+            value: object to serialize
+            method: str, one of _ACCEPTABLE_METHODS, auto-detected from the key if None
+            codec: (name, level) or None, compression of the pyarrow method, instance setting if not given
+            ttl: int, expiry of the entry, see _encode_arrow
+        Returns:
+        --------
+            bytes or str
+        """
+        # Auto-detect method if not provided
+        if method is None:
+            method = self._method_from_key(key)
+
+        # Get type checks for serialization logic
+        is_polars_value = isinstance(value, (pl.DataFrame, pl.Series, pl.LazyFrame))
+        is_pandas_value = isinstance(value, (pd.DataFrame, pd.Series))
+        is_arrow_value = isinstance(value, (pa.Table, pa.RecordBatch))
+
         if method=='pickle':
-            hashed_value=pickle.dumps(value)
-            self.keys[key]='pickle'
+            hashed_value=_pack_header('pickle') + pickle.dumps(value)
 
         elif method=='pyarrow':
-            if is_polars_value or is_pandas_value:
-                # Use PyArrow IPC format for serialization (compatible with PyArrow 22.0.0+)
-                arrow_table = None
-                if is_polars_value:
-                    arrow_table = value.to_arrow()
-                else:
-                    arrow_table = pa.Table.from_pandas(value)
-                sink = BytesIO()
-                writer = pa.ipc.new_stream(sink, arrow_table.schema)
-                writer.write_table(arrow_table)
-                writer.close()
-                hashed_value = sink.getvalue()
+            if is_polars_value or is_pandas_value or is_arrow_value:
+                codec = self.codec if codec is _MISSING else codec
+                hashed_value = self._encode_arrow(key, value, _to_arrow_table(value), codec, ttl)
             else:
-                # Fallback to pickle for non-DataFrame/Series types
-                hashed_value = pickle.dumps(value)
-                method = 'pickle'
-            self.keys[key]='pyarrow'
+                # ndarrays (also in a tuple/list/dict) are written as their raw buffers,
+                # anything else falls back to pickle, recorded as such in the header
+                hashed_value = _ndarray_bytes(value)
+                composite = _composite_members(value) if hashed_value is None else None
+                if composite is not None:
+                    # tuples/lists/dicts of frames: each member with its own codec in one entry
+                    codec = self.codec if codec is _MISSING else codec
+                    hashed_value = _composite_bytes(composite[0], [(name, self._encode_member(member, codec))
+                                                                   for name, member in composite[1]])
+                elif hashed_value is None:
+                    hashed_value = _pack_header('pickle') + pickle.dumps(value)
+                    method = 'pickle'
 
         elif method=='json':
-            hashed_value = json.dumps(value) # json.dumps(value.to_json())  # json serialization is not just polars?
-            self.keys[key]='json'
+            hashed_value = _pack_header('json') + json.dumps(value).encode() # json.dumps(value.to_json())  # json serialization is not just polars?
+
+        self._remember(key, method)
+        return hashed_value
+
+    def _encode_arrow(self, key, value, arrow_table, codec, ttl=None):
+        """Payload of a frame or arrow value of the pyarrow method, an IPC stream behind its header"""
+        return _ipc_stream_bytes(arrow_table, self._write_options(arrow_table, codec), _kind_of(value))
+
+    def _remember(self, key, method):
+        if self.track_keys:
+            self.keys[key]=method
+
+    def _publish_invalidation(self, pipe, keys):
+        """Queues the invalidation message of keys on pipe"""
+        pipe.publish(self.invalidation_channel,
+                     json.dumps({'src': self._instance_id, 'keys': list(keys)}))
+
+    def _map(self, func, items):
+        """
+        Applies func over items, using the thread pool when there is more than one item.
+        Arrow IPC reading/writing releases the GIL so the pool gives real parallelism
+        """
+        items = list(items)
+        if len(items) < 2:
+            return [func(i) for i in items]
+        return list(self._get_executor().map(func, items))
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix=self.leading_key)
+        return self._executor
+
+    def close(self):
+        """Stops the thread pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor=None
+
+    #------------------------------------------------------------------------------------
+    # Chunked entries: a manifest under the key plus one key per record batch/column group
+    #------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_manifest(pull_value):
+        return json.loads(pull_value[_HEADER.size:])
+
+    def _chunk_key(self, key, generation, batch, group):
+        return f"{key}|chunk-{generation}-{batch}-{group}"
+
+    def _manifest_chunk_keys(self, key, manifest):
+        return [self._chunk_key(key, manifest['generation'], b, g)
+                for b in range(len(manifest['batches'])) for g in range(len(manifest['groups']))]
+
+    def _chunk_plan(self, manifest, columns, row_slice):
+        """
+        Works out which chunks hold the requested columns and rows
+        Returns:
+        --------
+            columns, group indices, list of (batch index, first row, last row + 1) local to the batch
+        """
+        schema = pa.ipc.read_schema(pa.py_buffer(base64.b64decode(manifest['schema'])))
+        columns = schema.names if columns is None else list(columns)
+        missing = [c for c in columns if c not in schema.names]
+        if len(missing) > 0:
+            raise ValueError("Columns {} not found in {}".format(missing, schema.names))
+        group_idx = [g for g, group in enumerate(manifest['groups'])
+                     if any(c in group for c in columns)]
+
+        start, stop = _slice_bounds(row_slice, sum(manifest['batches']))
+        batches = []
+        offset = 0
+        for b, rows in enumerate(manifest['batches']):
+            lo, hi = max(start, offset), min(stop, offset + rows)
+            if lo < hi:
+                batches.append((b, lo - offset, hi - offset))
+            offset += rows
+        return schema, columns, group_idx, batches
+
+    def _assemble_batch(self, schema, raws, columns, lo, hi):
+        """
+        Stitches the column groups of one batch back together and slices its rows,
+        the metadata of the entry schema (pandas index and dtypes) is kept
+        """
+        arrays = {}
+        for raw in raws:
+            arrow_table = _read_ipc_stream(raw)
+            for name in arrow_table.column_names:
+                arrays[name] = arrow_table.column(name)
+        arrow_table = pa.table([arrays[c] for c in columns], names=columns)
+        return arrow_table.replace_schema_metadata(schema.metadata).slice(lo, hi - lo)
+
+    def _batch_chunk_keys(self, key, manifest, batches, group_idx):
+        return [self._chunk_key(key, manifest['generation'], b, g)
+                for b, _, _ in batches for g in group_idx]
+
+    @staticmethod
+    def _split_chunks(key, raws, n_batches, n_groups):
+        """Groups the chunks pulled by MGET per batch"""
+        if any(r is None for r in raws):
+            raise ValueError("Chunks of key {} are missing, the entry was replaced or evicted".format(key))
+        return [raws[i * n_groups:(i + 1) * n_groups] for i in range(n_batches)]
+
+    def _assemble_frame(self, schema, columns, raws, batches, kind='polars.DataFrame'):
+        tables = [self._assemble_batch(schema, r, columns, lo, hi) for r, (_, lo, hi) in zip(raws, batches)]
+        if len(tables) == 0:
+            return _from_arrow_table(schema.empty_table().select(columns), kind)
+        return _from_arrow_table(pa.concat_tables(tables), kind)
+
+    #------------------------------------------------------------------------------------
+    # Instrumentation
+    #------------------------------------------------------------------------------------
+
+    def _count(self, name, n=1, function=None):
+        self._stats.count(name, n, function)
+        if len(self._hooks) > 0:
+            self._emit(name, n=n, function=function)
+
+    def _observe(self, name, start, **info):
+        """Records the time elapsed since start (a time.perf_counter() value) in histogram name"""
+        seconds = time.perf_counter() - start
+        self._stats.observe(name, seconds)
+        if len(self._hooks) > 0:
+            self._emit(name, seconds=seconds, **info)
+
+    def _emit(self, event, **info):
+        for hook in list(self._hooks):
+            try:
+                hook(event, info)
+            except Exception:
+                # a broken tracing hook should never break the cache
+                self._stats.count('hook_errors')
+
+    def add_hook(self, hook):
+        """
+        Registers a callable hook(event, info) called on every counter increment
+        (event=counter name, info has n and function) and every timing
+        (event=histogram name, info has seconds and the key/command/nbytes involved)
+        """
+        assert callable(hook), "[ERROR]: hook should be callable"
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def stats(self):
+        """
+        Snapshot of the counters and latencies of this instance
+        Returns:
+        --------
+            dict(), hits, local_hits (hits served by the local tier, any api),
+            misses, waits (misses that waited on another worker),
+            wait_hits (waits that ended with the value in redis),
+            wait_timeouts (waits that gave up and computed the value themselves),
+            evictions (entries deleted to keep namespaces within budget),
+            uncacheable_plans (lazy plans run uncached, their sources could not be resolved),
+            bytes_in/bytes_out (payload bytes read from/written to redis),
+            functions (hits, misses and hit_ratio per decorated function),
+            latency (count, sum, mean, p50, p99 and buckets in seconds of
+            serialize_seconds, deserialize_seconds, key_seconds and redis_seconds)
+        """
+        snapshot = self._stats.snapshot()
+        counters = snapshot['counters']
+        result = {name: counters.get(name, 0)
+                  for name in ['hits', 'local_hits', 'misses', 'waits', 'wait_hits', 'wait_timeouts',
+                               'evictions', 'uncacheable_plans', 'bytes_in', 'bytes_out']}
+        result['functions'] = snapshot['functions']
+        result['latency'] = snapshot['histograms']
+        return result
+
+    def prometheus_text(self, prefix='rolars_cache'):
+        """
+        Counters and latency histograms in the Prometheus text exposition format,
+        to be served from a /metrics endpoint
+        """
+        return self._stats.prometheus(prefix)
+
+
+class RolarsCache(_CacheCore):
+
+    _ACCEPTABLE_EVICTIONS = ['lru', 'lfu']
+
+    def refresh(self):
+        # storing of keys in the object so as to know how to retrieve the value
+        # Scan for all keys matching the pattern and extract their serialization method
+        keys_already_present = []
+        for k in self.cache_container.scan_iter(match=f"{self.leading_key}-*"):
+            parsed = self._parse_scanned_key(k)
+            if parsed is not None:
+                keys_already_present.append(parsed)
+        self.keys = dict(keys_already_present)
+
+    def __init__(self, redis_instance, key=None, hash_keys=False, max_workers=None,
+                 lock_timeout=30.0, lock_wait=10.0, lock_poll=0.05,
+                 local_max_bytes=None, local_ttl=None, chunk_rows=None, chunk_columns=None,
+                 compression='none', compression_level=None, compression_min_bytes=65536,
+                 track_keys=False, ttl=None, sliding=False, budget_bytes=None, eviction='lru',
+                 fingerprint_sample_bytes=None, disk_dir=None, disk_max_bytes=None, disk_min_bytes=8 << 20,
+                 write_behind=False, write_behind_workers=2, write_behind_queue=64):
+        # Checks that a redis object has been passed
+        # https://stackoverflow.com/questions/57949871/how-to-set-get-pandas-dataframes-into-redis-using-pyarrow/57986261#57986261
+        self._check_container(redis_instance)
+
+        # Sets the redis object as an attribute of this class
+        self.cache_container = redis_instance
+
+        # keys, codecs, expiry, single-flight and instrumentation settings, see _CacheCore
+        super().__init__(key=key, hash_keys=hash_keys, max_workers=max_workers, lock_timeout=lock_timeout,
+                         lock_wait=lock_wait, lock_poll=lock_poll, compression=compression,
+                         compression_level=compression_level, compression_min_bytes=compression_min_bytes,
+                         track_keys=track_keys, ttl=ttl, sliding=sliding,
+                         fingerprint_sample_bytes=fingerprint_sample_bytes)
+
+        # single background thread merging the segments of range_cache entries
+        self._merge_executor=None
+
+        # With write_behind the decorators return computed values right away and encode/SET
+        # them on a pool of write_behind_workers threads, at most write_behind_queue writes
+        # are pending (callers block beyond). Pending values are served to readers of this
+        # process and flushed at exit
+        assert isinstance(write_behind, bool), "[ERROR]: write_behind should be a bool"
+        assert isinstance(write_behind_workers, int) and write_behind_workers > 0, \
+            "[ERROR]: write_behind_workers should be a positive int"
+        assert isinstance(write_behind_queue, int) and write_behind_queue > 0, \
+            "[ERROR]: write_behind_queue should be a positive int"
+        self.write_behind=write_behind
+        self.write_behind_workers=write_behind_workers
+        self._write_slots=threading.BoundedSemaphore(write_behind_queue)
+        self._write_executor=None
+        self._pending_lock=threading.Lock()
+        self._pending={}
+        self._writes=set()
+        if write_behind:
+            atexit.register(_flush_at_exit, weakref.ref(self))
+
+        # single-flight lock of the decorators, see _get_or_compute
+        self._release_lock_script=self.cache_container.register_script(_RELEASE_LOCK_LUA)
+
+        # Frames written with the pyarrow method are split into record batches of chunk_rows
+        # rows and groups of chunk_columns columns, each stored under its own key, see post_stream()
+        assert chunk_rows is None or (isinstance(chunk_rows, int) and chunk_rows > 0), \
+            "[ERROR]: chunk_rows should be a positive int or None"
+        assert chunk_columns is None or (isinstance(chunk_columns, int) and chunk_columns > 0), \
+            "[ERROR]: chunk_columns should be a positive int or None"
+        self.chunk_rows=chunk_rows
+        self.chunk_columns=chunk_columns
+
+        # Byte budget per namespace (the function name of decorated entries), entries
+        # of a namespace over budget are evicted least recently/frequently used first
+        # (lfu with dynamic aging, new entries start at the score of the last victim).
+        # Only RolarsCache entries are evicted, see set_budget()
+        assert budget_bytes is None or (isinstance(budget_bytes, int) and budget_bytes > 0), \
+            "[ERROR]: budget_bytes should be a positive int or None"
+        assert eviction in RolarsCache._ACCEPTABLE_EVICTIONS, \
+            "[ERROR]: eviction should be one of {}".format(RolarsCache._ACCEPTABLE_EVICTIONS)
+        self.budget_bytes=budget_bytes
+        self.budgets={}
+        self.eviction=eviction
+        self._track_write_script=self.cache_container.register_script(_TRACK_WRITE_LUA)
+        self._untrack_script=self.cache_container.register_script(_UNTRACK_LUA)
+        self._raise_age_script=self.cache_container.register_script(_RAISE_AGE_LUA)
+
+        # Optional tier of memory mapped files in disk_dir for frames of at least disk_min_bytes,
+        # redis then only holds a pointer to the file. Readers of other hosts see them as misses
+        assert isinstance(disk_min_bytes, int) and disk_min_bytes >= 0, \
+            "[ERROR]: disk_min_bytes should be a non negative int"
+        self.disk=None if disk_dir is None else DiskTier(disk_dir, disk_max_bytes)
+        self.disk_min_bytes=disk_min_bytes
+
+        # Optional in-process tier of deserialized values, bounded by local_max_bytes
+        self.local=None
+        self._pubsub=None
+        self._pubsub_thread=None
+        if local_max_bytes is not None:
+            self.local=LocalTier(local_max_bytes, ttl=local_ttl)
+            self._pubsub=self.cache_container.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.invalidation_channel: self._on_invalidation})
+            self._pubsub_thread=self._pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_pubsub_error)
+
+        self._init_keys()
+
+    def _check_container(self, redis_instance):
+        # a single node, a client side sharded pool of nodes or a Redis Cluster
+        if isinstance(redis_instance, (redis.client.Redis, ShardedRedis, redis.cluster.RedisCluster)) !=True:
+            raise AttributeError(
+                "Did not recieve an Redis Object, instead received {}".format(type(redis_instance)))
+
+    def _pipeline(self):
+        """Non transactional pipeline of the container, see ClusterPipeline for Redis Cluster"""
+        if isinstance(self.cache_container, redis.cluster.RedisCluster):
+            return ClusterPipeline(self.cache_container)
+        return self.cache_container.pipeline(transaction=False)
+
+    def _mget(self, keys):
+        """MGET of keys possibly living on several nodes"""
+        if isinstance(self.cache_container, redis.cluster.RedisCluster):
+            return self.cache_container.mget_nonatomic(keys)
+        return self.cache_container.mget(keys)
+
+    def _init_keys(self):
+        if self.track_keys:
+            self.refresh()
+
+    def close(self):
+        """
+        Flushes the write-behind writes, stops the invalidation listener,
+        the thread pools and the range merges
+        """
+        if self._write_executor is not None:
+            self.flush()
+            self._write_executor.shutdown(wait=True)
+            self._write_executor=None
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread=None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub=None
+        if self._merge_executor is not None:
+            self._merge_executor.shutdown(wait=True)
+            self._merge_executor=None
+        super().close()
+
+    #------------------------------------------------------------------------------------
+    # Local tier and cross-process invalidation
+    #------------------------------------------------------------------------------------
+    def _on_invalidation(self, message):
+        payload = json.loads(message['data'])
+        if payload['src'] != self._instance_id and self.local is not None:
+            self.local.invalidate(payload['keys'])
+
+    def _on_pubsub_error(self, error, pubsub, thread):
+        # Messages may have been lost while disconnected, nothing local can be trusted.
+        # The pubsub object resubscribes on its next read
+        if self.local is not None:
+            self.local.clear()
+        time.sleep(1.0)
+
+    def _local_get(self, key):
+        value = self._pending_get(key)
+        if value is not _MISSING:
+            self._count('pending_hits')
+            return value
+        if self.local is None:
+            return _MISSING
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count('local_hits')
+        return value
+
+    def _local_token(self):
+        """Token to take before a GET whose result fills the local tier, None without one"""
+        return None if self.local is None else self.local.token()
+
+    def _local_put(self, key, value, payload, ttl=None, token=None):
+        if self.local is not None:
+            self.local.put(key, value, _estimate_nbytes(value, len(payload)), ttl=ttl, token=token)
+
+    def _decode_to_local(self, key, pull_value, ttl=None, token=None):
+        """
+        _decode that also keeps the result in the local tier, for at most ttl seconds (its expiry in redis),
+        unless key was invalidated since token was taken
+        """
+        value = self._decode(key, pull_value)
+        self._local_put(key, value, pull_value, ttl, token)
+        return value
+
+    #------------------------------------------------------------------------------------
+    # Internal Methods for mananging posting and getting from redis
+    #------------------------------------------------------------------------------------
+    def _decode_payload(self, key, pull_value):
+        """_CacheCore._decode_payload, chunked entries are reassembled from their chunks"""
+        if _is_manifest(pull_value):
+            return self._get_chunked(key, self._parse_manifest(pull_value))
+        return super()._decode_payload(key, pull_value)
+
+    def _encode_arrow(self, key, value, arrow_table, codec, ttl=None):
+        """
+        _CacheCore._encode_arrow, frames of at least disk_min_bytes go to the disk tier
+        (its file records ttl) and redis gets a pointer to the file
+        """
+        if self.disk is not None and arrow_table.nbytes >= self.disk_min_bytes:
+            path, nbytes = self.disk.put(key, arrow_table, _kind_of(value), ttl)
+            return self.disk.pointer(path, nbytes, _kind_of(value))
+        if self.disk is not None:
+            # a previous large value of key must not come back after a restart of redis
+            self.disk.remove(key)
+        return super()._encode_arrow(key, value, arrow_table, codec, ttl)
 
-        self.cache_container.set(key, hashed_value)
+    def get_member(self, key, name, toc_bytes=4096):
+        """
+        Returns a single member of a cached tuple/list/dict of frames without
+        transferring the others: one GETRANGE reads the table of contents
+        (a second one if it is longer than toc_bytes) and one the member
+        Parameters:
+        -----------
+            key=str(), key of the composite value
+            name=str() key of a dict member or int() position of a tuple/list member
+            toc_bytes=int(), bytes read by the first GETRANGE
+        Returns:
+        --------
+            python object, None if key does not exist
+        """
+        value = self._local_get(key)
+        if value is not _MISSING:
+            return value[name]
+
+        head = self.cache_container.getrange(key, 0, _HEADER.size + _COMPOSITE_TOC.size + toc_bytes - 1)
+        if head is None or len(head) == 0:
+            return None
+        header = _unpack_header(head)
+        if header is None or header[0] != 'composite':
+            # not a composite entry, read it whole
+            value = self.get(key)
+            return None if value is None else value[name]
+
+        found = _composite_toc(head)
+        if found is None:
+            size, = _COMPOSITE_TOC.unpack_from(head, _HEADER.size)
+            head = self.cache_container.getrange(key, 0, _HEADER.size + _COMPOSITE_TOC.size + size - 1)
+            found = _composite_toc(head)
+        toc, start = found
+        member = _composite_member(toc, name)
+        if member['nbytes'] == 0:
+            return None
+        payload = self.cache_container.getrange(key, start + member['offset'], start + member['offset'] + member['nbytes'] - 1)
+        self._count('bytes_in', len(payload))
+        return self._decode_payload(key, payload)
+
+    def describe(self, key):
+        """
+        Reads only the header of the value of key with a single GETRANGE
+        Returns:
+        --------
+            dict(), method, codec, kind (container type) and schema_fingerprint (hex, None for non arrow values),
+            None if the key does not exist or was written without header
+        """
+        return _describe_header(self.cache_container.getrange(key, 0, _HEADER.size - 1))
+
+    def _serialize(self, key, value, method=None, codec=_MISSING, ttl=_MISSING):
+        """
+        Method for serializing python object
+        Parameters:
+        -----------
+            key: value to use in the redis cache
+            value: object to serialize
+            method: str, one of _ACCEPTABLE_METHODS, auto-detected from the key if None
+            codec: (name, level) or None, compression of the pyarrow method, instance setting if not given
+            ttl: int seconds or None, expiry of the entry, instance setting if not given
+        Returns:
+        --------
+            python object
+        """
+        self._post_many({key: value}, method, codec, ttl)
 
     #------------------------------------------------------------------------------------
     # GET and POST methods to send and retrive objects from cache
     #------------------------------------------------------------------------------------
-    def get(self, key):
+    def get(self, key, columns=None, row_slice=None, slide=None):
         """
         Returns object from the redis database if key exists
+        Parameters:
+        -----------
+            key=str()
+            columns=list(), optional column projection of a frame
+            row_slice=slice(), optional rows of a frame
+            slide=int(), seconds, pushes the expiry of the entry back (sliding expiration)
+        For chunked entries only the chunks holding the requested columns/rows are fetched
         """
-        if self.cache_container.exists(key) == 1:
-            return self._deserialize(key)
-        else:
-            raise ValueError("No key {} found in object".format(key))
+        if columns is not None or row_slice is not None:
+            return self._get_projected(key, columns, row_slice, slide)
+
+        value = self._local_get(key)
+        if value is not _MISSING:
+            return value
 
+        # Single round trip, a missing key comes back as None
+        token = self._local_token()
+        pull_value, ttl = self._fetch(key, slide)
+        if pull_value is None:
+            raise ValueError("No key {} found in object".format(key))
+        return self._decode_to_local(key, pull_value, ttl, token)
 
-    def post(self, key, values, serialization='pyarrow'):# serialization='pickle'):
+    def post(self, key, values, serialization='pyarrow', chunk_rows=None, chunk_columns=None,
+             compression=None, compression_level=None, ttl=None):# serialization='pickle'):
         """
         Posts key,value to redis where its serilaized by the serialization param
         Parameters:
@@ -229,6 +2276,12 @@ class RolarsCache(object):
             key=str()
             values=python object
             serialization=str(), of which is 'pickle', 'json', 'pyarrow'
+            chunk_rows=int(), store a frame as chunks of chunk_rows rows (pyarrow only),
+                       defaults to the instance setting
+            chunk_columns=int(), columns per chunk, defaults to the instance setting
+            compression=str(), 'none', 'lz4' or 'zstd' (pyarrow only), defaults to the instance setting
+            compression_level=int(), codec level if supported
+            ttl=int(), seconds before the entry expires, defaults to the instance setting
         Returns:
         --------
             python object
@@ -236,13 +2289,330 @@ class RolarsCache(object):
         assert isinstance(key, str)
         assert isinstance(serialization,str)
         assert serialization in ['pickle', 'json', 'pyarrow']
+        codec = self._resolve_codec(compression, compression_level)
+        ttl = self._resolve_ttl(ttl)
+
+        if chunk_rows is not None and serialization=='pyarrow' and _is_frame(values):
+            self._post_chunked(key, values, chunk_rows,
+                               self.chunk_columns if chunk_columns is None else chunk_columns, codec, ttl)
+            return
+        self._serialize(key, values, method=serialization, codec=codec, ttl=ttl)
+
+    def get_many(self, keys):
+        """
+        Returns the objects stored under keys using a single MGET round trip,
+        payloads are deserialized in the thread pool
+        Parameters:
+        -----------
+            keys=iterable of str()
+        Returns:
+        --------
+            dict(), key -> python object, keys not found in redis are left out
+        """
+        result = {}
+        remote = []
+        for k in keys:
+            value = self._local_get(k)
+            if value is _MISSING:
+                remote.append(k)
+            else:
+                result[k] = value
+        if len(remote) == 0:
+            return result
+
+        start = time.perf_counter()
+        token = self._local_token()
+        ttls = [None] * len(remote)
+        if len(self.budgets) == 0 and self.budget_bytes is None and self.local is None:
+            pulled = self._mget(remote)
+        else:
+            # Access scores of budgeted entries are bumped, and the expiries the
+            # local tier has to respect are read, in the same round trip
+            pipe = self._pipeline()
+            for k in remote:
+                pipe.get(k)
+            for k in remote:
+                self._touch(pipe, k)
+            if self.local is not None:
+                for k in remote:
+                    pipe.pttl(k)
+            replies = pipe.execute()
+            pulled = replies[:len(remote)]
+            if self.local is not None:
+                ttls = [_seconds_left(t) for t in replies[-len(remote):]]
+        self._observe('redis_seconds', start, command='mget')
+        absent = [k for k, v in zip(remote, pulled) if v is None]
+        pulled = [(k, v, t) for k, v, t in zip(remote, pulled, ttls) if v is not None and _readable_here(v)]
+        if self.disk is not None:
+            found = set(k for k, _, _ in pulled)
+            restored = [(k, self._restore_from_disk(k)) for k in remote if k not in found]
+            pulled.extend((k, r[0], r[1]) for k, r in restored if r is not None)
+        found = set(k for k, _, _ in pulled)
+        self._untrack_missing([k for k in absent if k not in found])
+        values = self._map(lambda kvt: self._decode_to_local(*kvt, token=token), pulled)
+        result.update(zip([k for k, _, _ in pulled], values))
+        return result
+
+    def post_many(self, mapping, serialization=None, compression=None, compression_level=None, ttl=None):
+        """
+        Posts every key,value of mapping to redis in a single pipelined round trip,
+        values are serialized in the thread pool
+        Parameters:
+        -----------
+            mapping=dict(), str() -> python object
+            serialization=str(), of which is 'pickle', 'json', 'pyarrow',
+                          if None the method is taken from each key
+            compression=str(), 'none', 'lz4' or 'zstd' (pyarrow only), defaults to the instance setting
+            compression_level=int(), codec level if supported
+            ttl=int(), seconds before the entries expire, defaults to the instance setting
+        """
+        assert isinstance(mapping, dict)
+        assert serialization is None or serialization in RolarsCache._ACCEPTABLE_METHODS
+        self._post_many(mapping, serialization, self._resolve_codec(compression, compression_level),
+                        self._resolve_ttl(ttl))
+
+    def _post_many(self, mapping, serialization, codec, ttl=_MISSING):
+        if len(mapping) == 0:
+            return
+        ttl = self._resolve_ttl(ttl)
+
+        items = list(mapping.items())
+
+        # Chunked frames spread over several keys and are written one by one
+        if serialization in (None, 'pyarrow') and self.chunk_rows is not None:
+            chunked = [(k, v) for k, v in items
+                       if _is_frame(v) and (serialization or self._method_from_key(k))=='pyarrow']
+            for k, v in chunked:
+                self._post_chunked(k, v, self.chunk_rows, self.chunk_columns, codec, ttl)
+            chunked_keys = set(k for k, _ in chunked)
+            items = [(k, v) for k, v in items if k not in chunked_keys]
+            if len(items) == 0:
+                return
+
+        encoded = self._map(lambda kv: self._encode(kv[0], kv[1], serialization, codec, ttl), items)
+        # chunks of the chunked entries being replaced, deleted with the writes
+        replaced = self._chunk_keys_under([k for k, _ in items])
+
+        pipe = self._pipeline()
+        for (k, _), v in zip(items, encoded):
+            pipe.set(k, v, ex=ttl)
+        # one DEL per key, the keys may live on different nodes
+        for chunk_key in replaced:
+            pipe.delete(chunk_key)
+        self._publish_invalidation(pipe, [k for k, _ in items])
+        start = time.perf_counter()
+        pipe.execute()
+        self._observe('redis_seconds', start, command='set')
+
+        for (k, value), v in zip(items, encoded):
+            self._local_put(k, value, v, ttl)
+        self._account([(k, len(v)) for (k, _), v in zip(items, encoded)], ttl)
 
-        self._serialize(key, values, method=serialization)
     #------------------------------------------------------------------------------------
-    # Caching Decorators to be used over functions
+    # Chunked storage: a manifest under the key plus one key per record batch/column group
     #------------------------------------------------------------------------------------
+    def _chunk_keys_under(self, keys):
+        """Chunk keys of the chunked entries stored under keys, only their headers are read for the others"""
+        pipe = self._pipeline()
+        for k in keys:
+            pipe.getrange(k, 0, _HEADER.size - 1)
+        chunk_keys = []
+        for k, head in zip(keys, pipe.execute()):
+            if head is not None and _is_manifest(head):
+                manifest = self._read_manifest(k)
+                if manifest is not None:
+                    chunk_keys.extend(self._manifest_chunk_keys(k, manifest))
+        return chunk_keys
+
+    def _read_manifest(self, key):
+        """Returns the manifest stored under key, or None if key is not a chunked entry"""
+        pull_value = self.cache_container.get(key)
+        if pull_value is None or not _is_manifest(pull_value):
+            return None
+        return self._parse_manifest(pull_value)
+
+    def _post_chunked(self, key, value, chunk_rows, chunk_columns, codec=_MISSING, ttl=_MISSING):
+        arrow_table = _to_arrow_table(value)
+        self._post_stream(key, arrow_table.to_batches(max_chunksize=chunk_rows),
+                          chunk_columns, arrow_table.schema, 16,
+                          self.codec if codec is _MISSING else codec, self._resolve_ttl(ttl), _kind_of(value))
+
+    def post_stream(self, key, frames, chunk_columns=None, schema=None, pipeline_chunks=16,
+                    compression=None, compression_level=None, ttl=None):
+        """
+        Posts a frame given as an iterable of pieces (polars/pandas frames or arrow
+        tables/record batches), each piece is written as soon as it is produced so
+        the whole payload is never held in memory.
+        The manifest is written last, readers keep seeing the previous entry until then
+        Parameters:
+        -----------
+            key=str()
+            frames=iterable of frames sharing the same schema
+            chunk_columns=int(), columns per chunk, defaults to the instance setting
+            schema=pyarrow.Schema, required if frames may be empty
+            pipeline_chunks=int(), number of chunks sent per round trip
+            compression=str(), 'none', 'lz4' or 'zstd', defaults to the instance setting
+            compression_level=int(), codec level if supported
+            ttl=int(), seconds before the entry expires, defaults to the instance setting
+        """
+        assert isinstance(key, str)
+        self._post_stream(key, frames, chunk_columns, schema, pipeline_chunks,
+                          self._resolve_codec(compression, compression_level), self._resolve_ttl(ttl))
+
+    def _post_stream(self, key, frames, chunk_columns, schema, pipeline_chunks, codec, ttl=None, kind=None):
+        stream = self._stream_begin(key, chunk_columns, schema, pipeline_chunks, codec, ttl, kind)
+        for frame in frames:
+            self._stream_write(stream, frame)
+        self._stream_end(stream)
+
+    def _stream_begin(self, key, chunk_columns, schema, pipeline_chunks, codec, ttl=None, kind=None):
+        """State of a chunked entry being written piece by piece, see _stream_write and _stream_end"""
+        stream = {
+            'key': key,
+            'chunk_columns': self.chunk_columns if chunk_columns is None else chunk_columns,
+            'schema': schema,
+            'groups': None,
+            'pipeline_chunks': pipeline_chunks,
+            'codec': codec,
+            'ttl': ttl,
+            'kind': kind,
+            'previous': self._read_manifest(key),
+            'generation': uuid.uuid4().hex[:12],
+            'batch_rows': [],
+            'pipe': self._pipeline(),
+            'pending': 0,
+            'nbytes': 0,
+        }
+        if schema is not None:
+            stream['groups'] = self._column_groups(schema.names, stream['chunk_columns'])
+        return stream
+
+    @staticmethod
+    def _column_groups(names, chunk_columns):
+        step = chunk_columns or max(len(names), 1)
+        return [names[i:i + step] for i in range(0, len(names), step)] or [[]]
+
+    def _stream_write(self, stream, frame):
+        """Writes the chunks of one piece, sent every pipeline_chunks chunks"""
+        if stream['kind'] is None:
+            # a stream is read back as the type of its pieces
+            stream['kind'] = _kind_of(frame)
+        arrow_table = _to_arrow_table(frame)
+        if stream['schema'] is None:
+            stream['schema'] = arrow_table.schema
+            stream['groups'] = self._column_groups(arrow_table.schema.names, stream['chunk_columns'])
+        elif not arrow_table.schema.equals(stream['schema'], check_metadata=False):
+            raise ValueError("Frame schema {} does not match the stream schema {}".format(
+                arrow_table.schema, stream['schema']))
+
+        batch = len(stream['batch_rows'])
+        for g, group in enumerate(stream['groups']):
+            chunk = arrow_table.select(group)
+            payload = _ipc_stream_bytes(chunk, self._write_options(chunk, stream['codec']))
+            stream['pipe'].set(self._chunk_key(stream['key'], stream['generation'], batch, g), payload, ex=stream['ttl'])
+            stream['nbytes'] += len(payload)
+            stream['pending'] += 1
+        stream['batch_rows'].append(arrow_table.num_rows)
+
+        if stream['pending'] >= stream['pipeline_chunks']:
+            stream['pipe'].execute()
+            stream['pending'] = 0
+
+    def _stream_end(self, stream):
+        """Writes the manifest, readers keep seeing the previous entry until then"""
+        key, schema, codec, ttl, kind = stream['key'], stream['schema'], stream['codec'], stream['ttl'], stream['kind']
+        if schema is None:
+            raise ValueError("No frames given for key {} and no schema to describe them".format(key))
+
+        manifest = {
+            'generation': stream['generation'],
+            'schema': base64.b64encode(schema.serialize().to_pybytes()).decode(),
+            'groups': stream['groups'],
+            'batches': stream['batch_rows'],
+            'codec': None if codec is None else codec[0],
+            'kind': {None: 'polars.DataFrame', 'arrow.RecordBatch': 'arrow.Table'}.get(kind, kind),
+        }
+        payload = _pack_header('manifest', codec=None if codec is None else codec[0]) + json.dumps(manifest).encode()
+        pipe = stream['pipe']
+        pipe.set(key, payload, ex=ttl)
+        self._publish_invalidation(pipe, [key])
+        pipe.execute()
+        self._remember(key, 'manifest')
+        if self.local is not None:
+            self.local.invalidate([key])
+
+        # Drops the chunks of the entry that was replaced
+        if stream['previous'] is not None:
+            self.cache_container.delete(*self._manifest_chunk_keys(key, stream['previous']))
+        self._account([(key, stream['nbytes'] + len(payload))], ttl)
+
+    def _stream_abort(self, stream):
+        """Drops the chunks of a stream that will not be completed"""
+        keys = [self._chunk_key(stream['key'], stream['generation'], b, g)
+                for b in range(len(stream['batch_rows'])) for g in range(len(stream['groups'] or []))]
+        try:
+            stream['pipe'].execute()
+            if len(keys) > 0:
+                self.cache_container.delete(*keys)
+        except redis.exceptions.RedisError:
+            # left to their ttl, the error that stopped the stream is the one raised
+            self._count('stream_abort_errors')
+
+    def _fetch_chunks(self, key, manifest, batches, group_idx):
+        chunk_keys = self._batch_chunk_keys(key, manifest, batches, group_idx)
+        start = time.perf_counter()
+        raws = self._mget(chunk_keys) if len(chunk_keys) > 0 else []
+        self._observe('redis_seconds', start, command='mget')
+        self._count('bytes_in', sum(len(r) for r in raws if r is not None))
+        return self._split_chunks(key, raws, len(batches), len(group_idx))
+
+    def _get_chunked(self, key, manifest, columns=None, row_slice=None):
+        """
+        Reassembles the requested part of a chunked entry as a polars DataFrame
+        with a single MGET of the chunks involved
+        """
+        schema, columns, group_idx, batches = self._chunk_plan(manifest, columns, row_slice)
+        raws = self._fetch_chunks(key, manifest, batches, group_idx)
+        return self._assemble_frame(schema, columns, raws, batches, manifest.get('kind', 'polars.DataFrame'))
 
-    def cache(self, method='pyarrow', func=None):
+    def _get_projected(self, key, columns, row_slice, slide=None):
+        token = self._local_token()
+        pull_value, ttl = self._fetch(key, slide)
+        if pull_value is None:
+            raise ValueError("No key {} found in object".format(key))
+        if _is_manifest(pull_value):
+            return self._get_chunked(key, self._parse_manifest(pull_value), columns, row_slice)
+        return _project(self._decode_to_local(key, pull_value, ttl, token), columns, row_slice)
+
+    def iter_chunks(self, key, columns=None, row_slice=None):
+        """
+        Streams a chunked entry back one record batch at a time,
+        only one batch is held in memory
+        Parameters:
+        -----------
+            key=str()
+            columns=list(), optional column projection
+            row_slice=slice(), optional rows
+        Returns:
+        --------
+            generator of polars DataFrame
+        """
+        manifest = self._read_manifest(key)
+        if manifest is None:
+            # Not chunked, the single value is the only batch
+            yield self.get(key, columns=columns, row_slice=row_slice)
+            return
+        schema, columns, group_idx, batches = self._chunk_plan(manifest, columns, row_slice)
+        for batch in batches:
+            raws = self._fetch_chunks(key, manifest, [batch], group_idx)[0]
+            yield _from_arrow_table(self._assemble_batch(schema, raws, columns, batch[1], batch[2]),
+                                    manifest.get('kind', 'polars.DataFrame'))
+
+    #------------------------------------------------------------------------------------
+    # Caching Decorators to be used over functions
+    #------------------------------------------------------------------------------------
+    def cache(self, method='pyarrow', func=None, compression=None, compression_level=None,
+              ttl=None, sliding=None):
         """
         General Decorater function for caching functions, will attempt to cache with the
         correct serialization based on type, else use pickle
@@ -255,23 +2625,28 @@ class RolarsCache(object):
         Parameters:
             method: str, one of ['pickle', 'pyarrow', 'json']
             func: python function (used internally by decorator)
+            compression: str, 'none', 'lz4' or 'zstd' for pyarrow payloads, defaults to the instance setting
+            compression_level: int, codec level if supported
+            ttl: int, seconds before cached results expire, defaults to the instance setting
+            sliding: bool, hits push the expiry back by ttl, defaults to the instance setting
         Returns:
             Python Object
         """
         # If func is provided, we're being called directly (old-style decorator)
+        codec, ttl, sliding = self._decorator_settings(compression, compression_level, ttl, sliding)
         if func is not None:
             assert method in RolarsCache._ACCEPTABLE_METHODS
-            return self._apply_cache_decorator(func, method)
+            return self._apply_cache_decorator(func, method, codec, ttl, sliding)
         
         # Otherwise, we're being used as @cache.cache(method='pyarrow')
         # Return a decorator function
         assert method in RolarsCache._ACCEPTABLE_METHODS
         
         def decorator(f):
-            return self._apply_cache_decorator(f, method)
+            return self._apply_cache_decorator(f, method, codec, ttl, sliding)
         return decorator
     
-    def _apply_cache_decorator(self, func, method):
+    def _apply_cache_decorator(self, func, method, codec=_MISSING, ttl=_MISSING, sliding=None):
         """Helper method that applies the caching decorator logic"""
         @functools.wraps(func)
         def wrapper_df_decorator(*args, **kwargs):
@@ -281,19 +2656,43 @@ class RolarsCache(object):
             else:
                 key=self.key_generator(func, method, self.key)
 
-            # check if exists in redis
-            if self.cache_container.exists(key) == 1:
-                # Pulls data from redis, deserialses and returns the dataframe
-                value = self._deserialize(key)
-            else:
-                # Runs the function that was decorated
-                value = func(*args, **kwargs)
-                # Serialize the value (method is auto-detected in _serialize)
-                self._serialize(key, value)
+            return self._get_or_compute(key, method, func, args, kwargs, codec, ttl, sliding)
 
-            return value
+        # Batched path: func.many([args, ...]) costs one MGET and one pipelined SET
+        wrapper_df_decorator.many = functools.partial(self._call_many, func, method, codec, ttl)
+        # read by warm() to cache the results the way the decorator would
+        wrapper_df_decorator.cache_settings = {'method': method, 'codec': codec, 'ttl': ttl}
         return wrapper_df_decorator
 
+    def _call_many(self, func, method, codec, ttl, calls):
+        """
+        Evaluates func over a batch of calls going through the cache in bulk
+        Parameters:
+        -----------
+            func=python function, the undecorated function
+            method=str(), serialization method
+            codec=(name, level) or None, compression of pyarrow payloads
+            ttl=int() or None, expiry of the computed entries
+            calls=iterable, each item is a tuple of positional args, a dict of kwargs
+                  or a single positional arg
+        Returns:
+        --------
+            list(), results in the order of calls
+        """
+        split, keys = self._call_keys(func, method, calls)
+        found = self.get_many(set(keys))
+
+        # Runs the function for the misses only, once per distinct key
+        missing = {}
+        for k, (a, kw) in zip(keys, split):
+            if k not in found and k not in missing:
+                missing[k] = func(*a, **kw)
+        self._count('hits', len(found), function=func.__name__)
+        self._count('misses', len(missing), function=func.__name__)
+        self._post_many(missing, method, codec, ttl)
+        found.update(missing)
+
+        return [found[k] for k in keys]
 
     def json_cache(self, func):
         """
@@ -305,26 +2704,7 @@ class RolarsCache(object):
         Returns:
             Python Object (cld used for pandas, numpy?)
         """
-        @functools.wraps(func)
-        def wrapper_df_decorator(*args, **kwargs):
-            # generate key based on called function
-            method = 'json'
-            if self.key==None:
-                key=self.key_generator(func, method, *args, **kwargs)
-            else:
-                key=self.key_generator(func, method, self.key)
-
-            # check if exists in redis
-            if self.cache_container.exists(key) == 1:
-                # Pulls data from redis, deserialses and returns the dataframe
-                value = self._deserialize(key)
-            else:
-                # Runs the function that was decorated
-                value = func(*args, **kwargs)
-                self._serialize(key, value, method='json')
-
-            return value
-        return wrapper_df_decorator
+        return self._apply_cache_decorator(func, 'json')
 
     def pyarrow_cache(self, func):
         """
@@ -336,27 +2716,1227 @@ class RolarsCache(object):
         Returns:
             Python Object
         """
-        @functools.wraps(func)
-        def wrapper_df_decorator(*args, **kwargs):
-            # generate key based on called function
-            method = 'pyarrow'
-            if self.key==None:
-                key=self.key_generator(func, method, *args, **kwargs)
-            else:
-                key=self.key_generator(func, method, self.key)
+        return self._apply_cache_decorator(func, 'pyarrow')
 
-            # check if exists in redis
-            if self.cache_container.exists(key) == 1:
-                # Pulls data from redis, deserialses and returns the dataframe
-                value = self._deserialize(key)
-            else:
-                # Runs the function that was decorated
-                value = func(*args, **kwargs)
-                self._serialize(key, value, method='pyarrow')
+    def stream_cache(self, func=None, chunk_columns=None, pipeline_chunks=16, compression=None,
+                     compression_level=None, ttl=None):
+        """
+        Decorater function for generator functions yielding pieces of a frame (polars/pandas
+        frames or arrow tables/record batches). On a miss the pieces are passed through as
+        they are produced and written as the chunks of a chunked entry, the manifest written
+        after the last one marks the entry complete. On a hit the pieces are replayed one
+        at a time from redis. Either way only one piece is held in memory.
+        A generator that is not run to its end leaves nothing in the cache
 
-            return value
+        Usage:
+            @cache.stream_cache
+            def load(day):
+                for path in paths_of(day):
+                    yield pl.read_parquet(path)
+
+        Parameters:
+            func: python generator function (used internally by decorator)
+            chunk_columns: int, columns per chunk, defaults to the instance setting
+            pipeline_chunks: int, number of chunks sent per round trip
+            compression: str, 'none', 'lz4' or 'zstd', defaults to the instance setting
+            compression_level: int, codec level if supported
+            ttl: int, seconds before the entry expires, defaults to the instance setting
+        Returns:
+            generator of the pieces
+        """
+        codec = self._resolve_codec(compression, compression_level)
+        ttl = self._resolve_ttl(ttl)
+
+        def decorator(f):
+            return self._apply_stream_decorator(f, chunk_columns, pipeline_chunks, codec, ttl)
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    def _apply_stream_decorator(self, func, chunk_columns, pipeline_chunks, codec, ttl):
+        @functools.wraps(func)
+        def wrapper_stream_decorator(*args, **kwargs):
+            if self.key==None:
+                key=self.key_generator(func, 'pyarrow', *args, **kwargs)
+            else:
+                key=self.key_generator(func, 'pyarrow', self.key)
+
+            if self._read_manifest(key) is not None:
+                self._count('hits', function=self._namespace_of(key))
+                return self.iter_chunks(key)
+            self._count('misses', function=self._namespace_of(key))
+            return self._tee_stream(key, func(*args, **kwargs), chunk_columns, pipeline_chunks, codec, ttl)
+
+        return wrapper_stream_decorator
+
+    def _tee_stream(self, key, frames, chunk_columns, pipeline_chunks, codec, ttl):
+        """Yields the pieces of frames while writing them under key"""
+        stream = self._stream_begin(key, chunk_columns, None, pipeline_chunks, codec, ttl)
+        completed = False
+        try:
+            for frame in frames:
+                self._stream_write(stream, frame)
+                yield frame
+            if stream['schema'] is not None:
+                self._stream_end(stream)
+            completed = True
+        finally:
+            if not completed:
+                # abandoned by the consumer or failed: no manifest, no chunks
+                self._stream_abort(stream)
+
+    #------------------------------------------------------------------------------------
+    # Query plan memoization of polars LazyFrames
+    #------------------------------------------------------------------------------------
+    def collect(self, lazy_frame, compression=None, compression_level=None, ttl=None, sliding=None):
+        """
+        Collects a LazyFrame through the cache, the result is stored as arrow under
+        the key of its plan, see _plan_key. Concurrent collects of the same plan are
+        single-flighted like the decorators
+        Parameters:
+        -----------
+            lazy_frame=pl.LazyFrame
+            compression=str(), 'none', 'lz4' or 'zstd', defaults to the instance setting
+            compression_level=int(), codec level if supported
+            ttl=int(), seconds before the result expires, defaults to the instance setting
+            sliding=bool, hits push the expiry back by ttl, defaults to the instance setting
+        Returns:
+        --------
+            pl.DataFrame
+        """
+        assert isinstance(lazy_frame, pl.LazyFrame), "[ERROR]: collect expects a polars LazyFrame"
+        ttl = self._resolve_ttl(ttl)
+        key = self._plan_key(lazy_frame, ttl=ttl)
+        if key is None:
+            self._count('uncacheable_plans', function='lazy')
+            return lazy_frame.collect()
+        return self._get_or_compute(key, 'pyarrow', lazy_frame.collect, (), {},
+                                    self._resolve_codec(compression, compression_level), ttl, sliding)
+
+    def lazy_cache(self, func=None, compression=None, compression_level=None, ttl=None, sliding=None):
+        """
+        Decorater function for functions building a polars LazyFrame, the function
+        itself always runs (building a plan is cheap) but the plan is only collected
+        on a miss. The result comes back as the LazyFrame of the cached frame, so
+        queries built on top of it scan the cached result instead of its sources
+
+        Usage:
+            @cache.lazy_cache
+            def my_query(day):
+                return pl.scan_parquet(...).filter(pl.col('day') == day)
+
+        Parameters:
+            func: python function returning a pl.LazyFrame
+            compression, compression_level, ttl, sliding: see collect()
+        Returns:
+            pl.LazyFrame
+        """
+        codec, ttl, sliding = self._decorator_settings(compression, compression_level, ttl, sliding)
+
+        def decorator(f):
+            return self._apply_lazy_decorator(f, codec, ttl, sliding)
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    def _apply_lazy_decorator(self, func, codec, ttl, sliding):
+        @functools.wraps(func)
+        def wrapper_lazy_decorator(*args, **kwargs):
+            lazy_frame = func(*args, **kwargs)
+            if not isinstance(lazy_frame, pl.LazyFrame):
+                raise ValueError("lazy_cache expects {} to return a polars LazyFrame, got {}".format(
+                    func.__name__, type(lazy_frame)))
+            key = self._plan_key(lazy_frame, args, kwargs, ttl)
+            if key is None:
+                # sources that can not be checked for changes, the plan runs uncached
+                self._count('uncacheable_plans', function=func.__name__)
+                return lazy_frame
+            return self._get_or_compute(key, 'pyarrow', lazy_frame.collect, (), {}, codec, ttl, sliding).lazy()
+        return wrapper_lazy_decorator
+
+    #------------------------------------------------------------------------------------
+    # Range caching of time/index sliced frames
+    #------------------------------------------------------------------------------------
+    def range_cache(self, index, start='start', end='end', func=None, compression=None,
+                    compression_level=None, ttl=None, merge_max_rows=1000000):
+        """
+        Decorater function for functions loading the rows of a frame between two bounds,
+        func(..., start, end) should return the rows with start <= index < end.
+        The cache keeps the ranges already loaded as segments and only calls func
+        for the sub-ranges that are missing, adjacent segments are merged in the background
+
+        Usage:
+            @cache.range_cache(index='time')
+            def load_series(name, start, end):
+                return pl.DataFrame(...)
+
+        Parameters:
+            index: str, column holding the time/index values (or index name of pandas frames)
+            start, end: str, names of the parameters of func holding the bounds
+            func: python function (used internally by decorator)
+            compression: str, 'none', 'lz4' or 'zstd', defaults to the instance setting
+            compression_level: int, codec level if supported
+            ttl: int, seconds before segments expire, defaults to the instance setting
+            merge_max_rows: int, adjacent segments are merged up to this many rows
+        Returns:
+            pl.DataFrame or pd.DataFrame, sorted on index
+        """
+        codec = self._resolve_codec(compression, compression_level)
+        ttl = self._resolve_ttl(ttl)
+
+        def decorator(f):
+            return self._apply_range_decorator(f, index, start, end, codec, ttl, merge_max_rows)
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    def _apply_range_decorator(self, func, index, start, end, codec, ttl, merge_max_rows):
+        signature = inspect.signature(func)
+        assert start in signature.parameters and end in signature.parameters, \
+            "[ERROR]: {} should take the parameters {} and {}".format(func.__name__, start, end)
+
+        @functools.wraps(func)
+        def wrapper_range_decorator(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            lo, hi = bound.arguments[start], bound.arguments[end]
+            # the segments of a range are shared by the calls differing only in their bounds
+            others = sorted((k, v) for k, v in bound.arguments.items() if k not in (start, end))
+            base = self._range_base(func, others)
+
+            def compute(piece_lo, piece_hi):
+                arguments = dict(bound.arguments, **{start: piece_lo, end: piece_hi})
+                call = inspect.BoundArguments(signature, collections.OrderedDict(arguments))
+                return func(*call.args, **call.kwargs)
+
+            return self._get_range(base, index, lo, hi, compute, codec, ttl, merge_max_rows)
+
+        return wrapper_range_decorator
+
+    def _range_base(self, func, others):
+        """Key prefix of the segments of a range, from the arguments other than the bounds"""
+        start = time.perf_counter()
+        leading = f"{self.leading_key}-pyarrow-{func.__name__}"
+        if self.hash_keys==True:
+            params = [_fingerprint(others, self.fingerprint_sample_bytes)]
+        else:
+            params = [f"({k}-{self._key_part(v)})" for k, v in others]
+        self._observe('key_seconds', start, function=func.__name__)
+        return "|".join([leading] + params + ['range'])
+
+    def _range_keys(self, base):
+        """(segment index hash, merge lock) keys of a range"""
+        return f"{base}:segments", self._lock_key(f"{base}:merge")
+
+    def _segment_key(self, base, segment_id):
+        return f"{base}|segment-{segment_id}"
+
+    def _read_segments(self, base):
+        """segment id -> (lo, hi, rows) of the segments of a range"""
+        index_key, _ = self._range_keys(base)
+        return {k.decode() if isinstance(k, bytes) else k: pickle.loads(v)
+                for k, v in self.cache_container.hgetall(index_key).items()}
+
+    def _write_segments(self, base, frames, ttl, codec, drop=()):
+        """
+        Posts new segments {(lo, hi): frame} and registers them in the index of the range,
+        dropping the segment ids of drop from it in the same round trip
+        """
+        index_key, _ = self._range_keys(base)
+        entries = {uuid.uuid4().hex: (bounds, frame) for bounds, frame in frames.items()}
+        self._post_many({self._segment_key(base, i): frame for i, (_, frame) in entries.items()},
+                        'pyarrow', codec, ttl)
+        pipe = self._pipeline()
+        pipe.hset(index_key, mapping={i: pickle.dumps((lo, hi, len(frame))) for i, ((lo, hi), frame) in entries.items()})
+        if len(drop) > 0:
+            pipe.hdel(index_key, *drop)
+        if ttl is not None:
+            # the index outlives none of the segments written with it
+            pipe.expire(index_key, ttl)
+        pipe.execute()
+
+    def _get_range(self, base, index, lo, hi, compute, codec, ttl, merge_max_rows):
+        if not lo < hi:
+            return _range_filter(compute(lo, hi), index, lo, hi)
+
+        segments = self._read_segments(base)
+        pieces = _range_partition([(i, s[0], s[1]) for i, s in segments.items()], lo, hi)
+        needed = set(i for i, _, _ in pieces if i is not None)
+        found = self.get_many([self._segment_key(base, i) for i in needed])
+
+        # segments evicted or expired since the index was read are loaded again
+        lost = [i for i in needed if self._segment_key(base, i) not in found]
+        if len(lost) > 0:
+            self.cache_container.hdel(self._range_keys(base)[0], *lost)
+            pieces = [(None if i in lost else i, p_lo, p_hi) for i, p_lo, p_hi in pieces]
+
+        gaps = [(p_lo, p_hi) for i, p_lo, p_hi in pieces if i is None]
+        computed = {(g_lo, g_hi): compute(g_lo, g_hi) for g_lo, g_hi in gaps}
+        self._count('range_hits', len(pieces) - len(gaps), function=self._namespace_of(base))
+        self._count('range_misses', len(gaps), function=self._namespace_of(base))
+        if len(computed) > 0:
+            # empty gaps are kept too, the cache then knows the range has no rows
+            self._write_segments(base, computed, ttl, codec)
+            if len(segments) + len(computed) > 1:
+                self._schedule_merge(base, index, ttl, codec, merge_max_rows)
+
+        frames = []
+        for i, p_lo, p_hi in pieces:
+            frame = computed[(p_lo, p_hi)] if i is None else found[self._segment_key(base, i)]
+            frames.append(_range_filter(frame, index, p_lo, p_hi))
+        return _range_concat(frames, index)
+
+    def _schedule_merge(self, base, index, ttl, codec, merge_max_rows):
+        """Merges the segments of a range on a background thread of its own"""
+        if self._merge_executor is None:
+            self._merge_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"{self.leading_key}Merge")
+        self._merge_executor.submit(self._merge_segments, base, index, ttl, codec, merge_max_rows)
+
+    def _merge_segments(self, base, index, ttl, codec, merge_max_rows):
+        """
+        Rewrites runs of adjacent segments of a range (seg_hi == next seg_lo) holding
+        at most merge_max_rows rows as single segments. Only one process merges a range at a time
+        """
+        _, lock_key = self._range_keys(base)
+        token = uuid.uuid4().hex
+        if not self.cache_container.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+            return
+        try:
+            segments = sorted(self._read_segments(base).items(), key=lambda s: (s[1][0], s[1][1]))
+            runs = []
+            run = []
+            for i, (seg_lo, seg_hi, rows) in segments:
+                if len(run) > 0 and run[-1][1][1] == seg_lo and sum(s[2] for _, s in run) + rows <= merge_max_rows:
+                    run.append((i, (seg_lo, seg_hi, rows)))
+                    continue
+                if len(run) > 1:
+                    runs.append(run)
+                run = [(i, (seg_lo, seg_hi, rows))]
+            if len(run) > 1:
+                runs.append(run)
+
+            for run in runs:
+                keys = [self._segment_key(base, i) for i, _ in run]
+                found = self.get_many(keys)
+                if len(found) < len(keys):
+                    # lost segments are dropped by the next read of the range
+                    continue
+                merged = _range_concat([_range_filter(found[k], index, s[0], s[1])
+                                        for k, (_, s) in zip(keys, run)], index)
+                self._write_segments(base, {(run[0][1][0], run[-1][1][1]): merged}, ttl, codec,
+                                     drop=[i for i, _ in run])
+                self.delete(*keys)
+            self._count('range_merges', len(runs))
+        except Exception as error:
+            # a failed merge leaves the segments as they were
+            self._emit('range_merge_error', key=base, error=repr(error))
+        finally:
+            self._release_lock_script(keys=[lock_key], args=[token])
+
+    #------------------------------------------------------------------------------------
+    # Cache warm-up over grids of arguments
+    #------------------------------------------------------------------------------------
+    def warm(self, func, calls, workers=None, mode='process', batch=None, progress=None):
+        """
+        Computes and caches func over a grid of calls ahead of time. Keys already
+        in redis are skipped (checked in one pipelined round trip), the misses are
+        computed in a process or thread pool and written back batch by batch
+        with pipelined SETs. Failed calls are reported, not raised
+        Parameters:
+        -----------
+            func=python function decorated by this cache (cache, json_cache, pyarrow_cache),
+                 undecorated functions are cached with the pyarrow method
+            calls=iterable, each item is a tuple of positional args, a dict of kwargs
+                  or a single positional arg, as for func.many
+            workers=int(), pool size, defaults to the number of cores
+            mode=str(), 'process' (func must be importable by module and name) or 'thread'
+            batch=int(), calls per task, defaults to spreading the calls in 4 tasks per worker
+            progress=python function, called with the report (see Returns) after every batch
+        Returns:
+        --------
+            dict(), total, cached, computed, failed, failures (key -> error),
+            seconds and per_second (computed calls per second)
+        """
+        assert mode in ('process', 'thread'), "[ERROR]: mode should be 'process' or 'thread'"
+        assert workers is None or (isinstance(workers, int) and workers > 0), \
+            "[ERROR]: workers should be a positive int or None"
+        settings = getattr(func, 'cache_settings', None)
+        raw = inspect.unwrap(func)
+        method, codec, ttl = (settings['method'], settings['codec'], settings['ttl']) \
+            if settings is not None else ('pyarrow', self.codec, self.ttl)
+
+        if mode == 'process' and ('<locals>' in raw.__qualname__ or raw.__name__ == '<lambda>'):
+            raise ValueError("{} can not be imported by the worker processes, use mode='thread'".format(raw.__qualname__))
+
+        start = time.perf_counter()
+        split, keys = self._call_keys(raw, method, calls)
+        pending = collections.OrderedDict()
+        for k, call in zip(keys, split):
+            pending.setdefault(k, call)
+
+        # Existence of every key in a single round trip
+        pipe = self._pipeline()
+        for k in pending:
+            pipe.exists(k)
+        exists = pipe.execute() if len(pending) > 0 else []
+        misses = [(k, call) for (k, call), found in zip(pending.items(), exists) if not found]
+
+        report = {'total': len(pending), 'cached': len(pending) - len(misses), 'computed': 0,
+                  'failed': 0, 'failures': {}, 'seconds': 0.0, 'per_second': None}
+        if len(misses) == 0:
+            report['seconds'] = time.perf_counter() - start
+            return report
+
+        workers = workers or os.cpu_count() or 1
+        batch = batch or max(1, math.ceil(len(misses) / (workers * 4)))
+        batches = [misses[i:i + batch] for i in range(0, len(misses), batch)]
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if mode == 'process' \
+            else concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{self.leading_key}Warm")
+        try:
+            futures = {}
+            for b in batches:
+                calls_of_batch = [call for _, call in b]
+                if mode == 'process':
+                    future = pool.submit(_warm_worker, raw.__module__, raw.__qualname__, calls_of_batch)
+                else:
+                    future = pool.submit(_warm_run, raw, calls_of_batch)
+                futures[future] = b
+
+            for future in concurrent.futures.as_completed(futures):
+                b = futures[future]
+                try:
+                    results = future.result()
+                except Exception as error:
+                    # the whole task failed, e.g. the worker could not import func
+                    results = [(False, repr(error))] * len(b)
+                computed = {}
+                for (k, _), (ok, value) in zip(b, results):
+                    if ok:
+                        computed[k] = value
+                    else:
+                        report['failures'][k] = value
+                self._post_many(computed, method, codec, ttl)
+
+                report['computed'] += len(computed)
+                report['failed'] = len(report['failures'])
+                report['seconds'] = time.perf_counter() - start
+                report['per_second'] = report['computed'] / report['seconds'] if report['seconds'] > 0 else None
+                self._count('warm_computed', len(computed), function=raw.__name__)
+                self._count('warm_failed', len(b) - len(computed), function=raw.__name__)
+                if progress is not None:
+                    progress(dict(report, failures=dict(report['failures'])))
+        finally:
+            pool.shutdown(wait=True)
+        return report
+
+    #------------------------------------------------------------------------------------
+    # Expiry and per-namespace byte budgets
+    #------------------------------------------------------------------------------------
+    def set_budget(self, namespace, nbytes):
+        """
+        Sets the byte budget of a namespace, None falls back to budget_bytes
+        Parameters:
+        -----------
+            namespace=str(), function name of decorated entries, 'default' for other keys
+            nbytes=int()
+        """
+        if nbytes is None:
+            self.budgets.pop(namespace, None)
+        else:
+            assert isinstance(nbytes, int) and nbytes > 0, "[ERROR]: nbytes should be a positive int"
+            self.budgets[namespace]=nbytes
+
+    def _budget_of(self, namespace):
+        return self.budgets.get(namespace, self.budget_bytes)
+
+    def _index_keys(self, namespace):
+        """Access sorted set, sizes hash, total bytes counter, lfu age and expiry sorted set of a namespace"""
+        # the {hash tag} keeps the five keys on the same node/slot for the Lua scripts
+        prefix = f"{self.leading_key}Index:{{{namespace}}}"
+        return [f"{prefix}:access", f"{prefix}:sizes", f"{prefix}:bytes", f"{prefix}:age", f"{prefix}:expiry"]
+
+    def _access_score(self):
+        return time.time()
+
+    def _touch(self, pipe, key, slide=None):
+        """Queues the access score update of a budgeted entry on pipe, and its new expiry if it slides"""
+        namespace = self._namespace_of(key)
+        if self._budget_of(namespace) is None:
+            return
+        access, _, _, _, expiry = self._index_keys(namespace)
+        if self.eviction == 'lfu':
+            pipe.zadd(access, {key: 1}, xx=True, incr=True)
+        else:
+            pipe.zadd(access, {key: self._access_score()}, xx=True)
+        if slide is not None:
+            pipe.zadd(expiry, {key: time.time() + slide}, xx=True)
+
+    def _fetch(self, key, slide=None):
+        """
+        GET of key, in the same round trip pushes its expiry back by slide seconds
+        and bumps its access score if its namespace has a budget.
+        Disk tier pointers not readable on this host are misses, keys missing
+        from redis are restored from the disk tier if it still has their file
+        Returns:
+        --------
+            (payload or None, seconds left before the entry expires or None),
+            the expiry is only read when there is a local tier to bound
+        """
+        pull_value, ttl = self._fetch_remote(key, slide)
+        if pull_value is not None:
+            return (pull_value, ttl) if _readable_here(pull_value) else (None, None)
+        restored = self._restore_from_disk(key)
+        if restored is None:
+            self._untrack_missing([key])
+            return None, None
+        return restored
+
+    def _restore_from_disk(self, key):
+        """(pointer to the unexpired file of key in the disk tier, posted back to redis, its ttl) or None"""
+        if self.disk is None:
+            return None
+        found = self.disk.lookup(key)
+        if found is None:
+            return None
+        ttl, kind = found
+        path = self.disk.path_of(key)
+        pull_value = self.disk.pointer(path, os.path.getsize(path), kind)
+        self.cache_container.set(key, pull_value, ex=ttl)
+        self._account([(key, len(pull_value))], ttl)
+        self._count('disk_restores', function=self._namespace_of(key))
+        return pull_value, ttl
+
+    def _fetch_remote(self, key, slide=None):
+        budgeted = self._budget_of(self._namespace_of(key)) is not None
+        start = time.perf_counter()
+        if slide is None and not budgeted and self.local is None:
+            pull_value = self.cache_container.get(key)
+            self._observe('redis_seconds', start, command='get')
+            return pull_value, None
+
+        pipe = self._pipeline()
+        pipe.get(key)
+        if slide is not None:
+            pipe.expire(key, slide)
+        self._touch(pipe, key, slide)
+        if self.local is not None:
+            # after the EXPIRE, so a slide is accounted for
+            pipe.pttl(key)
+        replies = pipe.execute()
+        pull_value = replies[0]
+        ttl = _seconds_left(replies[-1]) if self.local is not None else None
+        self._observe('redis_seconds', start, command='get')
+
+        if slide is not None and pull_value is not None and _is_manifest(pull_value):
+            # the chunks have to live as long as their manifest
+            pipe = self._pipeline()
+            for chunk_key in self._manifest_chunk_keys(key, self._parse_manifest(pull_value)):
+                pipe.expire(chunk_key, slide)
+            pipe.execute()
+        return pull_value, ttl
+
+    def _account(self, entries, ttl=None):
+        """
+        Records the payload bytes of written entries in the index of their
+        namespace and evicts entries of the namespaces that went over budget
+        Parameters:
+        -----------
+            entries=list of (key, nbytes)
+            ttl=int(), seconds before the entries expire, None if they do not
+        """
+        entries = [(k, n, self._namespace_of(k)) for k, n in entries]
+        entries = [e for e in entries if self._budget_of(e[2]) is not None]
+        if len(entries) == 0:
+            return
+
+        expires = 0 if ttl is None else time.time() + ttl
+        pipe = self._pipeline()
+        for k, n, namespace in entries:
+            self._track_write_script(keys=self._index_keys(namespace),
+                                     args=[k, n, self._access_score(), self.eviction, expires], client=pipe)
+        totals = {}
+        for (_, _, namespace), total in zip(entries, pipe.execute()):
+            totals[namespace] = max(totals.get(namespace, 0), int(total))
+
+        written = set(k for k, _, _ in entries)
+        for namespace, total in totals.items():
+            self._evict(namespace, total, written)
+
+    def _untrack_missing(self, keys):
+        """
+        Drops keys found missing from redis (expired) from the budget accounting,
+        their bytes would otherwise count against the budget of live entries
+        Returns:
+        --------
+            int(), bytes dropped from the accounting
+        """
+        keys = [k for k in keys if self._budget_of(self._namespace_of(k)) is not None]
+        if len(keys) == 0:
+            return 0
+        pipe = self._pipeline()
+        for k in keys:
+            self._untrack_script(keys=self._index_keys(self._namespace_of(k)), args=[k], client=pipe)
+        return sum(int(n) for n in pipe.execute())
+
+    def _existing(self, keys):
+        """The keys still in redis, one EXISTS per key as they may live on different nodes"""
+        pipe = self._pipeline()
+        for k in keys:
+            pipe.exists(k)
+        return set(k for k, found in zip(keys, pipe.execute()) if found)
+
+    def _evict(self, namespace, total, written=(), batch=16):
+        """
+        Deletes entries of namespace in increasing score order, one victim at a time,
+        until its total is back within its budget. Entries that already expired are
+        only dropped from the accounting, the entries just written (written) go last
+        """
+        budget = self._budget_of(namespace)
+        access, sizes, _, age_key, expiry = self._index_keys(namespace)
+        if total > budget:
+            # the bytes of the entries whose ttl ran out are released first
+            due = [v.decode() if isinstance(v, bytes) else v
+                   for v in self.cache_container.zrangebyscore(expiry, '-inf', time.time())]
+            if len(due) > 0:
+                existing = self._existing(due)
+                total -= self._untrack_missing([k for k in due if k not in existing])
+        victims = []
+        expired = []
+        spared = []
+        last_score = None
+        offset = 0
+        while total > budget:
+            scored = self.cache_container.zrange(access, offset, offset + batch - 1, withscores=True)
+            if len(scored) == 0:
+                break
+            offset += len(scored)
+            names = [v.decode() if isinstance(v, bytes) else v for v, _ in scored]
+            existing = self._existing(names)
+            for name, (_, score), size in zip(names, scored, self.cache_container.hmget(sizes, names)):
+                if total <= budget:
+                    break
+                if name not in existing:
+                    expired.append(name)
+                elif name in written:
+                    spared.append((name, int(size or 0), score))
+                    continue
+                else:
+                    victims.append(name)
+                    last_score = score
+                total -= int(size or 0)
+        # only an entry larger than the budget by itself is evicted when just written
+        for name, size, score in spared:
+            if total <= budget:
+                break
+            victims.append(name)
+            last_score = score
+            total -= size
+
+        self._untrack_missing(expired)
+        if len(victims) > 0:
+            if self.eviction == 'lfu':
+                self._raise_age_script(keys=[age_key], args=[last_score])
+            self.delete(*victims)
+            self._count('evictions', len(victims))
+
+    def delete(self, *keys):
+        """
+        Deletes entries, with the chunks of chunked entries, drops them from the
+        budget accounting and from the local tiers of every process
+        Parameters:
+        -----------
+            keys=str()
+        """
+        if len(keys) == 0:
+            return
+        to_delete = list(keys) + self._chunk_keys_under(keys)
+
+        pipe = self._pipeline()
+        # one DEL per key, the keys may live on different nodes
+        for k in to_delete:
+            pipe.delete(k)
+        for k in keys:
+            namespace = self._namespace_of(k)
+            if self._budget_of(namespace) is not None:
+                self._untrack_script(keys=self._index_keys(namespace), args=[k], client=pipe)
+        self._publish_invalidation(pipe, keys)
+        pipe.execute()
+
+        for k in keys:
+            self.keys.pop(k, None)
+            if self.disk is not None:
+                self.disk.remove(k)
+        if self.local is not None:
+            self.local.invalidate(keys)
+
+    #------------------------------------------------------------------------------------
+    # Write-behind of computed values
+    #------------------------------------------------------------------------------------
+    def _write_behind(self, key, value, method, codec, ttl, lock=None):
+        """
+        Queues the encoding and SET of a computed value on the write-behind pool,
+        blocks while write_behind_queue writes are already pending (backpressure).
+        Until it is written, readers of this process get the value from the in-flight map
+        Parameters:
+        -----------
+            lock=(lock key, token) of the single-flight lock, released once the value
+                 is in redis so that waiting workers do not give up and recompute it
+        """
+        self._write_slots.acquire()
+        with self._pending_lock:
+            self._pending[key] = value
+        if self._write_executor is None:
+            self._write_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.write_behind_workers, thread_name_prefix=f"{self.leading_key}WriteBehind")
+        future = self._write_executor.submit(self._write_task, key, value, method, codec, ttl, lock)
+        with self._pending_lock:
+            self._writes.add(future)
+        future.add_done_callback(self._write_done)
+        self._count('write_behind_queued')
+
+    def _write_task(self, key, value, method, codec, ttl, lock):
+        try:
+            self._serialize(key, value, method, codec, ttl)
+        except Exception as error:
+            # the value was already returned, the next miss will compute it again
+            self._count('write_behind_errors')
+            self._emit('write_behind_error', key=key, error=repr(error))
+        finally:
+            with self._pending_lock:
+                if self._pending.get(key) is value:
+                    del self._pending[key]
+            self._write_slots.release()
+            if lock is not None:
+                self._release_lock_script(keys=[lock[0]], args=[lock[1]])
+
+    def _write_done(self, future):
+        with self._pending_lock:
+            self._writes.discard(future)
+
+    def _pending_get(self, key):
+        """Value of key still being written behind, _MISSING if there is none"""
+        if not self.write_behind:
+            return _MISSING
+        with self._pending_lock:
+            return self._pending.get(key, _MISSING)
+
+    def flush(self, timeout=None):
+        """
+        Waits for the pending write-behind writes, called at exit and by close()
+        Returns:
+        --------
+            bool, True if every pending write is done
+        """
+        with self._pending_lock:
+            writes = list(self._writes)
+        done, not_done = concurrent.futures.wait(writes, timeout=timeout)
+        return len(not_done) == 0
+
+    #------------------------------------------------------------------------------------
+    # Single-flight computation of misses
+    #------------------------------------------------------------------------------------
+    def _get_or_compute(self, key, method, func, args, kwargs, codec=_MISSING, ttl=_MISSING, sliding=None):
+        """
+        Returns the cached value of key with a single GET on a hit, on a miss
+        only the worker holding the lock runs func while the others wait for its result
+        Parameters:
+        -----------
+            key=str(), key of the value in redis
+            method=str(), serialization method
+            func=python function, computes the value on a miss
+            args, kwargs=inputs of func
+            codec=(name, level) or None, compression of pyarrow payloads
+            ttl=int() or None, expiry of the entry
+            sliding=bool, a hit pushes the expiry back by ttl
+        Returns:
+        --------
+            python object
+        """
+        ttl = self._resolve_ttl(ttl)
+        sliding = self.sliding if sliding is None else sliding
+
+        value = self._local_get(key)
+        if value is not _MISSING:
+            self._count('hits', function=self._namespace_of(key))
+            return value
+
+        local_token = self._local_token()
+        pull_value, remaining = self._fetch(key, ttl if sliding else None)
+        if pull_value is not None:
+            self._count('hits', function=self._namespace_of(key))
+            return self._decode_to_local(key, pull_value, remaining, local_token)
+        self._count('misses', function=self._namespace_of(key))
+
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        if self.cache_container.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+            handed_over = False
+            try:
+                # The previous holder may have posted the value between our GET and SET NX
+                local_token = self._local_token()
+                pull_value = self.cache_container.get(key)
+                if pull_value is not None and _readable_here(pull_value):
+                    # just posted by the previous holder, with the same ttl
+                    return self._decode_to_local(key, pull_value, ttl, local_token)
+                value = func(*args, **kwargs)
+                if self.write_behind:
+                    # the write releases the lock once the value is in redis
+                    self._write_behind(key, value, method, codec, ttl, (lock_key, token))
+                    handed_over = True
+                else:
+                    self._serialize(key, value, method, codec, ttl)
+                return value
+            finally:
+                if not handed_over:
+                    self._release_lock_script(keys=[lock_key], args=[token])
+
+        # Another worker is computing the value, poll for it for a bounded time
+        self._count('waits', function=self._namespace_of(key))
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll)
+            pipe = self._pipeline()
+            pipe.get(key)
+            pipe.exists(lock_key)
+            local_token = self._local_token()
+            pull_value, locked = pipe.execute()
+            if pull_value is not None:
+                if not _readable_here(pull_value):
+                    # posted as a disk tier file of another host, compute it here
+                    break
+                self._count('wait_hits', function=self._namespace_of(key))
+                return self._decode_to_local(key, pull_value, ttl, local_token)
+            if not locked:
+                # the holder failed or expired without posting, stop waiting
+                break
+
+        self._count('wait_timeouts', function=self._namespace_of(key))
+        value = func(*args, **kwargs)
+        if self.write_behind:
+            self._write_behind(key, value, method, codec, ttl)
+        else:
+            self._serialize(key, value, method, codec, ttl)
+        return value
+
+
+class AsyncRolarsCache(object):
+    """
+    asyncio counterpart of RolarsCache built on redis.asyncio.
+    get/post/get_many/post_many/delete/describe are coroutines and the cache() decorator
+    (as well as json_cache/pyarrow_cache/lazy_cache) wraps async def functions.
+    Keys, payloads and statistics go through the same _CacheCore as RolarsCache, so
+    both read the entries of the other. Encoding and decoding of payloads of more than
+    offload_min_bytes run in the thread pool, so large frames do not stall the event loop.
+    Chunked entries can be read but not written. The local and disk tiers, byte budgets,
+    write-behind, range caching and warm-up are only available in RolarsCache
+    """
+
+    def __init__(self, redis_instance, key=None, hash_keys=False, max_workers=None,
+                 lock_timeout=30.0, lock_wait=10.0, lock_poll=0.05,
+                 compression='none', compression_level=None, compression_min_bytes=65536,
+                 track_keys=False, ttl=None, sliding=False, fingerprint_sample_bytes=None,
+                 offload_min_bytes=1 << 20):
+        self._check_container(redis_instance)
+        self.cache_container = redis_instance
+
+        # keys, codecs, expiry, single-flight and instrumentation settings, see _CacheCore
+        self._core=_CacheCore(key=key, hash_keys=hash_keys, max_workers=max_workers, lock_timeout=lock_timeout,
+                              lock_wait=lock_wait, lock_poll=lock_poll, compression=compression,
+                              compression_level=compression_level, compression_min_bytes=compression_min_bytes,
+                              track_keys=track_keys, ttl=ttl, sliding=sliding,
+                              fingerprint_sample_bytes=fingerprint_sample_bytes)
+        self._release_lock_script=self.cache_container.register_script(_RELEASE_LOCK_LUA)
+
+        assert isinstance(offload_min_bytes, int) and offload_min_bytes >= 0, \
+            "[ERROR]: offload_min_bytes should be a non negative int"
+        self.offload_min_bytes=offload_min_bytes
+        # Scanning needs the event loop, refresh() has to be awaited if track_keys is set
+
+    def _check_container(self, redis_instance):
+        if isinstance(redis_instance, redis.asyncio.Redis) !=True:
+            raise AttributeError(
+                "Did not recieve an asyncio Redis Object, instead received {}".format(type(redis_instance)))
+
+    @property
+    def keys(self):
+        """key -> serialization method of the keys seen by this instance, see track_keys"""
+        return self._core.keys
+
+    async def refresh(self):
+        keys_already_present = []
+        async for k in self.cache_container.scan_iter(match=f"{self._core.leading_key}-*"):
+            parsed = _CacheCore._parse_scanned_key(k)
+            if parsed is not None:
+                keys_already_present.append(parsed)
+        self._core.keys = dict(keys_already_present)
+
+    def close(self):
+        """Stops the thread pool"""
+        self._core.close()
+
+    #------------------------------------------------------------------------------------
+    # Keys and instrumentation, shared with RolarsCache
+    #------------------------------------------------------------------------------------
+    register_hasher = staticmethod(_CacheCore.register_hasher)
+
+    def key_generator(self, func, method, *args, **kwargs):
+        """See RolarsCache.key_generator, both caches give a call the same key"""
+        return self._core.key_generator(func, method, *args, **kwargs)
+
+    def stats(self):
+        """See RolarsCache.stats"""
+        return self._core.stats()
+
+    def prometheus_text(self, prefix='rolars_cache'):
+        """See RolarsCache.prometheus_text"""
+        return self._core.prometheus_text(prefix)
+
+    def add_hook(self, hook):
+        """See RolarsCache.add_hook"""
+        self._core.add_hook(hook)
+
+    def remove_hook(self, hook):
+        self._core.remove_hook(hook)
+
+    #------------------------------------------------------------------------------------
+    # Off-loop encoding and decoding
+    #------------------------------------------------------------------------------------
+    async def _offload(self, nbytes, func, *args):
+        """Runs func inline for small payloads, in the thread pool otherwise"""
+        if nbytes < self.offload_min_bytes:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._core._get_executor(), functools.partial(func, *args))
+
+    async def _decode_async(self, key, pull_value):
+        if _is_manifest(pull_value):
+            return await self._get_chunked_async(key, self._core._parse_manifest(pull_value))
+        return await self._offload(len(pull_value), self._core._decode, key, pull_value)
+
+    async def _get_chunked_async(self, key, manifest, columns=None, row_slice=None):
+        core = self._core
+        schema, columns, group_idx, batches = core._chunk_plan(manifest, columns, row_slice)
+        chunk_keys = core._batch_chunk_keys(key, manifest, batches, group_idx)
+        start = time.perf_counter()
+        raws = await self.cache_container.mget(chunk_keys) if len(chunk_keys) > 0 else []
+        core._observe('redis_seconds', start, command='mget')
+        core._count('bytes_in', sum(len(r) for r in raws if r is not None))
+        raws = core._split_chunks(key, raws, len(batches), len(group_idx))
+        nbytes = sum(len(r) for batch in raws for r in batch)
+        return await self._offload(nbytes, core._assemble_frame, schema, columns, raws, batches,
+                                   manifest.get('kind', 'polars.DataFrame'))
+
+    #------------------------------------------------------------------------------------
+    # GET and POST coroutines
+    #------------------------------------------------------------------------------------
+    async def _fetch_async(self, key, slide=None):
+        """
+        GET of key, in the same round trip pushes its expiry back by slide seconds.
+        Disk tier pointers written by RolarsCache instances are misses unless readable on this host
+        """
+        start = time.perf_counter()
+        if slide is None:
+            pull_value = await self.cache_container.get(key)
+        else:
+            pipe = self.cache_container.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.expire(key, slide)
+            pull_value = (await pipe.execute())[0]
+        self._core._observe('redis_seconds', start, command='get')
+        if pull_value is not None and not _readable_here(pull_value):
+            return None
+        return pull_value
+
+    async def describe(self, key):
+        """Same as RolarsCache.describe, a single GETRANGE of the header"""
+        return _describe_header(await self.cache_container.getrange(key, 0, _HEADER.size - 1))
+
+    async def get(self, key, columns=None, row_slice=None, slide=None):
+        """
+        Returns object from the redis database if key exists
+        Parameters:
+        -----------
+            key=str()
+            columns=list(), optional column projection of a frame
+            row_slice=slice(), optional rows of a frame
+            slide=int(), seconds, pushes the expiry of the entry back (sliding expiration)
+        """
+        pull_value = await self._fetch_async(key, slide)
+        if pull_value is None:
+            raise ValueError("No key {} found in object".format(key))
+        if _is_manifest(pull_value):
+            return await self._get_chunked_async(key, self._core._parse_manifest(pull_value), columns, row_slice)
+        value = await self._decode_async(key, pull_value)
+        if columns is None and row_slice is None:
+            return value
+        return _project(value, columns, row_slice)
+
+    async def post(self, key, values, serialization='pyarrow', compression=None, compression_level=None,
+                   ttl=None):
+        """
+        Posts key,value to redis where its serilaized by the serialization param
+        Parameters:
+        -----------
+            key=str()
+            values=python object
+            serialization=str(), of which is 'pickle', 'json', 'pyarrow'
+            compression=str(), 'none', 'lz4' or 'zstd' (pyarrow only), defaults to the instance setting
+            compression_level=int(), codec level if supported
+            ttl=int(), seconds before the entry expires, defaults to the instance setting
+        """
+        assert isinstance(key, str)
+        assert serialization in _CacheCore._ACCEPTABLE_METHODS
+        await self._post_many({key: values}, serialization, self._core._resolve_codec(compression, compression_level),
+                              self._core._resolve_ttl(ttl))
+
+    async def get_many(self, keys):
+        """
+        Returns the objects stored under keys using a single MGET round trip
+        Returns:
+        --------
+            dict(), key -> python object, keys not found in redis are left out
+        """
+        keys = list(keys)
+        if len(keys) == 0:
+            return {}
+        start = time.perf_counter()
+        pulled = await self.cache_container.mget(keys)
+        self._core._observe('redis_seconds', start, command='mget')
+        pulled = [(k, v) for k, v in zip(keys, pulled) if v is not None and _readable_here(v)]
+        values = await asyncio.gather(*[self._decode_async(k, v) for k, v in pulled])
+        return dict(zip([k for k, _ in pulled], values))
+
+    async def post_many(self, mapping, serialization=None, compression=None, compression_level=None,
+                        ttl=None):
+        """
+        Posts every key,value of mapping to redis in a single pipelined round trip
+        Parameters:
+        -----------
+            mapping=dict(), str() -> python object
+            serialization=str(), of which is 'pickle', 'json', 'pyarrow',
+                          if None the method is taken from each key
+            compression=str(), 'none', 'lz4' or 'zstd' (pyarrow only), defaults to the instance setting
+            compression_level=int(), codec level if supported
+            ttl=int(), seconds before the entries expire, defaults to the instance setting
+        """
+        assert isinstance(mapping, dict)
+        assert serialization is None or serialization in _CacheCore._ACCEPTABLE_METHODS
+        await self._post_many(mapping, serialization, self._core._resolve_codec(compression, compression_level),
+                              self._core._resolve_ttl(ttl))
+
+    async def _post_many(self, mapping, serialization, codec, ttl=_MISSING):
+        if len(mapping) == 0:
+            return
+        ttl = self._core._resolve_ttl(ttl)
+        items = list(mapping.items())
+        encoded = await asyncio.gather(*[
+            self._offload(_estimate_nbytes(v, 0), self._core._encode, k, v, serialization, codec) for k, v in items])
+        # chunks of the chunked entries being replaced, deleted with the writes
+        replaced = await self._chunk_keys_under([k for k, _ in items])
+
+        pipe = self.cache_container.pipeline(transaction=False)
+        for (k, _), v in zip(items, encoded):
+            pipe.set(k, v, ex=ttl)
+        if len(replaced) > 0:
+            pipe.delete(*replaced)
+        self._core._publish_invalidation(pipe, [k for k, _ in items])
+        start = time.perf_counter()
+        await pipe.execute()
+        self._core._observe('redis_seconds', start, command='set')
+
+    async def _chunk_keys_under(self, keys):
+        """Chunk keys of the chunked entries stored under keys, only their headers are read for the others"""
+        pipe = self.cache_container.pipeline(transaction=False)
+        for k in keys:
+            pipe.getrange(k, 0, _HEADER.size - 1)
+        manifests = [k for k, head in zip(keys, await pipe.execute()) if head is not None and _is_manifest(head)]
+        chunk_keys = []
+        if len(manifests) > 0:
+            for k, pull_value in zip(manifests, await self.cache_container.mget(manifests)):
+                if pull_value is not None and _is_manifest(pull_value):
+                    chunk_keys.extend(self._core._manifest_chunk_keys(k, self._core._parse_manifest(pull_value)))
+        return chunk_keys
+
+    async def _serialize_async(self, key, value, method, codec, ttl):
+        await self._post_many({key: value}, method, codec, ttl)
+
+    async def delete(self, *keys):
+        """
+        Deletes entries, with the chunks of chunked entries
+        """
+        if len(keys) == 0:
+            return
+        to_delete = list(keys) + await self._chunk_keys_under(keys)
+        pipe = self.cache_container.pipeline(transaction=False)
+        pipe.delete(*to_delete)
+        self._core._publish_invalidation(pipe, keys)
+        await pipe.execute()
+
+    #------------------------------------------------------------------------------------
+    # Coroutine-aware decorators
+    #------------------------------------------------------------------------------------
+    def cache(self, method='pyarrow', func=None, compression=None, compression_level=None,
+              ttl=None, sliding=None):
+        """
+        Same as RolarsCache.cache for async def functions
+
+        Usage:
+            @cache.cache(method='pyarrow')
+            async def my_function():
+                return pl.DataFrame(...)
+        """
+        assert method in _CacheCore._ACCEPTABLE_METHODS
+        codec, ttl, sliding = self._core._decorator_settings(compression, compression_level, ttl, sliding)
+        if func is not None:
+            return self._apply_cache_decorator(func, method, codec, ttl, sliding)
+
+        def decorator(f):
+            return self._apply_cache_decorator(f, method, codec, ttl, sliding)
+        return decorator
+
+    def json_cache(self, func):
+        """Same as RolarsCache.json_cache for async def functions"""
+        return self._apply_cache_decorator(func, 'json')
+
+    def pyarrow_cache(self, func):
+        """Same as RolarsCache.pyarrow_cache for async def functions"""
+        return self._apply_cache_decorator(func, 'pyarrow')
+
+    def lazy_cache(self, func=None, compression=None, compression_level=None, ttl=None, sliding=None):
+        """Same as RolarsCache.lazy_cache for async def functions returning a pl.LazyFrame"""
+        codec, ttl, sliding = self._core._decorator_settings(compression, compression_level, ttl, sliding)
+
+        def decorator(f):
+            return self._apply_lazy_decorator(f, codec, ttl, sliding)
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    async def collect(self, lazy_frame, compression=None, compression_level=None, ttl=None, sliding=None):
+        assert isinstance(lazy_frame, pl.LazyFrame), "[ERROR]: collect expects a polars LazyFrame"
+        ttl = self._core._resolve_ttl(ttl)
+        key = self._core._plan_key(lazy_frame, ttl=ttl)
+        if key is None:
+            self._core._count('uncacheable_plans', function='lazy')
+            return await self._collect_async(lazy_frame)
+        return await self._get_or_compute(key, 'pyarrow', self._collect_async, (lazy_frame,), {},
+                                          self._core._resolve_codec(compression, compression_level), ttl, sliding)
+
+    async def _collect_async(self, lazy_frame):
+        """Collects in the thread pool, polars releases the GIL while executing the plan"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._core._get_executor(), lazy_frame.collect)
+
+    def _apply_lazy_decorator(self, func, codec, ttl, sliding):
+        if not asyncio.iscoroutinefunction(func):
+            raise TypeError("AsyncRolarsCache decorates async def functions, {} is not one".format(func))
+
+        @functools.wraps(func)
+        async def wrapper_lazy_decorator(*args, **kwargs):
+            lazy_frame = await func(*args, **kwargs)
+            if not isinstance(lazy_frame, pl.LazyFrame):
+                raise ValueError("lazy_cache expects {} to return a polars LazyFrame, got {}".format(
+                    func.__name__, type(lazy_frame)))
+            key = self._core._plan_key(lazy_frame, args, kwargs, ttl)
+            if key is None:
+                # sources that can not be checked for changes, the plan runs uncached
+                self._core._count('uncacheable_plans', function=func.__name__)
+                return lazy_frame
+            value = await self._get_or_compute(key, 'pyarrow', self._collect_async, (lazy_frame,), {},
+                                               codec, ttl, sliding)
+            return value.lazy()
+        return wrapper_lazy_decorator
+
+    def _apply_cache_decorator(self, func, method, codec=_MISSING, ttl=_MISSING, sliding=None):
+        """Helper method that applies the caching decorator logic to an async def function"""
+        if not asyncio.iscoroutinefunction(func):
+            raise TypeError("AsyncRolarsCache decorates async def functions, {} is not one".format(func))
+
+        @functools.wraps(func)
+        async def wrapper_df_decorator(*args, **kwargs):
+            # generate key based on called function
+            if self._core.key==None:
+                key=self.key_generator(func, method, *args, **kwargs)
+            else:
+                key=self.key_generator(func, method, self._core.key)
+
+            return await self._get_or_compute(key, method, func, args, kwargs, codec, ttl, sliding)
+
+        # Batched path: await func.many([args, ...]) costs one MGET and one pipelined SET
+        wrapper_df_decorator.many = functools.partial(self._call_many, func, method, codec, ttl)
         return wrapper_df_decorator
 
+    async def _call_many(self, func, method, codec, ttl, calls):
+        split, keys = self._core._call_keys(func, method, calls)
+        found = await self.get_many(set(keys))
+
+        # Runs the function for the misses only, once per distinct key, concurrently
+        missing = {}
+        for k, (a, kw) in zip(keys, split):
+            if k not in found and k not in missing:
+                missing[k] = (a, kw)
+        computed = await asyncio.gather(*[func(*a, **kw) for a, kw in missing.values()])
+        missing = dict(zip(missing.keys(), computed))
+
+        self._core._count('hits', len(found), function=func.__name__)
+        self._core._count('misses', len(missing), function=func.__name__)
+        await self._post_many(missing, method, codec, ttl)
+        found.update(missing)
+        return [found[k] for k in keys]
+
+    async def _get_or_compute(self, key, method, func, args, kwargs, codec=_MISSING, ttl=_MISSING, sliding=None):
+        """
+        Same single-flight logic as RolarsCache._get_or_compute,
+        waiting workers yield to the event loop between polls
+        """
+        ttl = self._core._resolve_ttl(ttl)
+        sliding = self._core.sliding if sliding is None else sliding
+
+        pull_value = await self._fetch_async(key, ttl if sliding else None)
+        if pull_value is not None:
+            self._core._count('hits', function=self._core._namespace_of(key))
+            return await self._decode_async(key, pull_value)
+        self._core._count('misses', function=self._core._namespace_of(key))
+
+        lock_key = self._core._lock_key(key)
+        token = uuid.uuid4().hex
+        if await self.cache_container.set(lock_key, token, nx=True, px=int(self._core.lock_timeout * 1000)):
+            try:
+                # The previous holder may have posted the value between our GET and SET NX
+                pull_value = await self.cache_container.get(key)
+                if pull_value is not None and _readable_here(pull_value):
+                    return await self._decode_async(key, pull_value)
+                value = await func(*args, **kwargs)
+                await self._serialize_async(key, value, method, codec, ttl)
+                return value
+            finally:
+                await self._release_lock_script(keys=[lock_key], args=[token])
+
+        # Another worker is computing the value, poll for it for a bounded time
+        self._core._count('waits', function=self._core._namespace_of(key))
+        deadline = time.monotonic() + self._core.lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self._core.lock_poll)
+            pipe = self.cache_container.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.exists(lock_key)
+            pull_value, locked = await pipe.execute()
+            if pull_value is not None:
+                if not _readable_here(pull_value):
+                    # posted as a disk tier file of another host, compute it here
+                    break
+                self._core._count('wait_hits', function=self._core._namespace_of(key))
+                return await self._decode_async(key, pull_value)
+            if not locked:
+                # the holder failed or expired without posting, stop waiting
+                break
+
+        self._core._count('wait_timeouts', function=self._core._namespace_of(key))
+        value = await func(*args, **kwargs)
+        await self._serialize_async(key, value, method, codec, ttl)
+        return value
+
 if __name__ == "__main__":
     import polars as pl
     import pyarrow as pa
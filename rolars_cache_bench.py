@@ -0,0 +1,286 @@
+"""
+Benchmarks of RolarsCache against a throwaway local redis-server
+(or fakeredis if no redis-server binary is found, the lua scripts of the
+locks and of the key tracking then need the lupa package: pip install fakeredis[lua]).
+
+Sweeps frame shapes and dtypes over every serialization method and access
+pattern (post, get, decorator miss/hit, concurrent readers), reports throughput,
+p50/p99 latencies and redis memory per entry, and writes the results as json
+so that runs of different commits can be compared:
+
+    python rolars_cache_bench.py --out before.json
+    python rolars_cache_bench.py --out after.json --compare before.json
+"""
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import polars as pl
+import pyarrow as pa
+import redis
+
+from rolars_cache import RolarsCache
+
+SHAPES = [(1000, 10), (100000, 10), (1000000, 20)]
+DTYPES = ['float64', 'int64', 'str', 'mixed']
+METHODS = ['pyarrow', 'pickle', 'json']
+PATTERNS = ['post', 'get', 'decorator_miss', 'decorator_hit', 'concurrent_get']
+
+#------------------------------------------------------------------------------------
+# Redis server
+#------------------------------------------------------------------------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_redis(redis_server=None):
+    """
+    Starts a redis-server without persistence on a free port
+    Returns:
+    --------
+        (redis.Redis, backend name, stop function)
+    """
+    binary = redis_server or shutil.which('redis-server')
+    if binary is not None:
+        port = _free_port()
+        workdir = tempfile.mkdtemp(prefix='rolars_bench_')
+        process = subprocess.Popen([binary, '--port', str(port), '--save', '', '--appendonly', 'no',
+                                    '--dir', workdir], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        client = redis.Redis(port=port)
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                client.ping()
+                break
+            except redis.exceptions.ConnectionError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    process.kill()
+                    raise RuntimeError("redis-server did not start on port {}".format(port))
+                time.sleep(0.05)
+
+        def stop():
+            client.close()
+            process.terminate()
+            process.wait(timeout=10)
+            shutil.rmtree(workdir, ignore_errors=True)
+        return client, f"redis-server {client.info('server')['redis_version']}", stop
+
+    # In-process stand-in, latencies then exclude the network and memory usage may be missing.
+    # fakeredis runs lua scripts through lupa, without it the patterns using them report an error
+    import fakeredis
+    client = fakeredis.FakeRedis()
+    backend = f"fakeredis {getattr(fakeredis, '__version__', '')}".strip()
+    try:
+        import lupa  # noqa: F401
+    except ImportError:
+        backend += " (no lupa, lua scripts unavailable: pip install fakeredis[lua])"
+    return client, backend, client.close
+
+#------------------------------------------------------------------------------------
+# Workloads
+#------------------------------------------------------------------------------------
+def make_frame(rows, columns, dtype, seed=0):
+    """Deterministic frame of rows x columns of the given dtype ('mixed' cycles through the others)"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for c in range(columns):
+        kind = dtype if dtype != 'mixed' else ['float64', 'int64', 'str'][c % 3]
+        if kind == 'float64':
+            data[f"c{c}"] = rng.standard_normal(rows)
+        elif kind == 'int64':
+            data[f"c{c}"] = rng.integers(0, 1 << 40, rows)
+        else:
+            data[f"c{c}"] = np.char.add('id-', rng.integers(0, 10000, rows).astype(str))
+    return pl.DataFrame(data)
+
+def value_for(method, frame):
+    """json can not hold a frame, it is given the frame as a dict of lists"""
+    if method == 'json':
+        return frame.to_dict(as_series=False)
+    return frame
+
+def _summary(latencies, nbytes):
+    latencies = np.asarray(latencies)
+    total = latencies.sum()
+    return {
+        'n': int(len(latencies)),
+        'ops_per_s': float(len(latencies) / total) if total > 0 else None,
+        'mb_per_s': float(nbytes * len(latencies) / total / 1e6) if total > 0 else None,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+    }
+
+def _timed(n, call):
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def _memory_usage(client, key):
+    try:
+        return client.memory_usage(key, samples=0)
+    except redis.exceptions.ResponseError:
+        return None
+
+def bench_case(client, method, frame, repeat, readers):
+    """
+    Runs every access pattern for one method and frame, a failing pattern
+    is reported with its error without stopping the others
+    Returns:
+    --------
+        list of dict(), one per pattern
+    """
+    cache = RolarsCache(client, max_workers=readers)
+    value = value_for(method, frame)
+    key = f"RolarsCache-{method}-bench|{frame.height}x{frame.width}"
+    results = []
+
+    def record(pattern, measure):
+        try:
+            latencies, extra = measure()
+            results.append(dict(pattern=pattern, **_summary(latencies, payload_bytes), **extra))
+        except Exception as error:
+            # e.g. lua scripts on fakeredis without lupa
+            results.append(dict(pattern=pattern, error=repr(error)))
+
+    cache.post(key, value, serialization=method)
+    payload_bytes = client.strlen(key)
+    memory = _memory_usage(client, key)
+
+    record('post', lambda: (_timed(repeat, lambda: cache.post(key, value, serialization=method)), {}))
+    record('get', lambda: (_timed(repeat, lambda: cache.get(key)), {}))
+
+    @cache.cache(method=method)
+    def produce(n):
+        return value
+
+    # a new argument on every call so that each one is a miss, with nothing else timed
+    fresh = itertools.count(2)
+    record('decorator_miss', lambda: (_timed(repeat, lambda: produce(next(fresh))), {}))
+
+    def hit():
+        produce(1)
+        return _timed(repeat, lambda: produce(1)), {}
+    record('decorator_hit', hit)
+
+    def concurrent_get():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=readers) as pool:
+            per_reader = max(repeat // readers, 1)
+            start = time.perf_counter()
+            latencies = sum(pool.map(lambda _: _timed(per_reader, lambda: cache.get(key)), range(readers)), [])
+            wall = time.perf_counter() - start
+        return latencies, {'readers': readers, 'aggregate_ops_per_s': len(latencies) / wall if wall > 0 else None}
+    record('concurrent_get', concurrent_get)
+
+    cache.close()
+    for r in results:
+        r.update(payload_bytes=payload_bytes, memory_per_entry=memory)
+    return results
+
+#------------------------------------------------------------------------------------
+# Reporting
+#------------------------------------------------------------------------------------
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _case_id(r):
+    return (r['method'], r['rows'], r['columns'], r['dtype'], r['pattern'])
+
+def compare(results, baseline):
+    """Prints the p50 and throughput of results relative to a baseline run"""
+    previous = {_case_id(r): r for r in baseline['results']}
+    print(f"{'method':8} {'shape':>12} {'dtype':8} {'pattern':15} {'p50 ratio':>10} {'ops ratio':>10}")
+    for r in results['results']:
+        old = previous.get(_case_id(r))
+        if old is None or 'error' in r or 'error' in old:
+            continue
+        p50 = r['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('nan')
+        ops = r['ops_per_s'] / old['ops_per_s'] if old['ops_per_s'] else float('nan')
+        shape = f"{r['rows']}x{r['columns']}"
+        print(f"{r['method']:8} {shape:>12} {r['dtype']:8} {r['pattern']:15} {p50:10.2f} {ops:10.2f}")
+
+def run(shapes=SHAPES, dtypes=DTYPES, methods=METHODS, repeat=20, readers=4, redis_server=None):
+    """
+    Runs the whole sweep
+    Returns:
+    --------
+        dict(), meta (commit, versions, backend) and results (one dict per case and pattern)
+    """
+    client, backend, stop = start_redis(redis_server)
+    results = []
+    try:
+        for rows, columns in shapes:
+            for dtype in dtypes:
+                frame = make_frame(rows, columns, dtype)
+                for method in methods:
+                    case = {'method': method, 'rows': rows, 'columns': columns, 'dtype': dtype}
+                    first = len(results)
+                    try:
+                        for r in bench_case(client, method, frame, repeat, readers):
+                            results.append(dict(case, **r))
+                    except Exception as error:
+                        # the initial post failed, none of the patterns could run
+                        results.append(dict(case, pattern='all', error=repr(error)))
+                    client.flushdb()
+                    print(f"{method:8} {rows}x{columns} {dtype:8} " + ", ".join(
+                        f"{r['pattern']} p50={r['p50_ms']:.2f}ms" if 'error' not in r else f"error {r['error']}"
+                        for r in results[first:]))
+    finally:
+        stop()
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'backend': backend,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'polars': pl.__version__,
+            'pyarrow': pa.__version__,
+            'numpy': np.__version__,
+            'redis': redis.__version__,
+            'repeat': repeat,
+            'readers': readers,
+        },
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default='bench_results.json', help='json file of the results')
+    parser.add_argument('--compare', default=None, help='json results of a previous run to compare with')
+    parser.add_argument('--shapes', default=None, help='rows x columns list, e.g. 1000x10,100000x10')
+    parser.add_argument('--dtypes', default=','.join(DTYPES))
+    parser.add_argument('--methods', default=','.join(METHODS))
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per pattern')
+    parser.add_argument('--readers', type=int, default=4, help='threads of the concurrent_get pattern')
+    parser.add_argument('--redis-server', default=None, help='path of the redis-server binary')
+    options = parser.parse_args()
+
+    shapes = SHAPES if options.shapes is None else \
+        [tuple(int(x) for x in shape.split('x')) for shape in options.shapes.split(',')]
+    results = run(shapes, options.dtypes.split(','), options.methods.split(','),
+                  options.repeat, options.readers, options.redis_server)
+    with open(options.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {options.out}")
+    if options.compare is not None:
+        with open(options.compare) as f:
+            compare(results, json.load(f))
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from comment_on_cov import (StreamingCovariance, covariance, generate_series_from_corrMatrix,
+                            generate_series_parallel, iter_series_chunks, normalize_weights, stress_scenarios)
+
+CORR = np.array([[1.0, 0.5, -0.2], [0.5, 1.0, 0.1], [-0.2, 0.1, 1.0]])
+
+#------------------------------------------------------------------------------------
+# StreamingCovariance
+#------------------------------------------------------------------------------------
+def _observations(num_of_obs=200, num_of_series=4, seed=0):
+    return np.random.default_rng(seed).standard_normal((num_of_obs, num_of_series))
+
+@pytest.mark.parametrize('ddof', [0, 1])
+def test_covariance_matches_np_cov(ddof):
+    x = _observations()
+    estimator = StreamingCovariance(event_axis=-1)
+    estimator.update(x)
+    np.testing.assert_allclose(estimator.covariance(ddof=ddof), np.cov(x, rowvar=False, ddof=ddof))
+
+def test_batches_give_the_covariance_of_the_whole():
+    x = _observations()
+    estimator = StreamingCovariance(event_axis=-1)
+    for start in range(0, len(x), 17):
+        estimator.update(x[start:start + 17])
+    np.testing.assert_allclose(estimator.covariance(), np.cov(x, rowvar=False, bias=True))
+
+def test_merge_of_partial_estimators():
+    x = _observations()
+    left, right = StreamingCovariance(event_axis=-1), StreamingCovariance(event_axis=-1)
+    left.update(x[:70])
+    right.update(x[70:])
+    left.merge(right)
+    np.testing.assert_allclose(left.covariance(), np.cov(x, rowvar=False, bias=True))
+
+def test_cross_covariance_of_x_and_y():
+    x, y = _observations(seed=1), _observations(seed=2)
+    estimator = StreamingCovariance(event_axis=-1)
+    estimator.update(x[:100], y[:100])
+    estimator.update(x[100:], y[100:])
+    expected = np.cov(x, y, rowvar=False, bias=True)[:4, 4:]
+    np.testing.assert_allclose(estimator.covariance(), expected)
+
+def test_elementwise_covariance():
+    rng = np.random.default_rng(3)
+    x, y = rng.standard_normal((50, 2, 3)), rng.standard_normal((50, 2, 3))
+    result = covariance(x, y, event_axis=None)
+    assert result.shape == (2, 3)
+    assert np.isclose(result[1, 2], np.cov(x[:, 1, 2], y[:, 1, 2], bias=True)[0, 1])
+
+def test_correlation_has_a_unit_diagonal():
+    estimator = StreamingCovariance(event_axis=-1)
+    estimator.update(_observations())
+    np.testing.assert_allclose(np.diag(estimator.correlation()), 1.0)
+
+#------------------------------------------------------------------------------------
+# Correlated series
+#------------------------------------------------------------------------------------
+def test_chunks_are_the_draws_of_the_same_seed():
+    draws = generate_series_from_corrMatrix(CORR, 50, num_of_sims=4, seed=7)
+    chunks = np.concatenate(list(iter_series_chunks(CORR, 50, 13, num_of_sims=4, seed=7)), axis=1)
+    np.testing.assert_allclose(chunks, draws)
+
+def test_parallel_draws_do_not_depend_on_the_batches():
+    draws = generate_series_from_corrMatrix(CORR, 20, num_of_sims=5, seed=7)
+    parallel = generate_series_parallel(CORR, 20, 5, seed=7, sims_per_task=2, workers=2)
+    np.testing.assert_allclose(parallel, draws)
+
+def test_series_have_the_requested_correlation():
+    draws = generate_series_from_corrMatrix(CORR, 200000, seed=11)
+    np.testing.assert_allclose(np.corrcoef(draws, rowvar=False), CORR, atol=0.01)
+
+#------------------------------------------------------------------------------------
+# Stress scenarios
+#------------------------------------------------------------------------------------
+WEIGHTS = normalize_weights(np.random.default_rng(5).standard_normal((10, 3)))
+
+def test_stress_scenarios_match_the_full_pnl_matrix():
+    stress = stress_scenarios(WEIGHTS, CORR, 400, levels=(0.01, 0.05), seed=7, sim_tile=50, workers=2)
+    # block b of sim_tile simulations is drawn from the b-th stream spawned from seed
+    draws = generate_series_from_corrMatrix(CORR, 50, num_of_sims=8, seed=7).reshape(-1, 3)
+    pnl = np.sort(draws @ WEIGHTS.T, axis=0)
+    np.testing.assert_allclose(stress['var'], pnl[[3, 19]].T)
+    np.testing.assert_allclose(stress['es'], np.stack([pnl[:4].mean(axis=0), pnl[:20].mean(axis=0)], axis=1))
+    np.testing.assert_allclose(stress['mean'], pnl.mean(axis=0))
+    np.testing.assert_allclose(stress['std'], pnl.std(axis=0))
+
+def test_stress_scenarios_do_not_depend_on_the_weight_tiles_nor_the_tasks():
+    stress = stress_scenarios(WEIGHTS, CORR, 300, seed=3, sim_tile=32, weight_tile=64, blocks_per_task=16, workers=1)
+    tiled = stress_scenarios(WEIGHTS, CORR, 300, seed=3, sim_tile=32, weight_tile=3, blocks_per_task=2, workers=3)
+    for name in ('var', 'es', 'mean', 'std'):
+        np.testing.assert_allclose(tiled[name], stress[name])
@@ -0,0 +1,779 @@
+import asyncio
+import collections
+import json
+import os
+import threading
+import time
+
+import fakeredis
+import fakeredis.aioredis
+import redis.cluster
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pytest
+
+from rolars_cache import (_HOSTNAME, _MISSING, AsyncRolarsCache, DiskTier, LocalTier, RolarsCache, ShardedRedis,
+                         _estimate_nbytes, _fingerprint, _ndarray_bytes, _range_partition, _read_ndarrays)
+
+Point = collections.namedtuple('Point', 'x y')
+
+
+@pytest.fixture
+def cache():
+    cache = RolarsCache(fakeredis.FakeRedis())
+    yield cache
+    cache.close()
+
+#------------------------------------------------------------------------------------
+# Keys
+#------------------------------------------------------------------------------------
+def test_plain_arguments_of_different_types_do_not_collide(cache):
+    def f(x):
+        return x
+    keys = {cache.key_generator(f, 'pickle', value) for value in [1, '1', 1.0, True, b'1', None, 'None']}
+    assert len(keys) == 7
+
+def test_frames_are_keyed_by_content(cache):
+    def f(frame):
+        return frame
+    first = cache.key_generator(f, 'pyarrow', pl.DataFrame({'a': [1, 2, 3]}))
+    assert first == cache.key_generator(f, 'pyarrow', pl.DataFrame({'a': [1, 2, 3]}))
+    assert first != cache.key_generator(f, 'pyarrow', pl.DataFrame({'a': [1, 2, 4]}))
+
+def test_fingerprints_hash_dictionary_values():
+    indices = pa.array([0, 1, 0], type=pa.int32())
+    left = pa.DictionaryArray.from_arrays(indices, pa.array(['a', 'b']))
+    right = pa.DictionaryArray.from_arrays(indices, pa.array(['x', 'y']))
+    assert _fingerprint(pa.table({'c': left})) != _fingerprint(pa.table({'c': right}))
+    nested = pa.StructArray.from_arrays([left], ['d']), pa.StructArray.from_arrays([right], ['d'])
+    assert _fingerprint(pa.table({'s': nested[0]})) != _fingerprint(pa.table({'s': nested[1]}))
+
+def test_fingerprints_of_masked_arrays_include_the_mask():
+    data = np.arange(4.0)
+    assert _fingerprint(np.ma.masked_array(data, mask=[0, 1, 0, 0])) != \
+        _fingerprint(np.ma.masked_array(data, mask=[0, 0, 1, 0]))
+
+#------------------------------------------------------------------------------------
+# Codecs
+#------------------------------------------------------------------------------------
+@pytest.mark.parametrize('series', [pd.Series([1.0, 2.0]), pd.Series([1, 2], name='x'),
+                                    pd.Series(['a', 'b'], index=pd.Index([3, 4], name='i'))])
+@pytest.mark.parametrize('chunk_rows', [None, 1])
+def test_pandas_series_keep_their_name(cache, series, chunk_rows):
+    cache.post('RolarsCache-pyarrow-series|1', series, chunk_rows=chunk_rows)
+    restored = cache.get('RolarsCache-pyarrow-series|1')
+    pd.testing.assert_series_equal(restored, series)
+
+@pytest.mark.parametrize('array', [
+    np.arange(12, dtype=np.int64).reshape(3, 4),
+    np.asfortranarray(np.random.default_rng(0).standard_normal((5, 3)).astype(np.float32)),
+    np.arange(20.0)[::2],
+    np.array([(1, 2.5), (2, 3.5)], dtype=[('a', 'i4'), ('b', 'f8')]),
+    np.zeros((0, 3)),
+])
+def test_ndarray_bytes_round_trip(array):
+    restored = _read_ndarrays(_ndarray_bytes(array))
+    assert type(restored) is np.ndarray
+    assert restored.dtype == array.dtype and restored.shape == array.shape
+    np.testing.assert_array_equal(restored, array)
+
+def test_ndarray_bytes_of_containers():
+    arrays = {'x': np.arange(3), 'y': np.ones((2, 2))}
+    restored = _read_ndarrays(_ndarray_bytes(arrays))
+    assert list(restored) == ['x', 'y']
+    for name in arrays:
+        np.testing.assert_array_equal(restored[name], arrays[name])
+    restored = _read_ndarrays(_ndarray_bytes((np.arange(3), np.arange(4.0))))
+    assert isinstance(restored, tuple) and len(restored) == 2
+
+def test_ndarray_bytes_leaves_objects_and_subclasses_to_pickle():
+    assert _ndarray_bytes(np.array(['a', None], dtype=object)) is None
+    assert _ndarray_bytes(np.ma.masked_array([1, 2], mask=[0, 1])) is None
+    assert _ndarray_bytes([np.arange(3), 'text']) is None
+
+def test_masked_array_round_trip(cache):
+    masked = np.ma.masked_array([1.0, 2.0, 3.0], mask=[False, True, False])
+    cache.post('RolarsCache-pyarrow-masked|1', masked)
+    restored = cache.get('RolarsCache-pyarrow-masked|1')
+    assert isinstance(restored, np.ma.MaskedArray)
+    np.testing.assert_array_equal(np.ma.getmaskarray(restored), [False, True, False])
+
+def test_decorated_ndarray_round_trip(cache):
+    calls = []
+
+    @cache.cache(method='pyarrow')
+    def produce(n):
+        calls.append(n)
+        return np.arange(n, dtype=np.float64).reshape(-1, 2)
+
+    first, second = produce(6), produce(6)
+    assert calls == [6]
+    np.testing.assert_array_equal(first, second)
+
+def test_composite_round_trip(cache):
+    frame = pl.DataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']})
+    pandas_frame = pd.DataFrame({'c': [1.5, 2.5]}, index=pd.Index(['r1', 'r2'], name='row'))
+    cache.post('RolarsCache-pyarrow-composite|1', (frame, pandas_frame, {'n': 3}))
+    restored = cache.get('RolarsCache-pyarrow-composite|1')
+    assert isinstance(restored, tuple) and len(restored) == 3
+    assert restored[0].equals(frame)
+    pd.testing.assert_frame_equal(restored[1], pandas_frame)
+    assert restored[2] == {'n': 3}
+
+def test_composite_dicts_keep_their_keys(cache):
+    frames = {'left': pl.DataFrame({'a': [1]}), 'right': pl.DataFrame({'b': [2.0]})}
+    cache.post('RolarsCache-pyarrow-composite|2', frames)
+    restored = cache.get('RolarsCache-pyarrow-composite|2')
+    assert list(restored) == ['left', 'right']
+    assert restored['right'].equals(frames['right'])
+
+def test_namedtuples_keep_their_type(cache):
+    cache.post('RolarsCache-pyarrow-point|1', Point(np.arange(2), np.arange(3)))
+    restored = cache.get('RolarsCache-pyarrow-point|1')
+    assert isinstance(restored, Point)
+    np.testing.assert_array_equal(restored.y, np.arange(3))
+
+def test_composite_sizes_sum_their_members():
+    frame = pl.DataFrame({'a': np.arange(1000)})
+    array = np.zeros(500)
+    assert _estimate_nbytes((frame, array), 1) == frame.estimated_size() + array.nbytes
+    assert _estimate_nbytes(('text',), 7) == 7
+
+#------------------------------------------------------------------------------------
+# Local tier
+#------------------------------------------------------------------------------------
+def test_local_tier_drops_fills_raced_by_an_invalidation():
+    tier = LocalTier(1 << 20)
+    token = tier.token()
+    tier.invalidate(['a'])
+    tier.put('a', 'stale', 10, token=token)
+    tier.put('b', 'fresh', 10, token=token)
+    assert tier.get('a') is _MISSING
+    assert tier.get('b') == 'fresh'
+    token = tier.token()
+    tier.clear()
+    tier.put('b', 'stale', 10, token=token)
+    assert tier.get('b') is _MISSING
+
+def test_local_tier_forgets_old_invalidations_conservatively():
+    tier = LocalTier(1 << 20)
+    tier.max_invalidations = 2
+    token = tier.token()
+    tier.invalidate(['a'])
+    tier.invalidate(['b'])
+    tier.invalidate(['c'])
+    # the invalidation of 'a' was dropped, any fill from before it is refused
+    tier.put('d', 'maybe stale', 10, token=token)
+    assert tier.get('d') is _MISSING
+    tier.put('d', 'fresh', 10, token=tier.token())
+    assert tier.get('d') == 'fresh'
+
+def test_invalidation_between_get_and_local_fill():
+    server = fakeredis.FakeServer()
+    reader = RolarsCache(fakeredis.FakeRedis(server=server), local_max_bytes=1 << 20)
+    writer = RolarsCache(fakeredis.FakeRedis(server=server))
+    key = 'RolarsCache-json-x|1'
+    writer.post(key, [1])
+    fetch = reader._fetch
+
+    def racing_fetch(*args, **kwargs):
+        # the writer overwrites the entry, and its invalidation arrives, while the read is in flight
+        pulled = fetch(*args, **kwargs)
+        writer.post(key, [2])
+        reader.local.invalidate([key])
+        return pulled
+
+    reader._fetch = racing_fetch
+    assert reader.get(key) == [1]
+    reader._fetch = fetch
+    assert reader.local.get(key) is _MISSING
+    assert reader.get(key) == [2]
+    assert reader.local.get(key) == [2]
+    reader.close()
+
+#------------------------------------------------------------------------------------
+# Chunked entries
+#------------------------------------------------------------------------------------
+WIDE = pl.DataFrame({'a': range(100), 'b': [float(i) for i in range(100)], 'c': [str(i) for i in range(100)]})
+
+def test_chunked_entries_project_columns_and_rows(cache):
+    cache.post('RolarsCache-pyarrow-wide|1', WIDE, chunk_rows=10, chunk_columns=1)
+    assert cache.get('RolarsCache-pyarrow-wide|1').equals(WIDE)
+    assert cache.get('RolarsCache-pyarrow-wide|1', columns=['c', 'a'], row_slice=slice(15, 32)).equals(
+        WIDE.select('c', 'a').slice(15, 17))
+
+def _keys_of(client):
+    return sorted(k.decode() for k in client.keys('*') if not k.startswith(b'RolarsCacheIndex'))
+
+def test_plain_posts_delete_the_chunks_they_replace(cache):
+    cache.post('RolarsCache-pyarrow-wide|1', WIDE, chunk_rows=10)
+    assert len(_keys_of(cache.cache_container)) == 11
+    cache.post('RolarsCache-pyarrow-wide|1', WIDE.head(3))
+    assert _keys_of(cache.cache_container) == ['RolarsCache-pyarrow-wide|1']
+    assert cache.get('RolarsCache-pyarrow-wide|1').equals(WIDE.head(3))
+    # and a new chunked entry replaces the chunks of the previous one
+    cache.post('RolarsCache-pyarrow-wide|1', WIDE, chunk_rows=50)
+    cache.post('RolarsCache-pyarrow-wide|1', WIDE, chunk_rows=25)
+    assert len(_keys_of(cache.cache_container)) == 5
+
+def test_async_posts_delete_the_chunks_they_replace():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    RolarsCache(client).post('RolarsCache-pyarrow-wide|1', WIDE, chunk_rows=10)
+
+    async def replace():
+        cache = AsyncRolarsCache(fakeredis.aioredis.FakeRedis(server=server))
+        await cache.post('RolarsCache-pyarrow-wide|1', WIDE.head(3))
+    asyncio.run(replace())
+    assert _keys_of(client) == ['RolarsCache-pyarrow-wide|1']
+
+#------------------------------------------------------------------------------------
+# AsyncRolarsCache
+#------------------------------------------------------------------------------------
+def test_async_posts_gets_and_deletes():
+    server = fakeredis.FakeServer()
+
+    async def round_trip():
+        cache = AsyncRolarsCache(fakeredis.aioredis.FakeRedis(server=server))
+        await cache.post('RolarsCache-pyarrow-x|1', WIDE)
+        await cache.post_many({'RolarsCache-json-y|1': [1, 2], 'RolarsCache-pickle-z|1': {'a': 1}})
+        assert (await cache.get('RolarsCache-pyarrow-x|1')).equals(WIDE)
+        assert (await cache.get('RolarsCache-pyarrow-x|1', columns=['b'], row_slice=slice(0, 5))).equals(
+            WIDE.select('b').head(5))
+        assert (await cache.describe('RolarsCache-pyarrow-x|1'))['kind'] == 'polars.DataFrame'
+        found = await cache.get_many(['RolarsCache-json-y|1', 'RolarsCache-pickle-z|1', 'RolarsCache-json-w|1'])
+        assert found == {'RolarsCache-json-y|1': [1, 2], 'RolarsCache-pickle-z|1': {'a': 1}}
+        await cache.delete('RolarsCache-json-y|1')
+        with pytest.raises(ValueError):
+            await cache.get('RolarsCache-json-y|1')
+        cache.close()
+    asyncio.run(round_trip())
+    # entries are shared with the sync cache
+    assert RolarsCache(fakeredis.FakeRedis(server=server)).get('RolarsCache-pyarrow-x|1').equals(WIDE)
+
+def test_async_decorator_computes_once():
+    calls = []
+
+    async def decorated():
+        cache = AsyncRolarsCache(fakeredis.aioredis.FakeRedis())
+
+        @cache.cache(method='pyarrow')
+        async def produce(n):
+            calls.append(n)
+            await asyncio.sleep(0)
+            return WIDE.head(n)
+
+        first = await asyncio.gather(produce(3), produce(3))
+        assert all(frame.equals(WIDE.head(3)) for frame in first)
+        assert (await produce(3)).equals(WIDE.head(3))
+        assert [frame.height for frame in await produce.many([(3,), (4,), (4,)])] == [3, 4, 4]
+        cache.close()
+    asyncio.run(decorated())
+    assert calls == [3, 4]
+
+def test_async_decorator_refuses_sync_functions():
+    cache = AsyncRolarsCache(fakeredis.aioredis.FakeRedis())
+    with pytest.raises(TypeError):
+        cache.cache(method='json')(lambda: 1)
+    cache.close()
+
+#------------------------------------------------------------------------------------
+# Range caching
+#------------------------------------------------------------------------------------
+def test_range_partition_without_segments_is_one_gap():
+    assert _range_partition([], 0, 10) == [(None, 0, 10)]
+
+def test_range_partition_fills_the_gaps_between_segments():
+    segments = [('b', 6, 8), ('a', 2, 4)]
+    assert _range_partition(segments, 0, 10) == [(None, 0, 2), ('a', 2, 4), (None, 4, 6),
+                                                 ('b', 6, 8), (None, 8, 10)]
+
+def test_range_partition_clips_segments_to_the_range():
+    segments = [('a', -5, 3), ('b', 3, 20), ('c', 30, 40)]
+    assert _range_partition(segments, 0, 10) == [('a', 0, 3), ('b', 3, 10)]
+
+def test_range_partition_serves_overlaps_once():
+    segments = [('a', 0, 6), ('b', 4, 10), ('c', 5, 7)]
+    pieces = _range_partition(segments, 0, 10)
+    assert pieces == [('a', 0, 6), ('b', 6, 10)]
+    # consecutive pieces cover [lo, hi) without overlap
+    assert all(left[2] == right[1] for left, right in zip(pieces, pieces[1:]))
+
+def test_range_partition_skips_segments_outside_the_range():
+    assert _range_partition([('a', 0, 2), ('b', 12, 14)], 2, 12) == [(None, 2, 12)]
+
+def _wait_for_merges(cache):
+    if cache._merge_executor is not None:
+        # merges run one at a time, this one ends after those already submitted
+        cache._merge_executor.submit(lambda: None).result()
+
+@pytest.fixture
+def ranged(cache):
+    calls = []
+
+    @cache.range_cache(index='t', merge_max_rows=100)
+    def load(name, start, end):
+        calls.append((start, end))
+        t = np.arange(start, end)
+        return pl.DataFrame({'t': t, 'v': t * 10})
+    return load, calls
+
+def test_range_cache_only_loads_the_gaps(cache, ranged):
+    load, calls = ranged
+    load('a', 0, 10)
+    _wait_for_merges(cache)
+    frame = load('a', 5, 20)
+    assert calls == [(0, 10), (10, 20)]
+    assert frame['t'].to_list() == list(range(5, 20))
+    # other arguments have their own segments
+    load('b', 5, 8)
+    assert calls[-1] == (5, 8)
+
+def test_range_cache_reloads_lost_segments(cache, ranged):
+    load, calls = ranged
+    base = cache._range_base(load.__wrapped__, [('name', 'a')])
+    load('a', 0, 10)
+    (segment_id,) = cache._read_segments(base)
+    cache.cache_container.delete(cache._segment_key(base, segment_id))
+    frame = load('a', 0, 10)
+    assert calls == [(0, 10), (0, 10)]
+    assert frame['t'].to_list() == list(range(10))
+    assert segment_id not in cache._read_segments(base)
+
+def test_range_cache_merges_adjacent_segments_in_order(cache, ranged):
+    load, calls = ranged
+    base = cache._range_base(load.__wrapped__, [('name', 'a')])
+    load('a', 10, 20)
+    load('a', 0, 30)
+    _wait_for_merges(cache)
+    segments = cache._read_segments(base)
+    assert [(lo, hi) for lo, hi, _ in segments.values()] == [(0, 30)]
+    frame = load('a', 0, 30)
+    assert calls == [(10, 20), (0, 10), (20, 30)]
+    assert frame['t'].to_list() == list(range(30))
+    assert frame['v'].to_list() == [10 * t for t in range(30)]
+
+#------------------------------------------------------------------------------------
+# Warm-up
+#------------------------------------------------------------------------------------
+def square(n):
+    return n * n
+
+def test_warm_computes_the_misses_only(cache):
+    calls = []
+
+    @cache.json_cache
+    def produce(n, offset=0):
+        calls.append(n)
+        if n == 5:
+            raise ValueError('no 5')
+        return [n + offset]
+
+    produce(1)
+    reports = []
+    report = cache.warm(produce, [1, (2,), {'n': 3}, (3,), (4, 10), 5], workers=2, mode='thread', batch=2,
+                        progress=reports.append)
+    assert (report['total'], report['cached'], report['computed'], report['failed']) == (5, 1, 3, 1)
+    assert list(report['failures']) == [cache.key_generator(produce, 'json', 5)]
+    assert reports[-1]['computed'] == 3 and len(reports) == 2
+    del calls[:]
+    assert [produce(2), produce(n=3), produce(4, 10)] == [[2], [3], [14]]
+    assert calls == []
+    assert cache.warm(produce, [1, 2], mode='thread')['cached'] == 2
+
+def test_warm_in_processes(cache):
+    cached_square = cache.json_cache(square)
+    report = cache.warm(cached_square, range(4), workers=2)
+    assert report['computed'] == 4
+    assert cache.get_many([cache.key_generator(square, 'json', n) for n in range(4)]) == \
+        {cache.key_generator(square, 'json', n): n * n for n in range(4)}
+    with pytest.raises(ValueError):
+        cache.warm(cache.json_cache(lambda n: n), range(4))
+
+#------------------------------------------------------------------------------------
+# Budgets and eviction
+#------------------------------------------------------------------------------------
+def _budgeted(eviction):
+    # ten ~1 KB entries fit in the namespace of produce, the eleventh does not
+    cache = RolarsCache(fakeredis.FakeRedis(), budget_bytes=10000, eviction=eviction)
+
+    @cache.cache(method='pickle')
+    def produce(n):
+        return bytes([n]) * 1000
+    return cache, produce
+
+def _surviving(cache, produce, calls):
+    keys = set(cache.cache_container.scan_iter(match=f"{cache.leading_key}-pickle-produce*"))
+    return [n for n in calls if cache.key_generator(produce.__wrapped__, 'pickle', n).encode() in keys]
+
+def _tracked_bytes(cache):
+    return int(cache.cache_container.get(cache._index_keys('produce')[2]) or 0)
+
+@pytest.mark.parametrize('eviction', ['lru', 'lfu'])
+def test_overflow_evicts_only_what_it_needs(eviction):
+    cache, produce = _budgeted(eviction)
+    for n in range(9):
+        produce(n)
+    produce(9)
+    assert _surviving(cache, produce, range(10)) == list(range(1, 10))
+    assert cache.stats()['evictions'] == 1
+    assert _tracked_bytes(cache) <= 10000
+
+def test_lru_keeps_the_recently_read_entries():
+    cache, produce = _budgeted('lru')
+    for n in range(9):
+        produce(n)
+    produce(0)
+    produce(1)
+    produce(9)
+    produce(10)
+    assert _surviving(cache, produce, range(11)) == [0, 1, 4, 5, 6, 7, 8, 9, 10]
+
+def test_lfu_keeps_the_frequently_read_entries():
+    cache, produce = _budgeted('lfu')
+    for n in range(9):
+        produce(n)
+    for _ in range(3):
+        produce(4)
+        produce(7)
+    produce(9)
+    produce(10)
+    assert _surviving(cache, produce, range(11)) == [2, 3, 4, 5, 6, 7, 8, 9, 10]
+    # evicted entries set the age new entries start from, old hits do not pin them forever
+    assert float(cache.cache_container.get(cache._index_keys('produce')[3])) >= 1
+
+@pytest.mark.parametrize('eviction', ['lru', 'lfu'])
+def test_expired_entries_do_not_count_against_the_budget(eviction):
+    cache, produce = _budgeted(eviction)
+    for n in range(9):
+        if n in (5, 6):
+            cache.post(cache.key_generator(produce.__wrapped__, 'pickle', n), bytes([n]) * 1000,
+                       serialization='pickle', ttl=1)
+        else:
+            produce(n)
+    time.sleep(1.1)
+    produce(9)
+    produce(10)
+    assert _surviving(cache, produce, range(11)) == [0, 1, 2, 3, 4, 7, 8, 9, 10]
+    assert cache.stats()['evictions'] == 0
+
+def test_misses_drop_expired_entries_from_the_accounting():
+    cache, produce = _budgeted('lru')
+    produce(0)
+    before = _tracked_bytes(cache)
+    cache.cache_container.delete(cache.key_generator(produce.__wrapped__, 'pickle', 0))
+    with pytest.raises(ValueError):
+        cache.get(cache.key_generator(produce.__wrapped__, 'pickle', 0))
+    assert _tracked_bytes(cache) == 0 < before
+
+#------------------------------------------------------------------------------------
+# Client side sharding
+#------------------------------------------------------------------------------------
+def _nodes(num_of_nodes):
+    return [fakeredis.FakeRedis(server=fakeredis.FakeServer()) for _ in range(num_of_nodes)]
+
+def test_sharded_keys_sit_on_the_node_of_their_hash():
+    shards = ShardedRedis(_nodes(3))
+    keys = ['RolarsCache-json-k|{}'.format(n) for n in range(60)]
+    for k in keys:
+        shards.set(k, k)
+    assert all(shards.node_for(k).get(k) == k.encode() for k in keys)
+    assert set(shards.node_index(k) for k in keys) == {0, 1, 2}
+    assert shards.mget(keys) == [k.encode() for k in keys]
+    assert shards.exists(*keys) == 60 and shards.delete(*keys) == 60
+    # hash tags keep keys together
+    assert len(set(shards.node_index('{{ns}}:{}'.format(n)) for n in range(20))) == 1
+
+def test_adding_a_shard_moves_a_fraction_of_the_keys():
+    keys = ['RolarsCache-json-k|{}'.format(n) for n in range(2000)]
+    nodes = _nodes(4)
+    before, after = ShardedRedis(nodes[:3]), ShardedRedis(nodes)
+    moved = [k for k in keys if before.node_index(k) != after.node_index(k)]
+    # only the keys taken over by the new node move
+    assert 0 < len(moved) < 0.4 * len(keys)
+    assert all(after.node_index(k) == 3 for k in moved)
+
+def test_cache_over_shards():
+    cache = RolarsCache(ShardedRedis(_nodes(3)), budget_bytes=5000)
+
+    @cache.cache(method='pickle')
+    def produce(n):
+        return bytes([n]) * 1000
+
+    for n in range(8):
+        produce(n)
+    assert _surviving(cache, produce, range(8)) == [4, 5, 6, 7]
+    mapping = {'RolarsCache-json-k|{}'.format(n): [n] for n in range(10)}
+    cache.post_many(mapping)
+    assert cache.get_many(mapping) == mapping
+    cache.delete(*mapping)
+    assert cache.get_many(mapping) == {}
+    cache.close()
+
+#------------------------------------------------------------------------------------
+# Redis Cluster
+#------------------------------------------------------------------------------------
+class FakeClusterPipeline(object):
+    """Pipeline refusing the commands the cluster pipelines of redis-py refuse"""
+
+    def __init__(self, node):
+        self.pipe = node.pipeline(transaction=False)
+
+    def __getattr__(self, name):
+        if name.upper() in redis.cluster.PIPELINE_BLOCKED_COMMANDS:
+            raise redis.exceptions.RedisClusterException(f"{name} is blocked in cluster pipelines")
+        return getattr(self.pipe, name)
+
+    def delete(self, *names):
+        if len(names) != 1:
+            raise redis.exceptions.RedisClusterException("deleting multiple keys is not implemented in pipelines")
+        return self.pipe.delete(*names)
+
+
+class FakeCluster(redis.cluster.RedisCluster):
+    """RedisCluster over a single fakeredis node, with the pipeline restrictions of a real one"""
+
+    def __init__(self):
+        self.node = fakeredis.FakeRedis()
+
+    def __getattribute__(self, name):
+        if name in ('node', 'pipeline', 'mget_nonatomic', '__class__'):
+            return object.__getattribute__(self, name)
+        return getattr(object.__getattribute__(self, 'node'), name)
+
+    def pipeline(self, transaction=None, shard_hint=None):
+        return FakeClusterPipeline(self.node)
+
+    def mget_nonatomic(self, keys, *args):
+        return self.node.mget(keys, *args)
+
+
+def test_cluster_posts_reads_deletes_and_evicts():
+    cache = RolarsCache(FakeCluster(), budget_bytes=5000, local_max_bytes=1 << 20)
+
+    @cache.cache(method='pickle')
+    def produce(n):
+        return bytes([n]) * 1000
+
+    for n in range(8):
+        produce(n)
+    assert _surviving(cache, produce, range(8)) == [4, 5, 6, 7]
+    cache.post_many({'RolarsCache-pyarrow-x|1': pl.DataFrame({'a': [1, 2]}), 'RolarsCache-json-y|1': [1]})
+    assert cache.get_many(['RolarsCache-pyarrow-x|1', 'RolarsCache-json-y|1'])['RolarsCache-json-y|1'] == [1]
+    cache.delete('RolarsCache-pyarrow-x|1', 'RolarsCache-json-y|1')
+    assert cache.get_many(['RolarsCache-pyarrow-x|1', 'RolarsCache-json-y|1']) == {}
+    cache.close()
+
+def test_cluster_pipelines_publish_after_the_writes():
+    cluster = FakeCluster()
+    cache = RolarsCache(cluster)
+    listener = cluster.node.pubsub(ignore_subscribe_messages=True)
+    listener.subscribe(cache.invalidation_channel)
+    cache.post('RolarsCache-json-x|1', [1])
+    deadline = time.monotonic() + 2.0
+    message = None
+    while message is None and time.monotonic() < deadline:
+        # the subscription confirmation is skipped as a None message
+        message = listener.get_message(timeout=0.1)
+    assert json.loads(message['data'])['keys'] == ['RolarsCache-json-x|1']
+    cache.close()
+
+#------------------------------------------------------------------------------------
+# Disk tier
+#------------------------------------------------------------------------------------
+@pytest.fixture
+def on_disk(tmp_path):
+    cache = RolarsCache(fakeredis.FakeRedis(), disk_dir=str(tmp_path), disk_min_bytes=1000)
+    yield cache
+    cache.close()
+
+def test_large_frames_go_to_disk(on_disk, tmp_path):
+    on_disk.post('RolarsCache-pyarrow-wide|1', WIDE)
+    on_disk.post('RolarsCache-pyarrow-small|1', WIDE.head(2))
+    assert on_disk.describe('RolarsCache-pyarrow-wide|1')['method'] == 'disk'
+    assert on_disk.describe('RolarsCache-pyarrow-small|1')['method'] == 'pyarrow'
+    assert len(list(tmp_path.glob('*.arrow'))) == 1
+    assert on_disk.get('RolarsCache-pyarrow-wide|1').equals(WIDE)
+    assert on_disk.get('RolarsCache-pyarrow-wide|1', columns=['a'], row_slice=slice(10, 20)).equals(
+        WIDE.select('a').slice(10, 10))
+    # a smaller value replaces the file
+    on_disk.post('RolarsCache-pyarrow-wide|1', WIDE.head(2))
+    assert list(tmp_path.glob('*.arrow')) == []
+    on_disk.post('RolarsCache-pyarrow-wide|1', WIDE)
+    on_disk.delete('RolarsCache-pyarrow-wide|1')
+    assert list(tmp_path.glob('*.arrow')) == []
+
+def test_files_outlive_redis(on_disk):
+    on_disk.post('RolarsCache-pyarrow-wide|1', WIDE, ttl=60)
+    on_disk.cache_container.flushall()
+    assert on_disk.get('RolarsCache-pyarrow-wide|1').equals(WIDE)
+    assert 0 < on_disk.cache_container.ttl('RolarsCache-pyarrow-wide|1') <= 60
+
+def test_pointers_of_another_host_are_misses(on_disk, tmp_path):
+    calls = []
+
+    @on_disk.pyarrow_cache
+    def produce():
+        calls.append(1)
+        return WIDE
+
+    key = on_disk.key_generator(produce.__wrapped__, 'pyarrow')
+    produce()
+    pointer = on_disk.cache_container.get(key)
+    on_disk.disk.remove(key)
+    on_disk.cache_container.set(key, pointer.replace(json.dumps(_HOSTNAME).encode(), b'"elsewhere"'))
+    assert on_disk.get_many([key]) == {}
+    assert produce().equals(WIDE)
+    assert len(calls) == 2
+
+def test_disk_tier_removes_the_least_recently_read_files(tmp_path):
+    tier = DiskTier(str(tmp_path))
+    written = [tier.put(str(n), WIDE.to_arrow(), 'polars.DataFrame') for n in range(3)]
+    paths = [path for path, _ in written]
+    for age, path in zip([30, 20, 10], paths):
+        os.utime(path, (time.time() - age, time.time() - age))
+    assert tier.read(paths[0])[0].equals(WIDE.to_arrow())
+    tier.max_bytes = sum(nbytes for _, nbytes in written)
+    tier.put('3', WIDE.to_arrow(), 'polars.DataFrame')
+    assert [os.path.exists(path) for path in paths] == [True, False, True]
+
+#------------------------------------------------------------------------------------
+# Streamed entries
+#------------------------------------------------------------------------------------
+def test_stream_cache_replays_the_pieces(cache):
+    calls = []
+
+    @cache.stream_cache
+    def load(pieces):
+        calls.append(pieces)
+        for start in range(0, 100, 100 // pieces):
+            yield WIDE.slice(start, 100 // pieces)
+
+    first = list(load(4))
+    replayed = list(load(4))
+    assert calls == [4]
+    assert pl.concat(first).equals(WIDE) and pl.concat(replayed).equals(WIDE)
+    assert [piece.height for piece in replayed] == [25, 25, 25, 25]
+    key = cache.key_generator(load.__wrapped__, 'pyarrow', 4)
+    assert cache.get(key).equals(WIDE)
+    assert pl.concat(cache.iter_chunks(key, columns=['c'], row_slice=slice(20, 60))).equals(
+        WIDE.select('c').slice(20, 40))
+
+def test_unfinished_streams_leave_nothing(cache):
+    @cache.stream_cache
+    def load(fail):
+        yield WIDE.head(10)
+        if fail:
+            raise RuntimeError('source went away')
+        yield WIDE.tail(10)
+
+    stream = load(False)
+    next(stream)
+    stream.close()
+    with pytest.raises(RuntimeError):
+        list(load(True))
+    assert _keys_of(cache.cache_container) == []
+    assert len(list(load(False))) == 2
+    assert len(_keys_of(cache.cache_container)) == 3
+
+def test_post_stream_of_pandas_pieces(cache):
+    frame = WIDE.to_pandas()
+    cache.post_stream('RolarsCache-pyarrow-stream|1', (frame.iloc[start:start + 30] for start in range(0, 100, 30)))
+    pieces = list(cache.iter_chunks('RolarsCache-pyarrow-stream|1'))
+    assert [len(piece) for piece in pieces] == [30, 30, 30, 10]
+    pd.testing.assert_frame_equal(pd.concat(pieces, ignore_index=True), frame)
+
+#------------------------------------------------------------------------------------
+# Write-behind
+#------------------------------------------------------------------------------------
+def test_write_behind_returns_before_the_write():
+    server = fakeredis.FakeServer()
+    cache = RolarsCache(fakeredis.FakeRedis(server=server), write_behind=True)
+    calls = []
+    release = threading.Event()
+    serialize = cache._serialize
+
+    def slow_serialize(*args):
+        release.wait(5)
+        serialize(*args)
+
+    cache._serialize = slow_serialize
+
+    @cache.json_cache
+    def produce(n):
+        calls.append(n)
+        return [n]
+
+    key = cache.key_generator(produce.__wrapped__, 'json', 1)
+    assert produce(1) == [1]
+    assert cache.cache_container.exists(key) == 0
+    # readers of this process get the value being written
+    assert produce(1) == [1] and cache.get(key) == [1]
+    assert calls == [1]
+    assert not cache.flush(timeout=0.05)
+    release.set()
+    assert cache.flush(timeout=5)
+    assert RolarsCache(fakeredis.FakeRedis(server=server)).get(key) == [1]
+    assert cache.cache_container.exists(cache._lock_key(key)) == 0
+    cache.close()
+
+def test_failed_writes_behind_are_reported_and_recomputed():
+    cache = RolarsCache(fakeredis.FakeRedis(), write_behind=True)
+    events = []
+    cache.add_hook(lambda event, info: events.append(event))
+    calls = []
+
+    def failing_serialize(*args):
+        raise ConnectionError('redis is gone')
+
+    serialize, cache._serialize = cache._serialize, failing_serialize
+
+    @cache.json_cache
+    def produce(n):
+        calls.append(n)
+        return [n]
+
+    produce(1)
+    assert cache.flush(timeout=5)
+    assert 'write_behind_error' in events
+    cache._serialize = serialize
+    assert produce(1) == [1]
+    assert cache.flush(timeout=5)
+    assert calls == [1, 1]
+    assert cache.get(cache.key_generator(produce.__wrapped__, 'json', 1)) == [1]
+    cache.close()
+
+#------------------------------------------------------------------------------------
+# Query plans
+#------------------------------------------------------------------------------------
+def _query(frame):
+    return frame.lazy().filter(pl.col('a') > 1).select(pl.col('b').sum())
+
+def test_plan_keys_hash_the_in_memory_frames_without_serializing(cache, monkeypatch):
+    def serialize(*args, **kwargs):
+        raise AssertionError("the serialized plan copies the in-memory frames")
+    monkeypatch.setattr(pl.LazyFrame, 'serialize', serialize)
+    frame = pl.DataFrame({'a': [1, 2, 3], 'b': [1.0, 2.0, 3.0]})
+    key = cache._plan_key(_query(frame))
+    assert key == cache._plan_key(_query(frame.clone()))
+    assert key != cache._plan_key(_query(frame.with_columns(pl.col('b') * 2)))
+    left, right = pl.DataFrame({'a': [1]}).lazy(), pl.DataFrame({'a': [2]}).lazy()
+    assert cache._plan_key(left.join(right, on='a')) != cache._plan_key(right.join(left, on='a'))
+
+def test_collect_caches_plans_on_their_results(cache):
+    frame = pl.DataFrame({'a': [1, 2, 3], 'b': [1.0, 2.0, 3.0]})
+    assert cache.collect(_query(frame)).equals(_query(frame).collect())
+    assert cache.cache_container.exists(cache._plan_key(_query(frame)))
+
+def test_plans_with_unresolved_sources_need_a_ttl(cache, tmp_path):
+    for i in range(5):
+        pl.DataFrame({'a': [i]}).write_parquet(tmp_path / f"part{i}.parquet")
+    # polars lists the first file of the glob and "... 4 other sources"
+    query = pl.scan_parquet(str(tmp_path / 'part*.parquet'))
+    assert cache.collect(query).height == 5
+    assert cache.stats()['uncacheable_plans'] == 1
+    assert cache.cache_container.keys(f"{cache.leading_key}-pyarrow-lazy*") == []
+    cache.collect(query, ttl=60)
+    assert len(cache.cache_container.keys(f"{cache.leading_key}-pyarrow-lazy*")) == 1